@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Carry container-disk paths across a pause via /workspace. Runs on the pod; stdlib only.
+
+Pause wipes the container disk (/, /opt, /root) but keeps /workspace, so
+outputs written to e.g. /root/outputs are lost unless someone copies them off
+first. This mirrors the listed paths into a store on /workspace before the
+pod stops, records them in a manifest, and copies them back after a resume.
+
+    save PATH...  mirror each PATH into the store (unchanged files are skipped,
+                  files gone from PATH are dropped) and make these PATHs the
+                  manifest
+    restore       copy the manifest's paths back onto the container disk,
+                  skipping files that are already there unchanged, then mark
+                  the manifest restored so later resumes leave the paths alone
+                  until the next save
+
+Each run ends with one line giving the bytes moved and the time taken.
+Invoked by `runpod_ctl.py pause` and `runpod_ctl.py resume`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STORE_DIR = "/workspace/.zombuul/container-disk"
+COPY_WORKERS = 8
+
+
+def load_manifest(store: str) -> dict:
+    try:
+        with open(os.path.join(store, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"saved_at": None, "restored_at": None, "paths": []}
+
+
+def write_manifest(store: str, manifest: dict) -> None:
+    path = os.path.join(store, "manifest.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def walk(root: str) -> dict[str, os.stat_result]:
+    """Every file and symlink under root (or root itself, if it is one), keyed by path relative to root."""
+    st = os.lstat(root)
+    if not os.path.isdir(root) or os.path.islink(root):
+        return {"": st}
+    entries = {}
+    for dirpath, dirnames, names in os.walk(root):
+        for name in names + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+            path = os.path.join(dirpath, name)
+            entries[os.path.relpath(path, root)] = os.lstat(path)
+    return entries
+
+
+def _same(dst: str, st: os.stat_result) -> bool:
+    try:
+        other = os.lstat(dst)
+    except OSError:
+        return False
+    return other.st_size == st.st_size and int(other.st_mtime) == int(st.st_mtime)
+
+
+def _copy(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.lexists(dst) and (os.path.islink(dst) or os.path.islink(src)):
+        os.remove(dst)
+    shutil.copy2(src, dst, follow_symlinks=False)
+
+
+def mirror(src_root: str, dst_root: str, prune: bool) -> tuple[int, int, int]:
+    """Copy new or changed entries from src_root to dst_root in parallel. Returns (entries, bytes, bytes copied)."""
+    entries = walk(src_root)
+    todo = [rel for rel, st in entries.items() if not _same(os.path.join(dst_root, rel) if rel else dst_root, st)]
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        list(pool.map(lambda rel: _copy(os.path.join(src_root, rel) if rel else src_root,
+                                        os.path.join(dst_root, rel) if rel else dst_root), todo))
+    if prune and os.path.isdir(dst_root) and not os.path.islink(dst_root):
+        for rel in walk(dst_root).keys() - entries.keys():
+            os.remove(os.path.join(dst_root, rel))
+    total = sum(st.st_size for st in entries.values())
+    return len(entries), total, sum(entries[rel].st_size for rel in todo)
+
+
+def _report(verb: str, moved: int, total: int, secs: float, where: str) -> None:
+    rate = moved / secs / 1e6 if secs > 0 else 0.0
+    print(f"{verb} {moved / 1e9:.2f} GB of {total / 1e9:.2f} GB in {secs:.1f}s ({rate:.0f} MB/s) {where}")
+
+
+def save(store: str, paths: list[str]) -> None:
+    start = time.time()
+    saved, total, moved = [], 0, 0
+    for path in dict.fromkeys(os.path.normpath(os.path.abspath(p)) for p in paths):
+        if path == "/workspace" or path.startswith("/workspace/"):
+            print(f"  {path}: already on /workspace, skipped")
+            continue
+        if not os.path.lexists(path):
+            print(f"  {path}: not found, skipped")
+            continue
+        entries, size, copied = mirror(path, store + path, prune=True)
+        print(f"  {path}: {entries} files, {size / 1e9:.2f} GB ({copied / 1e9:.2f} GB copied)")
+        saved.append({"path": path, "files": entries, "bytes": size})
+        total += size
+        moved += copied
+    write_manifest(store, {"saved_at": time.time(), "restored_at": None, "paths": saved})
+    _report("Flushed", moved, total, time.time() - start, f"to {store}")
+
+
+def restore(store: str) -> None:
+    manifest = load_manifest(store)
+    if not manifest["paths"]:
+        return
+    if manifest.get("restored_at"):
+        print(f"Flushed paths already restored at {time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['restored_at']))}; nothing to do.")
+        return
+    start = time.time()
+    total = moved = 0
+    for entry in manifest["paths"]:
+        path = entry["path"]
+        if not os.path.lexists(store + path):
+            print(f"  {path}: missing from the store, skipped")
+            continue
+        entries, size, copied = mirror(store + path, path, prune=False)
+        print(f"  {path}: {entries} files, {size / 1e9:.2f} GB")
+        total += size
+        moved += copied
+    write_manifest(store, dict(manifest, restored_at=time.time()))
+    _report("Restored", moved, total, time.time() - start, f"from {store}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Carry container-disk paths across a pause via /workspace")
+    parser.add_argument("action", choices=["save", "restore"])
+    parser.add_argument("paths", nargs="*", help="Container-disk paths to flush (save only)")
+    parser.add_argument("--store", default=STORE_DIR)
+    args = parser.parse_args()
+    os.makedirs(args.store, exist_ok=True)
+    try:
+        if args.action == "save":
+            save(args.store, args.paths)
+        else:
+            restore(args.store)
+    except OSError as e:
+        print(f"ERROR: {args.action} failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
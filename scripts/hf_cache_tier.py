@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Hugging Face cache tier on /workspace. Runs on the pod; stdlib only.
+
+$HF_HOME lives on container disk (/opt/hf_cache), which pause wipes, while
+/workspace survives but has a hidden quota. This keeps a content-addressed
+copy of the hub blobs on /workspace plus a manifest of which repo/revision/file
+each blob backs, so a resumed pod gets back exactly the weights its last run
+used without re-downloading them.
+
+    save     copy new blobs from $HF_HOME/hub into the store, record what the
+             live cache uses, then evict least-recently-used blobs past the cap
+             (a blob's last use is the later of its atime and mtime in the live
+             cache, or the last restore that brought it back)
+    restore  copy (or hardlink, on the same filesystem) the blobs used last
+             time back into $HF_HOME/hub and rebuild snapshot links and refs
+    status   print the store's size and contents
+
+Invoked by `runpod_ctl.py hf-cache` and by pod_setup.sh's hf_cache phase.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STORE_DIR = "/workspace/.zombuul/hf-cache"
+COPY_WORKERS = 8
+
+
+def hub_dir() -> str:
+    return os.path.join(os.environ.get("HF_HOME", "/opt/hf_cache"), "hub")
+
+
+def load_manifest(store: str) -> dict:
+    try:
+        with open(os.path.join(store, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"max_bytes": None, "blobs": {}, "files": [], "refs": {}, "last_used": []}
+
+
+def write_manifest(store: str, manifest: dict) -> None:
+    path = os.path.join(store, "manifest.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def scan_hub(hub: str) -> tuple[list[dict], dict]:
+    """Every snapshot file in the live cache as {repo, revision, path, blob, size, used}, plus each repo's refs.
+
+    `used` is the later of the blob's atime and mtime. Refs are keyed by their path under refs/, e.g. "pr/1".
+    """
+    files, refs = [], {}
+    if not os.path.isdir(hub):
+        return files, refs
+    for repo in sorted(os.listdir(hub)):
+        repo_dir = os.path.join(hub, repo)
+        refs_dir = os.path.join(repo_dir, "refs")
+        for root, _, names in os.walk(refs_dir):  # nested for PR refs: refs/refs/pr/<n>
+            for name in names:
+                ref = os.path.join(root, name)
+                with open(ref) as f:
+                    refs.setdefault(repo, {})[os.path.relpath(ref, refs_dir)] = f.read().strip()
+        snapshots = os.path.join(repo_dir, "snapshots")
+        if not os.path.isdir(snapshots):
+            continue
+        for revision in os.listdir(snapshots):
+            rev_dir = os.path.join(snapshots, revision)
+            for root, _, names in os.walk(rev_dir):
+                for name in names:
+                    link = os.path.join(root, name)
+                    target = os.path.realpath(link)
+                    if not os.path.islink(link) or os.path.dirname(target) != os.path.join(repo_dir, "blobs"):
+                        continue
+                    try:
+                        st = os.stat(target)
+                    except OSError:
+                        continue
+                    files.append({
+                        "repo": repo,
+                        "revision": revision,
+                        "path": os.path.relpath(link, rev_dir),
+                        "blob": os.path.basename(target),
+                        "size": st.st_size,
+                        "used": max(st.st_atime, st.st_mtime),
+                    })
+    return files, refs
+
+
+def _copy_into(src: str, dst: str) -> None:
+    """Atomically place a copy of src at dst; hardlink when both sit on one filesystem."""
+    if os.path.exists(dst):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def evict(store: str, manifest: dict, max_bytes: int) -> tuple[int, int]:
+    """Drop least-recently-accessed blobs until the store fits in max_bytes. Returns (blobs, bytes) evicted."""
+    blobs = manifest["blobs"]
+    total = sum(b["size"] for b in blobs.values())
+    evicted = freed = 0
+    for blob in sorted(blobs, key=lambda h: blobs[h]["last_access"]):
+        if total <= max_bytes:
+            break
+        size = blobs.pop(blob)["size"]
+        try:
+            os.remove(os.path.join(store, "blobs", blob))
+        except OSError:
+            pass
+        total -= size
+        evicted += 1
+        freed += size
+    manifest["files"] = [f for f in manifest["files"] if f["blob"] in blobs]
+    manifest["last_used"] = [b for b in manifest["last_used"] if b in blobs]
+    return evicted, freed
+
+
+def save(store: str, hub: str, max_bytes: int | None) -> None:
+    start = time.time()
+    manifest = load_manifest(store)
+    if max_bytes is not None:
+        manifest["max_bytes"] = max_bytes
+    files, refs = scan_hub(hub)
+
+    sources = {}
+    for f in files:
+        sources.setdefault(f["blob"], (os.path.join(hub, f["repo"], "blobs", f["blob"]), f["size"], f["used"]))
+    new = {h: v for h, v in sources.items() if not os.path.exists(os.path.join(store, "blobs", h))}
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        list(pool.map(lambda h: _copy_into(new[h][0], os.path.join(store, "blobs", h)), new))
+
+    for blob, (_, size, used) in sources.items():
+        seen = manifest["blobs"].get(blob, {}).get("last_access", 0)
+        manifest["blobs"][blob] = {"size": size, "last_access": max(seen, used)}
+    known = {(f["repo"], f["revision"], f["path"]) for f in files}
+    manifest["files"] = [f for f in manifest["files"] if (f["repo"], f["revision"], f["path"]) not in known]
+    manifest["files"] += [{k: f[k] for k in ("repo", "revision", "path", "blob")} for f in files]
+    for repo, repo_refs in refs.items():
+        manifest["refs"].setdefault(repo, {}).update(repo_refs)
+    manifest["last_used"] = sorted(sources)
+
+    evicted = freed = 0
+    if manifest["max_bytes"]:
+        evicted, freed = evict(store, manifest, manifest["max_bytes"])
+    write_manifest(store, manifest)
+    copied = sum(size for _, size, _ in new.values())
+    print(f"Saved {len(sources)} blobs ({len(new)} new, {copied / 1e9:.2f} GB copied) in {time.time() - start:.1f}s.")
+    if evicted:
+        print(f"Evicted {evicted} least-recently-used blobs ({freed / 1e9:.2f} GB) to stay under the cap.")
+
+
+def restore(store: str, hub: str) -> None:
+    start = time.time()
+    manifest = load_manifest(store)
+    wanted = set(manifest["last_used"])
+    files = [f for f in manifest["files"] if f["blob"] in wanted and os.path.exists(os.path.join(store, "blobs", f["blob"]))]
+    if not files:
+        print("HF cache tier: nothing to restore.")
+        return
+
+    blobs = {(f["repo"], f["blob"]) for f in files}
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        list(pool.map(lambda rb: _copy_into(os.path.join(store, "blobs", rb[1]), os.path.join(hub, rb[0], "blobs", rb[1])), blobs))
+
+    for f in files:
+        link = os.path.join(hub, f["repo"], "snapshots", f["revision"], f["path"])
+        os.makedirs(os.path.dirname(link), exist_ok=True)
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.relpath(os.path.join(hub, f["repo"], "blobs", f["blob"]), os.path.dirname(link)), link)
+    for repo, repo_refs in manifest["refs"].items():
+        if not any(f["repo"] == repo for f in files):
+            continue
+        for ref, revision in repo_refs.items():
+            path = os.path.join(hub, repo, "refs", ref)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fh:
+                fh.write(revision)
+
+    now = time.time()
+    for _, blob in blobs:
+        manifest["blobs"][blob]["last_access"] = now
+    write_manifest(store, manifest)
+    restored = sum(manifest["blobs"][b]["size"] for b in {b for _, b in blobs})
+    print(f"Restored {len({b for _, b in blobs})} blobs ({restored / 1e9:.2f} GB) into {hub} in {time.time() - start:.1f}s.")
+
+
+def status(store: str) -> None:
+    manifest = load_manifest(store)
+    total = sum(b["size"] for b in manifest["blobs"].values())
+    cap = manifest.get("max_bytes")
+    cap_str = f"{cap / 1e9:.1f} GB" if cap else "none"
+    print(f"HF cache tier at {store}: {len(manifest['blobs'])} blobs, {total / 1e9:.2f} GB (cap {cap_str})")
+    for repo in sorted({f["repo"] for f in manifest["files"]}):
+        used = {f["blob"] for f in manifest["files"] if f["repo"] == repo}
+        size = sum(manifest["blobs"][b]["size"] for b in used)
+        print(f"  {repo:60s} {size / 1e9:8.2f} GB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hugging Face cache tier on /workspace")
+    parser.add_argument("action", choices=["save", "restore", "status"])
+    parser.add_argument("--max-gb", type=float, default=None, help="Size cap for the store; LRU blobs are evicted past it (save only)")
+    parser.add_argument("--store", default=STORE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(args.store, "blobs"), exist_ok=True)
+    if args.action == "save":
+        save(args.store, hub_dir(), int(args.max_gb * 1e9) if args.max_gb else None)
+    elif args.action == "restore":
+        restore(args.store, hub_dir())
+    else:
+        status(args.store)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""Resident metrics sampler with an on-disk ring buffer. Runs on the pod; stdlib only.
+
+Every few seconds records GPU utilisation/memory, CPU, RAM, disk usage, and
+network and block-IO throughput as one fixed-size binary record in a ring
+buffer file, so a day of history costs under a megabyte and never grows.
+
+    sample   run the sampler in the foreground (pod_setup.sh starts it with
+             nohup; a second copy exits if one is already running)
+    summary  summarise the last --since seconds: mean/p95 GPU util and memory,
+             CPU, RAM, throughput, and stretches where the GPUs sat idle
+    dump     print the raw samples as JSON lines
+    watchdog pause the pod (RunPod podStop) once the GPUs have sat idle for
+             --minutes with no terminal input or tmux output, leaving a marker
+             on /workspace (pod_setup.sh starts it when idle_pause_minutes is set)
+
+Invoked by `runpod_ctl.py metrics`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+import urllib.request
+
+BUFFER_PATH = "/var/log/zombuul-metrics.bin"
+PID_PATH = "/var/run/zombuul-metrics.pid"
+WATCHDOG_PID_PATH = "/var/run/zombuul-watchdog.pid"
+IDLE_MARKER = "/workspace/.zombuul/idle-paused"
+WATCHDOG_CHECK = 60
+INTERVAL = 5
+CAPACITY = 17280  # 24h at 5s
+IDLE_UTIL = 5.0
+IDLE_MIN_SECONDS = 60
+
+MAGIC = b"ZMET"
+HEADER = struct.Struct("<4sHHII")  # magic, version, record size, capacity, records written
+FIELDS = (
+    "ts", "gpu_util", "gpu_mem_used", "gpu_mem_total", "gpu_count", "cpu", "ram_used", "ram_total",
+    "disk_root", "disk_workspace", "net_rx", "net_tx", "io_read", "io_write",
+)
+RECORD = struct.Struct("<I" + "f" * (len(FIELDS) - 1))
+
+
+# --- ring buffer ---
+
+def open_buffer(path: str, capacity: int = CAPACITY) -> int:
+    """Open (creating if needed) the ring buffer file and return its fd."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    header = os.pread(fd, HEADER.size, 0)
+    if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC or HEADER.unpack(header)[2] != RECORD.size:
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, HEADER.pack(MAGIC, 1, RECORD.size, capacity, 0), 0)
+    return fd
+
+
+def append(fd: int, values: dict) -> None:
+    _, _, _, capacity, written = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+    record = RECORD.pack(int(values["ts"]), *(float(values.get(f, 0.0)) for f in FIELDS[1:]))
+    os.pwrite(fd, record, HEADER.size + (written % capacity) * RECORD.size)
+    os.pwrite(fd, HEADER.pack(MAGIC, 1, RECORD.size, capacity, written + 1), 0)
+
+
+def read_samples(path: str, since: float | None = None) -> list[dict]:
+    """All samples in the buffer, oldest first, optionally only those newer than `since` (unix time)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if len(data) < HEADER.size:
+        return []
+    magic, _, size, capacity, written = HEADER.unpack_from(data)
+    if magic != MAGIC or size != RECORD.size:
+        return []
+    count = min(written, capacity)
+    start = written % capacity if written > capacity else 0
+    samples = []
+    for i in range(count):
+        offset = HEADER.size + ((start + i) % capacity) * RECORD.size
+        row = dict(zip(FIELDS, RECORD.unpack_from(data, offset)))
+        if since is None or row["ts"] >= since:
+            samples.append(row)
+    return samples
+
+
+# --- sampling ---
+
+def _gpu() -> dict:
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=utilization.gpu,memory.used,memory.total", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    rows = []
+    for line in out.splitlines():
+        try:
+            rows.append([float(x) for x in line.split(",")])
+        except ValueError:
+            continue
+    if not rows:
+        return {}
+    return {
+        "gpu_util": sum(r[0] for r in rows) / len(rows),
+        "gpu_mem_used": sum(r[1] for r in rows),
+        "gpu_mem_total": sum(r[2] for r in rows),
+        "gpu_count": len(rows),
+    }
+
+
+def _counters() -> dict:
+    """Monotonic counters that become rates between two samples."""
+    counters = {"cpu_busy": 0, "cpu_total": 0, "net_rx": 0, "net_tx": 0, "io_read": 0, "io_write": 0}
+    with open("/proc/stat") as f:
+        ticks = [int(x) for x in f.readline().split()[1:]]
+    idle = ticks[3] + (ticks[4] if len(ticks) > 4 else 0)
+    counters["cpu_total"] = sum(ticks)
+    counters["cpu_busy"] = counters["cpu_total"] - idle
+    with open("/proc/net/dev") as f:
+        for line in f.readlines()[2:]:
+            name, stats = line.split(":", 1)
+            if name.strip() == "lo":
+                continue
+            fields = stats.split()
+            counters["net_rx"] += int(fields[0])
+            counters["net_tx"] += int(fields[8])
+    disks = set(os.listdir("/sys/block")) if os.path.isdir("/sys/block") else set()
+    try:
+        with open("/proc/diskstats") as f:
+            for line in f:
+                fields = line.split()
+                if fields[2] in disks and not fields[2].startswith(("loop", "ram")):
+                    counters["io_read"] += int(fields[5]) * 512
+                    counters["io_write"] += int(fields[9]) * 512
+    except OSError:
+        pass
+    return counters
+
+
+def _usage_pct(path: str) -> float:
+    try:
+        st = os.statvfs(path)
+    except OSError:
+        return 0.0
+    if not st.f_blocks:
+        return 0.0
+    return 100.0 * (st.f_blocks - st.f_bfree) / st.f_blocks
+
+
+def _memory() -> dict:
+    info = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            info[key] = int(value.split()[0]) / 1024
+    return {"ram_used": info["MemTotal"] - info.get("MemAvailable", info["MemFree"]), "ram_total": info["MemTotal"]}
+
+
+def _claim_pidfile(path: str) -> bool:
+    """Record this process in `path`; False if a live process already holds it."""
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                os.kill(int(f.read()), 0)
+            return False
+        except (OSError, ValueError):
+            pass
+    with open(path, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def sample(path: str, interval: float) -> None:
+    if not _claim_pidfile(PID_PATH):
+        return  # already running
+
+    fd = open_buffer(path)
+    prev, prev_t = _counters(), time.time()
+    while True:
+        time.sleep(interval)
+        now, cur = time.time(), _counters()
+        dt = max(now - prev_t, 1e-6)
+        values = {
+            "ts": now,
+            "cpu": 100.0 * (cur["cpu_busy"] - prev["cpu_busy"]) / max(cur["cpu_total"] - prev["cpu_total"], 1),
+            "disk_root": _usage_pct("/"),
+            "disk_workspace": _usage_pct("/workspace"),
+            **{k: (cur[k] - prev[k]) / dt for k in ("net_rx", "net_tx", "io_read", "io_write")},
+            **_memory(),
+            **_gpu(),
+        }
+        append(fd, values)
+        prev, prev_t = cur, now
+
+
+# --- summaries ---
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def idle_stretches(samples: list[dict], interval: float = INTERVAL) -> list[tuple[int, int]]:
+    """(start_ts, seconds) for each run of samples with GPU util under IDLE_UTIL lasting IDLE_MIN_SECONDS+."""
+    stretches = []
+    start = end = prev_ts = None
+
+    def close():
+        if start is not None and end - start + interval >= IDLE_MIN_SECONDS:
+            stretches.append((int(start), int(end - start + interval)))
+
+    for s in samples:
+        idle = s["gpu_util"] < IDLE_UTIL
+        gap = prev_ts is not None and s["ts"] - prev_ts > 3 * interval  # sampler was down; don't bridge it
+        if idle and start is not None and not gap:
+            end = s["ts"]
+        else:
+            close()
+            start = end = s["ts"] if idle else None
+        prev_ts = s["ts"]
+    close()
+    return stretches
+
+
+def summarize(samples: list[dict], interval: float = INTERVAL) -> dict:
+    if not samples:
+        return {"samples": 0}
+    gpu = [s for s in samples if s["gpu_count"]]
+    idle = idle_stretches(gpu, interval)
+    mean = lambda key, rows=samples: sum(r[key] for r in rows) / len(rows)
+    summary = {
+        "samples": len(samples),
+        "from": samples[0]["ts"],
+        "to": samples[-1]["ts"],
+        "cpu_mean": round(mean("cpu"), 1),
+        "ram_p95_mib": round(_pct([s["ram_used"] for s in samples], 0.95)),
+        "ram_total_mib": round(samples[-1]["ram_total"]),
+        "disk_root_pct": round(samples[-1]["disk_root"], 1),
+        "disk_workspace_pct": round(samples[-1]["disk_workspace"], 1),
+        "net_rx_mean_bps": round(mean("net_rx")),
+        "net_tx_mean_bps": round(mean("net_tx")),
+        "io_read_mean_bps": round(mean("io_read")),
+        "io_write_mean_bps": round(mean("io_write")),
+    }
+    if gpu:
+        summary.update(
+            gpu_count=int(gpu[-1]["gpu_count"]),
+            gpu_util_mean=round(mean("gpu_util", gpu), 1),
+            gpu_util_p95=round(_pct([s["gpu_util"] for s in gpu], 0.95), 1),
+            gpu_mem_p95_mib=round(_pct([s["gpu_mem_used"] for s in gpu], 0.95)),
+            gpu_mem_total_mib=round(gpu[-1]["gpu_mem_total"]),
+            idle_seconds=sum(d for _, d in idle),
+            idle_stretches=[{"start": start, "seconds": d} for start, d in sorted(idle, key=lambda x: -x[1])[:5]],
+        )
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    if not summary["samples"]:
+        print("No metrics recorded yet (is the sampler running? see /var/run/zombuul-metrics.pid).")
+        return
+    span = summary["to"] - summary["from"]
+    print(f"{summary['samples']} samples over {span / 60:.0f} min (to {time.strftime('%H:%M:%S', time.localtime(summary['to']))})")
+    if "gpu_util_mean" in summary:
+        print(f"  GPU x{summary['gpu_count']}: util mean {summary['gpu_util_mean']}% p95 {summary['gpu_util_p95']}%, "
+              f"mem p95 {summary['gpu_mem_p95_mib'] / 1024:.1f}/{summary['gpu_mem_total_mib'] / 1024:.0f} GiB")
+        idle_pct = 100 * summary["idle_seconds"] / max(span, 1)
+        print(f"  GPU idle (<{IDLE_UTIL:.0f}% for {IDLE_MIN_SECONDS}s+): {summary['idle_seconds'] / 60:.0f} min ({idle_pct:.0f}%)")
+        for stretch in summary["idle_stretches"]:
+            print(f"    from {time.strftime('%H:%M:%S', time.localtime(stretch['start']))} for {stretch['seconds'] / 60:.1f} min")
+    else:
+        print("  GPU: none detected")
+    print(f"  CPU mean {summary['cpu_mean']}%, RAM p95 {summary['ram_p95_mib'] / 1024:.1f}/{summary['ram_total_mib'] / 1024:.0f} GiB")
+    print(f"  Disk: / {summary['disk_root_pct']}%, /workspace {summary['disk_workspace_pct']}%")
+    print(f"  Net rx/tx {summary['net_rx_mean_bps'] / 1e6:.1f}/{summary['net_tx_mean_bps'] / 1e6:.1f} MB/s, "
+          f"IO read/write {summary['io_read_mean_bps'] / 1e6:.1f}/{summary['io_write_mean_bps'] / 1e6:.1f} MB/s (means)")
+    if summary.get("gpu_util_mean", 100) < 50 and summary["cpu_mean"] > 80:
+        print("  Hint: low GPU util with saturated CPU usually means the data loader is the bottleneck.")
+    elif summary.get("gpu_util_mean", 100) < 30:
+        print("  Hint: GPUs mostly underused over this window.")
+    if summary.get("gpu_mem_total_mib") and summary["gpu_mem_p95_mib"] < 0.4 * summary["gpu_mem_total_mib"]:
+        print("  Hint: p95 GPU memory is under 40% of capacity; a smaller GPU would likely fit this job.")
+
+
+# --- idle watchdog ---
+
+def gpu_idle_seconds(samples: list[dict], now: float, interval: float = INTERVAL) -> float:
+    """How long the GPUs have been continuously idle as of `now`. 0 if busy, GPU-less, or the sampler is stale."""
+    if not samples or now - samples[-1]["ts"] > 3 * interval:
+        return 0
+    start = None
+    for s in reversed(samples):
+        if not s["gpu_count"] or s["gpu_util"] >= IDLE_UTIL or (start is not None and start - s["ts"] > 3 * interval):
+            break
+        start = s["ts"]
+    return 0 if start is None else now - start
+
+
+def recent_activity(window: float, now: float) -> bool:
+    """True if a terminal (interactive SSH, tmux client) saw input, or a tmux session printed output, within `window`s."""
+    for tty in glob.glob("/dev/pts/[0-9]*"):
+        try:
+            if now - os.stat(tty).st_atime < window:
+                return True
+        except OSError:
+            continue
+    try:
+        out = subprocess.run(["tmux", "list-sessions", "-F", "#{session_activity}"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return any(now - int(t) < window for t in out.split() if t.isdigit())
+
+
+def _pod_env(key: str) -> str:
+    """Read `key` from this process's env, falling back to the container's (/proc/1/environ)."""
+    if os.environ.get(key):
+        return os.environ[key]
+    try:
+        with open("/proc/1/environ", "rb") as f:
+            for entry in f.read().split(b"\0"):
+                k, _, v = entry.decode(errors="replace").partition("=")
+                if k == key:
+                    return v
+    except OSError:
+        pass
+    return ""
+
+
+def stop_pod() -> None:
+    """Stop this pod with the same podStop mutation launch_on_pod.sh uses. Raises on failure."""
+    pod_id, api_key = _pod_env("RUNPOD_POD_ID"), _pod_env("RUNPOD_API_KEY")
+    if not pod_id or not api_key:
+        raise RuntimeError("RUNPOD_POD_ID / RUNPOD_API_KEY not set")
+    query = 'mutation { podStop(input: {podId: "%s"}) { id desiredStatus } }' % pod_id
+    req = urllib.request.Request(
+        f"https://api.runpod.io/graphql?api_key={api_key}",
+        data=json.dumps({"query": query}).encode(), headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        body = json.load(resp)
+    if body.get("errors"):
+        raise RuntimeError(body["errors"][0].get("message", "podStop failed"))
+
+
+def watchdog(path: str, minutes: float, interval: float) -> None:
+    if not _claim_pidfile(WATCHDOG_PID_PATH):
+        return  # already running
+    window = minutes * 60
+    started = time.time()
+    print(f"idle watchdog: pausing after {minutes:g} min of GPU idle", flush=True)
+    while True:
+        time.sleep(WATCHDOG_CHECK)
+        now = time.time()
+        # Idle time only counts from our own start, so a fresh resume is never paused on stale samples.
+        idle = min(gpu_idle_seconds(read_samples(path, since=now - window - 60), now, interval), now - started)
+        if idle < window or recent_activity(window, now):
+            continue
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        os.makedirs(os.path.dirname(IDLE_MARKER), exist_ok=True)
+        with open(IDLE_MARKER, "w") as f:
+            f.write(f"paused_at={stamp}\nidle_minutes={idle / 60:.0f}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"{stamp} GPUs idle for {idle / 60:.0f} min; stopping the pod", flush=True)
+        try:
+            stop_pod()
+            return
+        except (OSError, RuntimeError, ValueError) as e:
+            os.remove(IDLE_MARKER)
+            print(f"{stamp} podStop failed: {e}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pod metrics sampler and ring buffer")
+    parser.add_argument("action", choices=["sample", "summary", "dump", "watchdog"])
+    parser.add_argument("--since", type=float, default=3600, help="Window in seconds for summary/dump (default: 3600; 0 = everything)")
+    parser.add_argument("--interval", type=float, default=INTERVAL)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    parser.add_argument("--buffer", default=BUFFER_PATH)
+    parser.add_argument("--minutes", type=float, default=30, help="watchdog: GPU idle minutes before pausing (default: 30)")
+    args = parser.parse_args()
+
+    if args.action == "sample":
+        sample(args.buffer, args.interval)
+        return
+    if args.action == "watchdog":
+        watchdog(args.buffer, args.minutes, args.interval)
+        return
+    samples = read_samples(args.buffer, time.time() - args.since if args.since else None)
+    if args.action == "dump":
+        for s in samples:
+            print(json.dumps(s))
+    elif args.json:
+        print(json.dumps(summarize(samples, args.interval)))
+    else:
+        print_summary(summarize(samples, args.interval))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
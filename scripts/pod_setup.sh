@@ -1,5 +1,6 @@
 #!/bin/bash
-# Usage: bash pod_setup.sh <repo_url> [branch] [python_version] [install_claude] [extras]
+# Usage: bash pod_setup.sh <repo_url> [branch] [python_version] [install_claude] [extras] [venv_snapshot] [idle_pause_minutes]
+#        bash pod_setup.sh --restore-venv
 # Generic pod bootstrap for zombuul research loops.
 # Tokens come from container env vars (/proc/1/environ), with .env as fallback.
 #
@@ -12,26 +13,125 @@
 #                       Convenient, but breaks for projects with mutually exclusive groups.
 #   "none"            — install with no extras (`uv pip install -e .`).
 #   "a,b,c"           — install only the listed groups (`uv pip install -e ".[a,b,c]"`).
+#
+# venv_snapshot: "true" (default) to archive the built venv onto /workspace,
+# keyed by a hash of the dependency files, Python version and resolved extras.
+# Container disk (/opt) is wiped on pause, so the next setup — or
+# `--restore-venv`, which `runpod_ctl.py resume` runs — extracts the archive
+# instead of re-running the full dependency install when the key still matches.
+#
+# idle_pause_minutes: if > 0, start the idle watchdog (pod_metrics.py watchdog)
+# once setup finishes: it stops the pod after that many minutes of GPU idle with
+# no terminal input or tmux output. The setting is kept on /workspace, so
+# `--restore-venv` restarts the watchdog after a resume.
+#
+# Setup runs as a small dependency graph of phases. Independent phases run
+# concurrently, each with its own log under /var/log/pod_setup.d/:
+#
+#   system (apt, jq/rsync/tmux, gh) ──> clone ──┐
+#   venv   (uv + pinned Python)  ───────────────┴──> deps ──> hf login
+#                                                      └──> snapshot (only after a fresh install)
+#   claude (optional)            ──────────────────────────────────────┐
+#   hf_cache (if a /workspace tier exists) ─────────────────────────────┴──> summary
+#
+# Re-runs are cheap: system, venv, clone and deps each leave a stamp of the
+# inputs they last completed with (apt package set, Python version, branch and
+# its remote commit, dependency-file hash + resolved extras) under
+# /opt/zombuul/stamps, and a phase whose inputs still match is skipped. The
+# stamps live on container disk, so a pause, which wipes what those phases
+# built, wipes them too. Delete the directory to force a full run.
+#
+# The main log (/var/log/pod_setup.log) gets one start/end line per phase,
+# plus the tail of the phase log when a phase fails.
+#
+# Progress is also written as JSON lines to /var/log/pod_setup.events.jsonl,
+# one object per event with a unix `ts`:
+#   setup_start                          {mode}
+#   phase_start / phase_end              {phase[, rc, secs, retries]}
+#   step (one per retry-wrapped command) {phase, step, rc, secs, attempts}
+#   failure                              {phase, reason}
+#   setup_end                            {status: "ok"|"failed", secs, failures}
+# `runpod_ctl.py status` / `wait-setup` fold it into a per-phase timing table.
 set -o pipefail
 
-REPO_URL="${1:?Usage: bash pod_setup.sh <repo_url> [branch] [python_version] [install_claude] [extras]}"
+MODE="setup"
+if [ "${1:-}" = "--restore-venv" ]; then
+    MODE="restore-venv"
+    shift
+else
+    REPO_URL="${1:?Usage: bash pod_setup.sh <repo_url> [branch] [python_version] [install_claude] [extras] [venv_snapshot] [idle_pause_minutes]}"
+fi
 BRANCH="${2:-main}"
 PYTHON_VERSION="${3:-3.11}"
 INSTALL_CLAUDE="${4:-false}"
 EXTRAS="${5:-auto}"
+VENV_SNAPSHOT="${6:-true}"
+IDLE_PAUSE_MINUTES="${7:-0}"
+VENV_SNAPSHOT_DIR="/workspace/.zombuul/venv-snapshot"
 REPO_DIR="/workspace/repo"
 SETUP_FAILURES=()
+PHASE_LOG_DIR="/var/log/pod_setup.d"
+# retry() runs inside phase subshells, so failures are collected through a file.
+SETUP_FAILURES_FILE="$PHASE_LOG_DIR/failures"
+SETUP_EVENTS="/var/log/pod_setup.events.jsonl"
+SETUP_FAIL_REASON=""
+CURRENT_PHASE="main"
+PHASE_RETRIES=0
+mkdir -p "$PHASE_LOG_DIR"
+: > "$SETUP_FAILURES_FILE"
 
 # --- helpers ---
 
+json_str() {
+    local s="$1"
+    s="${s//\\/\\\\}"
+    s="${s//\"/\\\"}"
+    s="${s//[$'\t\n\r']/ }"
+    printf '"%s"' "$s"
+}
+
+# emit_event <event> [key=value ...]: append one JSON line to $SETUP_EVENTS.
+# Integer values are written as numbers, everything else as strings. Lines are
+# short, so appends from concurrent phases don't interleave.
+emit_event() {
+    local line kv k v
+    line="{\"ts\":$(date +%s),\"event\":$(json_str "$1")"
+    shift
+    for kv in "$@"; do
+        k="${kv%%=*}"
+        v="${kv#*=}"
+        if [[ "$v" =~ ^-?[0-9]+$ ]]; then
+            line+=",\"$k\":$v"
+        else
+            line+=",\"$k\":$(json_str "$v")"
+        fi
+    done
+    echo "$line}" >> "$SETUP_EVENTS"
+}
+
+# Any non-zero exit (FATAL checks, set -e-style bailouts) leaves a marker that
+# `runpod_ctl.py wait-setup` reacts to immediately instead of waiting out its timeout.
+on_exit() {
+    local rc=$?
+    if [ $rc -ne 0 ]; then
+        # Don't leave phases running in the background after a FATAL bailout.
+        jobs -p | xargs -r kill 2>/dev/null
+        emit_event setup_end status=failed secs="$SECONDS" rc="$rc" reason="${SETUP_FAIL_REASON:-exit $rc}"
+        echo "=== Setup FAILED (exit $rc) ==="
+    fi
+}
+trap on_exit EXIT
+
 retry() {
     local desc="$1" max_attempts="$2" delay="$3"
     shift 3
-    local attempt=1
+    local attempt=1 t0=$SECONDS
     while [ $attempt -le "$max_attempts" ]; do
         echo "[$desc] attempt $attempt/$max_attempts..."
+        [ $attempt -gt 1 ] && PHASE_RETRIES=$((PHASE_RETRIES + 1))
         if "$@"; then
             echo "[$desc] succeeded."
+            emit_event step phase="$CURRENT_PHASE" step="$desc" rc=0 secs=$((SECONDS - t0)) attempts="$attempt"
             return 0
         fi
         echo "[$desc] failed (attempt $attempt/$max_attempts)."
@@ -41,10 +141,193 @@ retry() {
         attempt=$((attempt + 1))
     done
     echo "[$desc] FAILED after $max_attempts attempts."
-    SETUP_FAILURES+=("$desc")
+    emit_event step phase="$CURRENT_PHASE" step="$desc" rc=1 secs=$((SECONDS - t0)) attempts="$max_attempts"
+    record_failure "$desc"
     return 1
 }
 
+record_failure() {
+    echo "$1" >> "$SETUP_FAILURES_FILE"
+    emit_event failure phase="$CURRENT_PHASE" reason="$1"
+}
+
+declare -A PHASE_PID
+
+# start_phase <name> <function>: run <function> in the background, logging to
+# $PHASE_LOG_DIR/<name>.log; its exit code and duration land in <name>.status.
+start_phase() {
+    local name="$1" fn="$2"
+    echo "[phase $name] started (log: $PHASE_LOG_DIR/$name.log)"
+    (
+        CURRENT_PHASE="$name"
+        PHASE_RETRIES=0
+        emit_event phase_start phase="$name"
+        t0=$SECONDS
+        "$fn" > "$PHASE_LOG_DIR/$name.log" 2>&1
+        rc=$?
+        echo "$rc $((SECONDS - t0))" > "$PHASE_LOG_DIR/$name.status"
+        emit_event phase_end phase="$name" rc="$rc" secs=$((SECONDS - t0)) retries="$PHASE_RETRIES"
+        exit "$rc"
+    ) &
+    PHASE_PID[$name]=$!
+}
+
+# wait_phase <name>: block until the phase finishes; returns its exit code.
+wait_phase() {
+    local name="$1" rc=1 secs="?"
+    wait "${PHASE_PID[$name]}"
+    read -r rc secs < "$PHASE_LOG_DIR/$name.status" 2>/dev/null
+    if [ "$rc" -eq 0 ]; then
+        echo "[phase $name] done (${secs}s)"
+    else
+        SETUP_FAIL_REASON="phase $name failed (exit $rc)"
+        echo "[phase $name] FAILED (exit $rc, ${secs}s). Last lines of $PHASE_LOG_DIR/$name.log:"
+        tail -20 "$PHASE_LOG_DIR/$name.log" | sed 's/^/    /'
+    fi
+    return "$rc"
+}
+
+# --- phase stamps ---
+
+STAMP_DIR="/opt/zombuul/stamps"
+
+# stamp_matches <phase> <inputs>: true if <phase> last completed with exactly <inputs>.
+stamp_matches() {
+    [ -f "$STAMP_DIR/$1" ] && [ "$(cat "$STAMP_DIR/$1")" = "$2" ]
+}
+
+write_stamp() {
+    mkdir -p "$STAMP_DIR" && printf '%s\n' "$2" > "$STAMP_DIR/$1"
+}
+
+# --- venv snapshot (on /workspace, survives pause) ---
+
+# Key = dependency files + Python version + resolved extras. Any change means a real install.
+venv_snapshot_key() {
+    {
+        for f in pyproject.toml uv.lock requirements.txt setup.py; do
+            if [ -f "$REPO_DIR/$f" ]; then
+                echo "== $f"
+                cat "$REPO_DIR/$f"
+            fi
+        done
+        echo "== python $PYTHON_VERSION"
+        echo "== extras $EXTRAS_RESOLVED"
+    } | sha256sum | cut -c1-16
+}
+
+save_venv_snapshot() {
+    local key="$1" base tmp archive
+    local paths=(opt/venvs/research)
+    # A uv-downloaded interpreter lives on container disk too; without it the venv is a dangling symlink.
+    base=$(readlink -f /opt/venvs/research/bin/python)
+    case "$base" in
+        /root/.local/share/uv/python/*) paths+=("$(echo "${base#/}" | cut -d/ -f1-6)") ;;
+    esac
+    mkdir -p "$VENV_SNAPSHOT_DIR"
+    if command -v zstd &>/dev/null; then
+        archive="$VENV_SNAPSHOT_DIR/venv-$key.tar.zst"
+        tmp="$archive.tmp"
+        tar -C / -cf - "${paths[@]}" | zstd -T0 -3 -q -o "$tmp" -f || { rm -f "$tmp"; return 1; }
+        # apt-installed zstd is wiped with the container disk; keep a copy next to the archive.
+        cp "$(command -v zstd)" "$VENV_SNAPSHOT_DIR/zstd"
+    else
+        archive="$VENV_SNAPSHOT_DIR/venv-$key.tar.gz"
+        tmp="$archive.tmp"
+        tar -C / -czf "$tmp" "${paths[@]}" || { rm -f "$tmp"; return 1; }
+    fi
+    mv "$tmp" "$archive"
+    # One snapshot at a time: /workspace has a hidden quota.
+    find "$VENV_SNAPSHOT_DIR" -maxdepth 1 -name 'venv-*.tar.*' ! -name "$(basename "$archive")" -delete
+    printf 'PYTHON_VERSION=%s\nEXTRAS_RESOLVED=%s\n' "$PYTHON_VERSION" "$EXTRAS_RESOLVED" > "$VENV_SNAPSHOT_DIR/params"
+    echo "Saved venv snapshot $key ($(du -h "$archive" | cut -f1))."
+}
+
+# restore_venv_snapshot <key>: replace /opt/venvs/research with the archived venv. Fails if none matches.
+restore_venv_snapshot() {
+    local key="$1" archive zstd_bin
+    archive=$(find "$VENV_SNAPSHOT_DIR" -maxdepth 1 -name "venv-$key.tar.*" ! -name '*.tmp' 2>/dev/null | head -1)
+    [ -n "$archive" ] || return 1
+    rm -rf /opt/venvs/research
+    case "$archive" in
+        *.zst)
+            zstd_bin=$(command -v zstd || echo "$VENV_SNAPSHOT_DIR/zstd")
+            "$zstd_bin" -d -T0 -q -c "$archive" | tar -C / -xf - ;;
+        *.gz)
+            if command -v pigz &>/dev/null; then
+                pigz -dc "$archive" | tar -C / -xf -
+            else
+                tar -C / -xzf "$archive"
+            fi ;;
+    esac || return 1
+    /opt/venvs/research/bin/python -c 'pass' || { rm -rf /opt/venvs/research; return 1; }
+    echo "Restored venv snapshot $key."
+}
+
+# --- metrics sampler ---
+# Resident: samples GPU/CPU/RAM/disk/IO into a ring buffer read by `runpod_ctl.py metrics`.
+# A copy is kept on /workspace so `--restore-venv` can restart it after a pause wiped
+# the container disk. Started in its own session so a FATAL bailout's job cleanup
+# leaves it running; its pidfile makes a second start a no-op.
+
+METRICS_SCRIPT="/workspace/.zombuul/pod_metrics.py"
+
+start_metrics_sampler() {
+    if [ -f "$(dirname "$0")/pod_metrics.py" ]; then
+        mkdir -p "$(dirname "$METRICS_SCRIPT")"
+        cp "$(dirname "$0")/pod_metrics.py" "$METRICS_SCRIPT"
+    fi
+    [ -f "$METRICS_SCRIPT" ] || return 0
+    (setsid nohup python3 "$METRICS_SCRIPT" sample </dev/null >/dev/null 2>&1 &)
+}
+
+IDLE_PAUSE_FILE="/workspace/.zombuul/idle-pause-minutes"
+IDLE_MARKER="/workspace/.zombuul/idle-paused"
+
+# start_idle_watchdog: report (and clear) the marker left by the last idle pause,
+# then start the watchdog if idle_pause_minutes is set.
+start_idle_watchdog() {
+    local minutes
+    if [ -f "$IDLE_MARKER" ]; then
+        echo "Last pause was by the idle watchdog: $(tr '\n' ' ' < "$IDLE_MARKER")"
+        rm -f "$IDLE_MARKER"
+    fi
+    minutes=$(cat "$IDLE_PAUSE_FILE" 2>/dev/null)
+    [ "${minutes:-0}" -gt 0 ] 2>/dev/null && [ -f "$METRICS_SCRIPT" ] || return 0
+    (setsid nohup python3 "$METRICS_SCRIPT" watchdog --minutes "$minutes" </dev/null >>/var/log/zombuul-watchdog.log 2>&1 &)
+    echo "Idle watchdog: pausing the pod after $minutes min of GPU idle."
+}
+
+if [ "$MODE" = "restore-venv" ]; then
+    trap - EXIT
+    start_metrics_sampler
+    start_idle_watchdog
+    if [ ! -f "$VENV_SNAPSHOT_DIR/params" ]; then
+        echo "No venv snapshot on /workspace."
+        exit 0
+    fi
+    while IFS='=' read -r key value; do
+        case "$key" in
+            PYTHON_VERSION) PYTHON_VERSION="$value" ;;
+            EXTRAS_RESOLVED) EXTRAS_RESOLVED="$value" ;;
+        esac
+    done < "$VENV_SNAPSHOT_DIR/params"
+    t0=$SECONDS
+    key=$(venv_snapshot_key)
+    if restore_venv_snapshot "$key"; then
+        echo "venv restore took $((SECONDS - t0))s"
+        # A later re-run of the full setup can then skip straight past venv and deps.
+        write_stamp venv "$PYTHON_VERSION"
+        write_stamp deps "$key"
+        exit 0
+    fi
+    echo "Venv snapshot is stale (dependency files changed) or unreadable; re-run pod_setup.sh to reinstall."
+    exit 1
+fi
+
+: > "$SETUP_EVENTS"
+emit_event setup_start mode="$MODE"
+
 # --- env vars ---
 
 # Import container env vars (not inherited when run via nohup over SSH)
@@ -70,18 +353,68 @@ for envfile in "$REPO_DIR/.env" /tmp/.env; do
     fi
 done
 
-# --- system tools ---
+# --- preflight (fail before spending minutes on installs) ---
+
+if [ -z "$GH_TOKEN" ]; then
+    SETUP_FAIL_REASON="GH_TOKEN is empty"
+    echo "FATAL: GH_TOKEN is empty. Set GH_TOKEN in the repo's .env (or in /proc/1/environ) before launching."
+    echo "       Without it, gh auth login is skipped and any private clone / push will fail mid-experiment."
+    exit 1
+fi
+
+# GIT_USER_NAME / GIT_USER_EMAIL are forwarded by runpod_ctl.py, which reads
+# them from the launching user's env / .env / `git config --global user.*`.
+# So on-pod commits are attributed to the real human, not a generic pod user.
+if [ -z "$GIT_USER_NAME" ] || [ -z "$GIT_USER_EMAIL" ]; then
+    SETUP_FAIL_REASON="GIT_USER_NAME/GIT_USER_EMAIL not forwarded"
+    echo "FATAL: GIT_USER_NAME and/or GIT_USER_EMAIL not forwarded to the pod."
+    echo "       runpod_ctl.py reads these from env, .env, or 'git config user.{name,email}' (repo/global/system)."
+    echo "       Set one of those on the launching machine, or commits will fail with 'Author identity unknown' mid-experiment."
+    exit 1
+fi
+git config --global user.name "$GIT_USER_NAME"
+git config --global user.email "$GIT_USER_EMAIL"
 
-retry "apt-get update" 3 10 apt-get update
+# --- caches outside NFS ---
+
+export UV_CACHE_DIR=/opt/uv_cache
+export HF_HOME=/opt/hf_cache
+mkdir -p /opt/uv_cache /opt/hf_cache
+mkdir -p /root/.cache
+# Only replace /root/.cache/huggingface if missing or a symlink; never rm a real cache dir.
+if [ -L /root/.cache/huggingface ] || [ ! -e /root/.cache/huggingface ]; then
+    ln -sfn /opt/hf_cache /root/.cache/huggingface
+fi
+
+# --- phase: system tools ---
+
+APT_PACKAGES=(jq rsync tmux zstd)
+
+have_commands() {
+    local c
+    for c in "$@"; do
+        command -v "$c" &>/dev/null || return 1
+    done
+}
 
 install_system_packages() {
-    if command -v jq &>/dev/null && command -v rsync &>/dev/null && command -v tmux &>/dev/null; then
-        echo "jq, rsync, and tmux already installed."
+    if have_commands "${APT_PACKAGES[@]}"; then
+        echo "${APT_PACKAGES[*]} already installed."
         return 0
     fi
-    apt-get install -y jq rsync tmux
+    apt-get install -y "${APT_PACKAGES[@]}"
+}
+
+# Register the gh apt source before `apt-get update`, so one update covers both
+# the base packages and gh instead of gh's install running a second update.
+add_gh_apt_source() {
+    [ -f /etc/apt/sources.list.d/github-cli.list ] && return 0
+    curl -fsSL https://cli.github.com/packages/githubcli-archive-keyring.gpg \
+        | dd of=/usr/share/keyrings/githubcli-archive-keyring.gpg 2>/dev/null \
+        && chmod go+r /usr/share/keyrings/githubcli-archive-keyring.gpg \
+        && echo "deb [arch=$(dpkg --print-architecture) signed-by=/usr/share/keyrings/githubcli-archive-keyring.gpg] https://cli.github.com/packages stable main" \
+            | tee /etc/apt/sources.list.d/github-cli.list > /dev/null
 }
-retry "install jq+rsync+tmux" 3 10 install_system_packages
 
 # gh CLI (non-critical — used for PR operations but not essential)
 install_gh() {
@@ -89,39 +422,58 @@ install_gh() {
         echo "gh already installed."
         return 0
     fi
-    curl -fsSL https://cli.github.com/packages/githubcli-archive-keyring.gpg \
-        | dd of=/usr/share/keyrings/githubcli-archive-keyring.gpg 2>/dev/null \
-        && chmod go+r /usr/share/keyrings/githubcli-archive-keyring.gpg \
-        && echo "deb [arch=$(dpkg --print-architecture) signed-by=/usr/share/keyrings/githubcli-archive-keyring.gpg] https://cli.github.com/packages stable main" \
-            | tee /etc/apt/sources.list.d/github-cli.list > /dev/null \
-        && apt-get update \
-        && apt-get install -y gh
+    if ! apt-get install -y gh; then
+        add_gh_apt_source && apt-get update && apt-get install -y gh
+    fi
 }
-retry "install gh" 3 10 install_gh
 
-# --- git auth (before any clone) ---
-# Use gh CLI as credential helper instead of embedding token in URL.
-# Embedding the token in the URL triggers GitHub push protection on push.
+phase_system() {
+    local inputs="${APT_PACKAGES[*]} gh" rc=0 gh_rc
+    if stamp_matches system "$inputs" && have_commands "${APT_PACKAGES[@]}" gh; then
+        echo "System packages unchanged ($inputs) — skipped apt."
+        return 0
+    fi
+    command -v gh &>/dev/null || add_gh_apt_source || echo "WARNING: could not add gh apt source; will retry during gh install."
+    retry "apt-get update" 3 10 apt-get update || rc=1
+    retry "install ${APT_PACKAGES[*]}" 3 10 install_system_packages || rc=1
+    retry "install gh" 3 10 install_gh
+    gh_rc=$?
+    # The phase's status stays gh's; the stamp needs all three steps to have worked.
+    [ $rc -eq 0 ] && [ $gh_rc -eq 0 ] && write_stamp system "$inputs"
+    return $gh_rc
+}
 
-if [ -z "$GH_TOKEN" ]; then
-    echo "FATAL: GH_TOKEN is empty. Set GH_TOKEN in the repo's .env (or in /proc/1/environ) before launching."
-    echo "       Without it, gh auth login is skipped and any private clone / push will fail mid-experiment."
-    exit 1
-fi
-# gh CLI uses GH_TOKEN from env automatically when set; calling
-# `gh auth login --with-token` in that case errors out ("To have GitHub CLI
-# store credentials instead, first clear the value from the environment").
-# Verify auth works via env instead — the credential helper below uses gh's
-# auth regardless of whether it came from env or login store.
-if gh auth status >/dev/null 2>&1; then
-    echo "Logged into GitHub via GH_TOKEN env var."
-else
-    echo "FATAL: gh auth status failed despite GH_TOKEN being set — token may be invalid or expired."
-    exit 1
-fi
-git config --global credential.helper '!gh auth git-credential'
+# --- phase: Python environment ---
 
-# --- clone repo ---
+phase_venv() {
+    if stamp_matches venv "$PYTHON_VERSION" && command -v uv &>/dev/null && [ -x /opt/venvs/research/bin/python ]; then
+        echo "venv unchanged (Python $PYTHON_VERSION) — skipped."
+        return 0
+    fi
+    if ! command -v uv &>/dev/null; then
+        pip install uv || return 1
+    fi
+    mkdir -p /opt/venvs
+    if [ ! -d /opt/venvs/research/bin ]; then
+        retry "create venv" 3 5 uv venv --python "$PYTHON_VERSION" /opt/venvs/research
+    fi
+    # Fail loudly if the venv didn't get built — otherwise we silently activate
+    # nothing and downstream `uv pip install` lands in the wrong interpreter.
+    if [ ! -x /opt/venvs/research/bin/python ]; then
+        echo "FATAL: venv /opt/venvs/research not created. Requested Python $PYTHON_VERSION may be unavailable in this image."
+        echo "       Check defaults.yaml python_version vs. the docker_image's bundled Python."
+        return 1
+    fi
+    local actual_py
+    actual_py=$(/opt/venvs/research/bin/python -c 'import sys; print(f"{sys.version_info.major}.{sys.version_info.minor}")')
+    if [ "$actual_py" != "$PYTHON_VERSION" ]; then
+        echo "FATAL: venv built with Python $actual_py, but $PYTHON_VERSION was requested."
+        return 1
+    fi
+    write_stamp venv "$PYTHON_VERSION"
+}
+
+# --- phase: clone repo ---
 
 clone_repo() {
     if [ -d "$REPO_DIR/.git" ]; then
@@ -132,74 +484,185 @@ clone_repo() {
     rm -rf "$REPO_DIR"
     git clone "$REPO_URL" "$REPO_DIR"
 }
-retry "clone repo" 3 15 clone_repo
-cd "$REPO_DIR" || exit 1
-git checkout "$BRANCH" || git checkout -b "$BRANCH" "origin/$BRANCH"
 
-# --- Claude Code + zombuul plugin ---
-
-if [ "$INSTALL_CLAUDE" = "true" ]; then
-    install_claude() {
-        if command -v claude &>/dev/null; then
-            echo "Claude Code already installed."
+phase_clone() {
+    local target
+    if [ -d "$REPO_DIR/.git" ]; then
+        # One ref lookup instead of a fetch: enough to tell whether anything moved.
+        target=$(git -C "$REPO_DIR" ls-remote origin "refs/heads/$BRANCH" 2>/dev/null | cut -f1)
+        if [ -n "$target" ] && stamp_matches clone "$BRANCH $target" \
+            && [ "$(git -C "$REPO_DIR" symbolic-ref --short -q HEAD)" = "$BRANCH" ] \
+            && [ "$(git -C "$REPO_DIR" rev-parse HEAD)" = "$target" ]; then
+            echo "Repo already at $BRANCH ${target:0:12} — skipped fetch."
             return 0
         fi
-        curl -fsSL https://claude.ai/install.sh | bash
-    }
+    fi
+    retry "clone repo" 3 15 clone_repo || return 1
+    cd "$REPO_DIR" || return 1
+    git checkout "$BRANCH" || git checkout -b "$BRANCH" "origin/$BRANCH"
+    # Move an existing branch up to the fetched commit; --ff-only never drops commits made on the pod.
+    git merge --ff-only "origin/$BRANCH" || echo "WARNING: $BRANCH has diverged from origin/$BRANCH; left as is."
+    write_stamp clone "$BRANCH $(git rev-parse HEAD)"
+    return 0
+}
+
+# --- phase: Claude Code + zombuul plugin ---
+
+install_claude() {
+    if command -v claude &>/dev/null; then
+        echo "Claude Code already installed."
+        return 0
+    fi
+    curl -fsSL https://claude.ai/install.sh | bash
+}
+
+install_zombuul() {
+    # Remove stale marketplace if present (idempotent re-install)
+    claude plugin marketplace remove ogilg-marketplace 2>/dev/null || true
+    claude plugin marketplace add oscar-gilg/zombuul || return 1
+    claude plugin install zombuul@ogilg-marketplace || return 1
+}
+
+phase_claude() {
     retry "install Claude Code" 3 15 install_claude
     export PATH="$HOME/.local/bin:$PATH"
 
     if ! command -v claude &>/dev/null; then
         echo "FATAL: claude not found on PATH after install."
-        SETUP_FAILURES+=("claude binary not found")
+        record_failure "claude binary not found"
+        return 1
     fi
-
-    install_zombuul() {
-        # Remove stale marketplace if present (idempotent re-install)
-        claude plugin marketplace remove ogilg-marketplace 2>/dev/null || true
-        claude plugin marketplace add oscar-gilg/zombuul || return 1
-        claude plugin install zombuul@ogilg-marketplace || return 1
-    }
     retry "install zombuul plugin" 3 10 install_zombuul
-else
-    echo "Skipping Claude Code install (INSTALL_CLAUDE=false)."
-fi
+}
 
-# --- caches outside NFS ---
+# --- phase: project dependencies ---
 
-export UV_CACHE_DIR=/opt/uv_cache
-export HF_HOME=/opt/hf_cache
-mkdir -p /opt/uv_cache /opt/hf_cache
-mkdir -p /root/.cache
-# Only replace /root/.cache/huggingface if missing or a symlink; never rm a real cache dir.
-if [ -L /root/.cache/huggingface ] || [ ! -e /root/.cache/huggingface ]; then
-    ln -sfn /opt/hf_cache /root/.cache/huggingface
-fi
+# Supports pyproject.toml (with optional extras), requirements.txt, or setup.py.
+# Skips install if none are found.
+install_deps() {
+    if [ -f "$REPO_DIR/pyproject.toml" ]; then
+        if [ -n "$EXTRAS_RESOLVED" ]; then
+            echo "Installing with extras: [$EXTRAS_RESOLVED]"
+            retry "pip install project" 3 10 uv pip install -e ".[$EXTRAS_RESOLVED]"
+        else
+            echo "Installing with no extras."
+            retry "pip install project" 3 10 uv pip install -e .
+        fi
+    elif [ -f "$REPO_DIR/requirements.txt" ]; then
+        echo "No pyproject.toml found; installing from requirements.txt"
+        retry "pip install requirements" 3 10 uv pip install -r requirements.txt
+    elif [ -f "$REPO_DIR/setup.py" ]; then
+        echo "No pyproject.toml found; installing from setup.py"
+        retry "pip install project" 3 10 uv pip install -e .
+    else
+        echo "WARNING: No pyproject.toml, requirements.txt, or setup.py found. Skipping dependency install."
+    fi
+}
 
-# --- Python environment ---
+resolve_extras() {
+    EXTRAS_RESOLVED=""
+    if [ -f "$REPO_DIR/pyproject.toml" ]; then
+        case "$EXTRAS" in
+            auto)
+                EXTRAS_RESOLVED=$(python3 -c "
+import tomllib
+with open('$REPO_DIR/pyproject.toml', 'rb') as f:
+    groups = list(tomllib.load(f).get('project', {}).get('optional-dependencies', {}).keys())
+if groups:
+    print(','.join(groups))
+" 2>/dev/null || true)
+                ;;
+            none|"")
+                EXTRAS_RESOLVED=""
+                ;;
+            *)
+                EXTRAS_RESOLVED="$EXTRAS"
+                ;;
+        esac
+    fi
+}
 
-if ! command -v uv &>/dev/null; then
-    pip install uv
-fi
-mkdir -p /opt/venvs
-if [ ! -d /opt/venvs/research/bin ]; then
-    retry "create venv" 3 5 uv venv --python "$PYTHON_VERSION" /opt/venvs/research
+phase_deps() {
+    # shellcheck disable=SC1091
+    source /opt/venvs/research/bin/activate
+    cd "$REPO_DIR" || return 1
+    resolve_extras
+    local key
+    key=$(venv_snapshot_key)
+    if stamp_matches deps "$key" && [ -x /opt/venvs/research/bin/python ]; then
+        echo "Dependencies unchanged ($key) — skipped install."
+        return 0
+    fi
+    if [ "$VENV_SNAPSHOT" = "true" ] && restore_venv_snapshot "$key"; then
+        echo "Dependencies unchanged since the last snapshot — skipped install."
+        write_stamp deps "$key"
+        return 0
+    fi
+    # A failed extraction removes the half-written venv; rebuild it before installing.
+    if [ ! -x /opt/venvs/research/bin/python ]; then
+        retry "create venv" 3 5 uv venv --python "$PYTHON_VERSION" /opt/venvs/research || return 1
+    fi
+    install_deps || return 1
+    write_stamp deps "$key"
+    # Hand the key to the snapshot phase (which only runs after a fresh install).
+    printf '%s\n%s\n' "$key" "$EXTRAS_RESOLVED" > "$PHASE_LOG_DIR/venv_key"
+}
+
+phase_snapshot() {
+    { read -r key; read -r EXTRAS_RESOLVED; } < "$PHASE_LOG_DIR/venv_key"
+    save_venv_snapshot "$key"
+}
+
+# --- phase: HF cache warm-restore ---
+# Opt-in: only runs once `runpod_ctl.py hf-cache <pod> save` has created the
+# /workspace tier. Copies back the blobs the last run used into /opt/hf_cache.
+
+HF_CACHE_TIER_SCRIPT="$(dirname "$0")/hf_cache_tier.py"
+
+phase_hf_cache() {
+    python3 "$HF_CACHE_TIER_SCRIPT" restore
+}
+
+start_metrics_sampler
+
+# --- run the graph ---
+
+start_phase system phase_system
+start_phase venv phase_venv
+if [ "$INSTALL_CLAUDE" = "true" ]; then
+    start_phase claude phase_claude
+else
+    echo "Skipping Claude Code install (INSTALL_CLAUDE=false)."
 fi
-# Fail loudly if the venv didn't get built — otherwise we silently activate
-# nothing and downstream `uv pip install` lands in the wrong interpreter.
-if [ ! -x /opt/venvs/research/bin/python ]; then
-    echo "FATAL: venv /opt/venvs/research not created. Requested Python $PYTHON_VERSION may be unavailable in this image."
-    echo "       Check defaults.yaml python_version vs. the docker_image's bundled Python."
-    exit 1
+if [ -f "$HF_CACHE_TIER_SCRIPT" ] && [ -f /workspace/.zombuul/hf-cache/manifest.json ]; then
+    start_phase hf_cache phase_hf_cache
 fi
-ACTUAL_PY=$(/opt/venvs/research/bin/python -c 'import sys; print(f"{sys.version_info.major}.{sys.version_info.minor}")')
-if [ "$ACTUAL_PY" != "$PYTHON_VERSION" ]; then
-    echo "FATAL: venv built with Python $ACTUAL_PY, but $PYTHON_VERSION was requested."
+
+wait_phase system
+
+# --- git auth (before any clone) ---
+# Use gh CLI as credential helper instead of embedding token in URL.
+# Embedding the token in the URL triggers GitHub push protection on push.
+# gh CLI uses GH_TOKEN from env automatically when set; calling
+# `gh auth login --with-token` in that case errors out ("To have GitHub CLI
+# store credentials instead, first clear the value from the environment").
+# Verify auth works via env instead — the credential helper below uses gh's
+# auth regardless of whether it came from env or login store.
+if gh auth status >/dev/null 2>&1; then
+    echo "Logged into GitHub via GH_TOKEN env var."
+else
+    SETUP_FAIL_REASON="gh auth status failed"
+    echo "FATAL: gh auth status failed despite GH_TOKEN being set — token may be invalid or expired."
     exit 1
 fi
+git config --global credential.helper '!gh auth git-credential'
+
+start_phase clone phase_clone
+wait_phase clone || exit 1
+wait_phase venv || exit 1
+
 # shellcheck disable=SC1091
 source /opt/venvs/research/bin/activate
-cd "$REPO_DIR" || exit 1
 # Replace any existing .venv first: ln -sfn into an existing dir nests the symlink inside it.
 if [ -L "$REPO_DIR/.venv" ] || [ ! -e "$REPO_DIR/.venv" ]; then
     ln -sfn /opt/venvs/research "$REPO_DIR/.venv"
@@ -207,57 +670,13 @@ else
     rm -rf "$REPO_DIR/.venv"
     ln -sfn /opt/venvs/research "$REPO_DIR/.venv"
 fi
-# Install project dependencies.
-# Supports pyproject.toml (with optional extras), requirements.txt, or setup.py.
-# Skips install if none are found.
-if [ -f "$REPO_DIR/pyproject.toml" ]; then
-    case "$EXTRAS" in
-        auto)
-            EXTRAS_RESOLVED=$(python3 -c "
-import tomllib
-with open('$REPO_DIR/pyproject.toml', 'rb') as f:
-    groups = list(tomllib.load(f).get('project', {}).get('optional-dependencies', {}).keys())
-if groups:
-    print(','.join(groups))
-" 2>/dev/null || true)
-            ;;
-        none|"")
-            EXTRAS_RESOLVED=""
-            ;;
-        *)
-            EXTRAS_RESOLVED="$EXTRAS"
-            ;;
-    esac
-    if [ -n "$EXTRAS_RESOLVED" ]; then
-        echo "Installing with extras: [$EXTRAS_RESOLVED]"
-        retry "pip install project" 3 10 uv pip install -e ".[$EXTRAS_RESOLVED]"
-    else
-        echo "Installing with no extras."
-        retry "pip install project" 3 10 uv pip install -e .
-    fi
-elif [ -f "$REPO_DIR/requirements.txt" ]; then
-    echo "No pyproject.toml found; installing from requirements.txt"
-    retry "pip install requirements" 3 10 uv pip install -r requirements.txt
-elif [ -f "$REPO_DIR/setup.py" ]; then
-    echo "No pyproject.toml found; installing from setup.py"
-    retry "pip install project" 3 10 uv pip install -e .
-else
-    echo "WARNING: No pyproject.toml, requirements.txt, or setup.py found. Skipping dependency install."
-fi
 
-# --- git identity ---
-# GIT_USER_NAME / GIT_USER_EMAIL are forwarded by runpod_ctl.py, which reads
-# them from the launching user's env / .env / `git config --global user.*`.
-# So on-pod commits are attributed to the real human, not a generic pod user.
-
-if [ -z "$GIT_USER_NAME" ] || [ -z "$GIT_USER_EMAIL" ]; then
-    echo "FATAL: GIT_USER_NAME and/or GIT_USER_EMAIL not forwarded to the pod."
-    echo "       runpod_ctl.py reads these from env, .env, or 'git config user.{name,email}' (repo/global/system)."
-    echo "       Set one of those on the launching machine, or commits will fail with 'Author identity unknown' mid-experiment."
-    exit 1
+rm -f "$PHASE_LOG_DIR/venv_key"
+start_phase deps phase_deps
+if wait_phase deps && [ "$VENV_SNAPSHOT" = "true" ] && [ -f "$PHASE_LOG_DIR/venv_key" ]; then
+    start_phase snapshot phase_snapshot
 fi
-git config --global user.name "$GIT_USER_NAME"
-git config --global user.email "$GIT_USER_EMAIL"
+cd "$REPO_DIR" || exit 1
 
 # --- auth (tokens passed via environment) ---
 
@@ -267,6 +686,16 @@ fi
 
 # gh auth already done above (before clone)
 
+if [ "$INSTALL_CLAUDE" = "true" ]; then
+    wait_phase claude
+fi
+if [ -n "${PHASE_PID[hf_cache]:-}" ]; then
+    wait_phase hf_cache || record_failure "HF cache restore"
+fi
+if [ -n "${PHASE_PID[snapshot]:-}" ]; then
+    wait_phase snapshot || record_failure "venv snapshot"
+fi
+
 # --- .bash_profile ---
 
 cat > ~/.bash_profile << 'PROFILE'
@@ -295,8 +724,20 @@ if [ -n "$RUNPOD_POD_ID" ]; then
     echo "export RUNPOD_POD_ID=$RUNPOD_POD_ID" >> ~/.bash_profile
 fi
 
+# --- idle watchdog ---
+
+mkdir -p "$(dirname "$IDLE_PAUSE_FILE")"
+if [ "$IDLE_PAUSE_MINUTES" -gt 0 ] 2>/dev/null; then
+    echo "$IDLE_PAUSE_MINUTES" > "$IDLE_PAUSE_FILE"
+else
+    rm -f "$IDLE_PAUSE_FILE"
+fi
+start_idle_watchdog
+
 # --- summary ---
 
+mapfile -t SETUP_FAILURES < "$SETUP_FAILURES_FILE"
+emit_event setup_end status=ok secs="$SECONDS" failures="${#SETUP_FAILURES[@]}"
 echo ""
 if [ ${#SETUP_FAILURES[@]} -gt 0 ]; then
     echo "=== Setup complete with ${#SETUP_FAILURES[@]} failure(s) ==="
@@ -10,53 +10,148 @@
 """RunPod pod management CLI. Used by Claude Code slash commands."""
 
 import argparse
+import contextlib
+import fnmatch
 import functools
+import json
 import os
+import re
 import shlex
+import socket
 import subprocess
 import sys
+import threading
 import time
-
-import runpod
-import yaml
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 print = functools.partial(print, flush=True)
 
+# Fleet worker threads set `_print_ctx.prefix` to their pod's `[name] ` tag.
+_print_ctx = threading.local()
+
+
+class _TaggedStdout:
+    """sys.stdout stand-in while fleet workers run: each thread's lines start with its own prefix."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        prefix = getattr(_print_ctx, "prefix", "")
+        if prefix and text:
+            lines = text.split("\n")
+            at_line_start = getattr(_print_ctx, "at_line_start", True)
+            text = "\n".join(prefix + line if line and (i or at_line_start) else line for i, line in enumerate(lines))
+            _print_ctx.at_line_start = text.endswith("\n")
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextlib.contextmanager
+def _tagged_stdout():
+    """Route output through _TaggedStdout so interleaved fleet lines stay attributable."""
+    stream = sys.stdout
+    sys.stdout = _TaggedStdout(stream)
+    try:
+        yield
+    finally:
+        sys.stdout = stream
+
+
 SSH_KEY = "~/.ssh/id_ed25519"
 _SSH_ALIVE_INTERVAL = 30
 _SSH_ALIVE_COUNT_MAX = 10
 SSH_OPTS = ["-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=5", "-o", f"ServerAliveInterval={_SSH_ALIVE_INTERVAL}", "-o", f"ServerAliveCountMax={_SSH_ALIVE_COUNT_MAX}"]
+# One ControlMaster socket per pod endpoint (%C hashes user/host/port), shared by
+# ssh_run, scp_to_pod, the runpod-<name> aliases and safe_rsync.sh.
+SSH_CONTROL_DIR = "~/.ssh/zombuul-cm"
+_SSH_CONTROL_PERSIST = "10m"
 USER_CONFIG = "~/.claude/zombuul.yaml"
-VALID_CONFIG_KEYS = {"volume_gb", "disk_gb", "docker_image", "gpu_count", "cpu_instance_id", "python_version", "ssh_key", "template_id"}
+VALID_CONFIG_KEYS = {"volume_gb", "disk_gb", "docker_image", "gpu_count", "cpu_instance_id", "python_version", "ssh_key", "template_id", "pod_cache_ttl", "pod_cache_persist", "venv_snapshot", "hf_cache_tier", "hf_cache_max_gb", "idle_pause_minutes", "pause_flush_paths"}
+# Pod metadata cache: reads within POD_CACHE_TTL seconds reuse the last API answer.
+# With POD_CACHE_PERSIST, the slimmed entries survive across CLI invocations.
+POD_CACHE_TTL = 5.0
+POD_CACHE_PERSIST = False
+POD_CACHE_FILE = "~/.cache/zombuul/pods.json"
+# Parsed defaults.yaml + user config, keyed by both files' mtimes, so most
+# invocations never import PyYAML. The RunPod SDK (~2s to import) and dotenv
+# are likewise imported only inside the functions that need them.
+CONFIG_CACHE_FILE = "~/.cache/zombuul/config.json"
+# Pods whose on-pod idle watchdog is armed ({pod_id: minutes}). A local pause or
+# terminate disarms the entry, so a pod still listed here once it has stopped was
+# stopped from the pod side, i.e. by the watchdog.
+IDLE_WATCH_FILE = "~/.cache/zombuul/idle-watch.json"
+# GPU types with price and stock, one entry per GPU count (prices are quoted for
+# that many GPUs). Prices and stock drift, so entries expire after GPU_CATALOGUE_TTL.
+GPU_CATALOGUE_FILE = "~/.cache/zombuul/gpus.json"
+GPU_CATALOGUE_TTL = 600
+
+
+_config_layers_memo: tuple[dict, dict] | None = None
+
+
+def _config_layers() -> tuple[dict, dict]:
+    """(shipped defaults, user overrides) — parsed at most once per process and cached on disk."""
+    global _config_layers_memo
+    if _config_layers_memo is not None:
+        return _config_layers_memo
+    shipped = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "defaults.yaml")
+    user_file = os.path.expanduser(USER_CONFIG)
+    stamp = [[path, st.st_mtime_ns, st.st_size] if (st := _stat_or_none(path)) else [path, None, None] for path in (shipped, user_file)]
 
+    cache_path = os.path.expanduser(CONFIG_CACHE_FILE)
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached["stamp"] == stamp:
+            _config_layers_memo = (cached["defaults"], cached["user"])
+            return _config_layers_memo
+    except (OSError, ValueError, KeyError):
+        pass
 
-def load_config() -> dict:
-    shipped = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "defaults.yaml")
+    import yaml
     with open(shipped) as f:
-        config = yaml.safe_load(f)
-
-    user_file = os.path.expanduser(USER_CONFIG)
+        defaults = yaml.safe_load(f)
+    user_overrides = {}
     if os.path.exists(user_file):
         with open(user_file) as f:
-            overrides = yaml.safe_load(f) or {}
+            user_overrides = yaml.safe_load(f) or {}
+    _config_layers_memo = (defaults, user_overrides)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"stamp": stamp, "defaults": defaults, "user": user_overrides}, f)
+        os.replace(tmp, cache_path)
+    except (OSError, TypeError):
+        pass
+    return _config_layers_memo
+
+
+def _stat_or_none(path: str) -> os.stat_result | None:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def load_config() -> dict:
+    defaults, overrides = _config_layers()
+    config = dict(defaults)
+    if overrides:
         unknown = set(overrides) - VALID_CONFIG_KEYS
         if unknown:
-            print(f"WARNING: Unknown keys in {user_file}: {', '.join(sorted(unknown))}")
+            print(f"WARNING: Unknown keys in {os.path.expanduser(USER_CONFIG)}: {', '.join(sorted(unknown))}")
         config.update(overrides)
     return config
 
 
 def show_config():
-    shipped = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "defaults.yaml")
-    with open(shipped) as f:
-        defaults = yaml.safe_load(f)
-
+    defaults, user_overrides = _config_layers()
     user_file = os.path.expanduser(USER_CONFIG)
-    user_overrides = {}
     if os.path.exists(user_file):
-        with open(user_file) as f:
-            user_overrides = yaml.safe_load(f) or {}
         print(f"Config: {user_file}")
     else:
         print(f"Config: defaults (no {USER_CONFIG})")
@@ -68,6 +163,11 @@ def show_config():
         print(f"  {k}: {v}{marker}")
 
 
+def load_dotenv(*args, **kwargs) -> bool:
+    from dotenv import load_dotenv as _load_dotenv
+    return _load_dotenv(*args, **kwargs)
+
+
 def load_api_key():
     # cwd .env wins over ~/.claude/.env (load_dotenv does not override existing keys).
     load_dotenv()
@@ -76,17 +176,32 @@ def load_api_key():
     if not key:
         print("ERROR: RUNPOD_API_KEY not found. Add it to ./.env or ~/.claude/.env")
         sys.exit(1)
+    import runpod
     runpod.api_key = key
 
 
 # --- SSH/SCP helpers ---
 
+def ssh_control_opts() -> list[str]:
+    """Connection-multiplexing options: the first connection to a pod becomes the master, later ones reuse it."""
+    return [
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={os.path.join(SSH_CONTROL_DIR, '%C')}",
+        "-o", f"ControlPersist={_SSH_CONTROL_PERSIST}",
+    ]
+
+
+def _ensure_control_dir() -> None:
+    os.makedirs(os.path.expanduser(SSH_CONTROL_DIR), mode=0o700, exist_ok=True)
+
+
 def ssh_cmd(ip: str, port: int) -> list[str]:
-    return ["ssh", f"root@{ip}", "-p", str(port), "-i", os.path.expanduser(SSH_KEY)] + SSH_OPTS
+    return ["ssh", f"root@{ip}", "-p", str(port), "-i", os.path.expanduser(SSH_KEY)] + SSH_OPTS + ssh_control_opts()
 
 
 def scp_to_pod(ip: str, port: int, local_path: str, remote_path: str):
-    scp_opts = ["-o", "StrictHostKeyChecking=no", "-i", os.path.expanduser(SSH_KEY)]
+    _ensure_control_dir()
+    scp_opts = ["-o", "StrictHostKeyChecking=no", "-i", os.path.expanduser(SSH_KEY)] + ssh_control_opts()
     subprocess.run(
         ["scp", "-P", str(port)] + scp_opts + [local_path, f"root@{ip}:{remote_path}"],
         check=True,
@@ -96,11 +211,50 @@ def scp_to_pod(ip: str, port: int, local_path: str, remote_path: str):
 def ssh_run(ip: str, port: int, command: str | list[str], **kwargs) -> subprocess.CompletedProcess:
     if isinstance(command, list):
         command = " ".join(shlex.quote(c) for c in command)
+    _ensure_control_dir()
     return subprocess.run(ssh_cmd(ip, port) + [command], **kwargs)
 
 
+def _ssh_master_ctl(ip: str, port: int, op: str) -> subprocess.CompletedProcess:
+    """Send a control command (`check`, `exit`) to the pod's ControlMaster. Never opens a connection."""
+    return subprocess.run(
+        ["ssh", "-O", op, f"root@{ip}", "-p", str(port), "-o", f"ControlPath={os.path.join(SSH_CONTROL_DIR, '%C')}"],
+        capture_output=True, text=True, timeout=10,
+    )
+
+
+def ssh_master_alive(ip: str, port: int) -> bool:
+    try:
+        return _ssh_master_ctl(ip, port, "check").returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def close_ssh_master(ip: str, port: int) -> None:
+    """Tear down the pod's ControlMaster if one is running (best-effort)."""
+    if not ssh_master_alive(ip, port):
+        return
+    try:
+        _ssh_master_ctl(ip, port, "exit")
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def _close_pod_master(pod_id: str) -> None:
+    """Close the master for a pod that is about to be paused/terminated; its endpoint dies with it."""
+    try:
+        ip, port = get_ssh_info(pod_id)
+    except Exception:
+        return
+    if ip:
+        close_ssh_master(ip, port)
+
+
 # --- Pod info ---
 
+POD_ENV_KEYS = ("HF_TOKEN", "GH_TOKEN", "SLACK_BOT_TOKEN", "SLACK_CHANNEL_ID", "RUNPOD_API_KEY", "GIT_USER_NAME", "GIT_USER_EMAIL")
+
+
 def get_pod_env() -> dict[str, str]:
     """Collect tokens + git identity for the pod from environment, project .env, and ~/.claude/.env.
 
@@ -112,7 +266,7 @@ def get_pod_env() -> dict[str, str]:
     """
     load_dotenv()  # load project .env into os.environ (no-op for already-set vars)
     load_dotenv(os.path.expanduser("~/.claude/.env"))  # global .env (no-op for already-set vars)
-    env = {k: v for k in ("HF_TOKEN", "GH_TOKEN", "SLACK_BOT_TOKEN", "SLACK_CHANNEL_ID", "RUNPOD_API_KEY", "GIT_USER_NAME", "GIT_USER_EMAIL") if (v := os.environ.get(k))}
+    env = {k: v for k in POD_ENV_KEYS if (v := os.environ.get(k))}
     for git_key, config_key in (("GIT_USER_NAME", "user.name"), ("GIT_USER_EMAIL", "user.email")):
         if git_key not in env:
             try:
@@ -127,9 +281,108 @@ def get_pod_env() -> dict[str, str]:
     return env
 
 
-def get_ssh_info(pod_id: str) -> tuple[str | None, int | None]:
-    info = runpod.get_pod(pod_id)
-    runtime = info.get("runtime")
+# --- Pod state cache ---
+
+_pod_cache: dict[str, tuple[float, dict]] = {}  # pod_id -> (fetched_at, slim pod)
+_pod_list_fetched_at: float | None = None
+_pod_cache_loaded = False
+_POD_CACHE_LOCK = threading.Lock()
+
+
+def _slim_pod(pod: dict) -> dict:
+    """Keep only what the CLI reads back (id, name, status, SSH ports, GPU). Drops `env`, which holds tokens."""
+    runtime = pod.get("runtime") or {}
+    return {
+        "id": pod["id"],
+        "name": pod.get("name", ""),
+        "desiredStatus": pod.get("desiredStatus", "UNKNOWN"),
+        "lastStatusChange": pod.get("lastStatusChange") or "",
+        "runtime": {"ports": runtime.get("ports") or []} if runtime else None,
+        "machine": {"gpuDisplayName": (pod.get("machine") or {}).get("gpuDisplayName", "?")},
+    }
+
+
+def _load_pod_cache() -> None:
+    global _pod_list_fetched_at, _pod_cache_loaded
+    if _pod_cache_loaded or not POD_CACHE_PERSIST:
+        return
+    _pod_cache_loaded = True
+    try:
+        with open(os.path.expanduser(POD_CACHE_FILE)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    for pod_id, (fetched_at, pod) in data.get("pods", {}).items():
+        _pod_cache.setdefault(pod_id, (fetched_at, pod))
+    if _pod_list_fetched_at is None:
+        _pod_list_fetched_at = data.get("list_fetched_at")
+
+
+def _save_pod_cache() -> None:
+    if not POD_CACHE_PERSIST:
+        return
+    path = os.path.expanduser(POD_CACHE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"list_fetched_at": _pod_list_fetched_at, "pods": _pod_cache}, f)
+    os.replace(tmp, path)
+
+
+def fetch_pod(pod_id: str, max_age: float | None = None) -> dict | None:
+    """Pod metadata, served from cache if younger than `max_age` (default POD_CACHE_TTL; 0 forces a fetch)."""
+    import runpod
+    max_age = POD_CACHE_TTL if max_age is None else max_age
+    with _POD_CACHE_LOCK:
+        _load_pod_cache()
+        hit = _pod_cache.get(pod_id)
+    if hit and time.time() - hit[0] < max_age:
+        return hit[1]
+    pod = runpod.get_pod(pod_id)
+    if not pod:
+        return None
+    slim = _slim_pod({"id": pod_id, **pod})
+    with _POD_CACHE_LOCK:
+        _pod_cache[pod_id] = (time.time(), slim)
+        _save_pod_cache()
+    return slim
+
+
+def fetch_pods(max_age: float | None = None) -> list[dict]:
+    """All pods, served from cache if the last full listing is younger than `max_age`."""
+    import runpod
+    global _pod_list_fetched_at
+    max_age = POD_CACHE_TTL if max_age is None else max_age
+    with _POD_CACHE_LOCK:
+        _load_pod_cache()
+        if _pod_list_fetched_at is not None and time.time() - _pod_list_fetched_at < max_age:
+            return [pod for _, pod in _pod_cache.values()]
+    pods = [_slim_pod(p) for p in runpod.get_pods() or []]
+    now = time.time()
+    with _POD_CACHE_LOCK:
+        _pod_cache.clear()
+        for pod in pods:
+            _pod_cache[pod["id"]] = (now, pod)
+        _pod_list_fetched_at = now
+        _save_pod_cache()
+    return pods
+
+
+def invalidate_pod_cache(pod_id: str | None = None) -> None:
+    """Forget one pod (or everything) after a state change; the full listing is always dropped."""
+    global _pod_list_fetched_at
+    with _POD_CACHE_LOCK:
+        _load_pod_cache()
+        if pod_id is None:
+            _pod_cache.clear()
+        else:
+            _pod_cache.pop(pod_id, None)
+        _pod_list_fetched_at = None
+        _save_pod_cache()
+
+
+def _ssh_endpoint(pod: dict | None) -> tuple[str | None, int | None]:
+    runtime = (pod or {}).get("runtime")
     if runtime and runtime.get("ports"):
         for port in runtime["ports"]:
             if port["privatePort"] == 22 and port["isIpPublic"]:
@@ -137,27 +390,97 @@ def get_ssh_info(pod_id: str) -> tuple[str | None, int | None]:
     return None, None
 
 
-def wait_for_ssh(pod_id: str) -> tuple[str | None, int | None]:
-    for _ in range(60):
-        ip, port = get_ssh_info(pod_id)
+def get_ssh_info(pod_id: str, max_age: float | None = None) -> tuple[str | None, int | None]:
+    return _ssh_endpoint(fetch_pod(pod_id, max_age))
+
+
+# --- Readiness probing ---
+
+_READY_POLL_INITIAL = 1.0
+_READY_POLL_MAX = 10.0
+_READY_TIMEOUT = 720.0
+
+
+def _backoff(initial: float = _READY_POLL_INITIAL, cap: float = _READY_POLL_MAX):
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * 2, cap)
+
+
+def _sleep_within(delay: float, deadline: float) -> bool:
+    """Sleep `delay` seconds, clipped to the deadline. False if the deadline has already passed."""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return False
+    time.sleep(min(delay, remaining))
+    return True
+
+
+def tcp_probe(ip: str, port: int, timeout: float = 3.0) -> bool:
+    """True if something at ip:port accepts a TCP connection and greets with an SSH banner.
+
+    Costs one round-trip; a closed or still-proxied port fails here in milliseconds
+    instead of burning a full SSH ConnectTimeout.
+    """
+    try:
+        with socket.create_connection((ip, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            return sock.recv(64).startswith(b"SSH-")
+    except OSError:
+        return False
+
+
+def probe_readiness(pod_id: str, timeout: float = _READY_TIMEOUT) -> dict:
+    """Wait for a pod's SSH in three stages — API endpoint, TCP banner, full SSH login.
+
+    Polls with exponential backoff (1s doubling to 10s) under one overall deadline.
+    Returns {"ip", "port", "endpoint_s", "tcp_s", "ssh_s"}; each `*_s` is seconds
+    from the call until that stage passed, or None if it never did.
+    """
+    start = time.time()
+    deadline = start + timeout
+    timing = {"ip": None, "port": None, "endpoint_s": None, "tcp_s": None, "ssh_s": None}
+
+    delays = _backoff()
+    last_status = None
+    max_age = None  # the first poll may be answered from cache; later ones must be fresh
+    while True:
+        pod = fetch_pod(pod_id, max_age=max_age)
+        max_age = 0
+        ip, port = _ssh_endpoint(pod)
         if ip:
             break
-        info = runpod.get_pod(pod_id)
-        status = info.get("desiredStatus", "UNKNOWN")
-        print(f"  Status: {status}... waiting 10s")
-        time.sleep(10)
-    else:
+        status = (pod or {}).get("desiredStatus", "UNKNOWN")
+        if status != last_status:
+            print(f"  Status: {status}... waiting for SSH endpoint")
+            last_status = status
+        if not _sleep_within(next(delays), deadline):
+            return timing
+    timing.update(ip=ip, port=port, endpoint_s=round(time.time() - start, 1))
+
+    delays = _backoff()
+    while True:
+        if timing["tcp_s"] is None and tcp_probe(ip, port):
+            timing["tcp_s"] = round(time.time() - start, 1)
+        if timing["tcp_s"] is not None:
+            result = ssh_run(ip, port, ["echo", "ok"], capture_output=True, text=True, timeout=10)
+            if result.returncode == 0:
+                timing["ssh_s"] = round(time.time() - start, 1)
+                return timing
+        if not _sleep_within(next(delays), deadline):
+            return timing
+
+
+def wait_for_ssh(pod_id: str, timeout: float = _READY_TIMEOUT) -> tuple[str | None, int | None]:
+    timing = probe_readiness(pod_id, timeout)
+    if not timing["ip"]:
         return None, None
-
-    for attempt in range(12):
-        result = ssh_run(ip, port, ["echo", "ok"], capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            return ip, port
-        print(f"  SSH not accepting connections yet... waiting 5s (attempt {attempt + 1}/12)")
-        time.sleep(5)
-
-    print("  WARNING: SSH port reported but not accepting connections.")
-    return ip, port
+    stages = " ".join(f"{k}={'-' if timing[f'{k}_s'] is None else str(timing[f'{k}_s']) + 's'}" for k in ("endpoint", "tcp", "ssh"))
+    print(f"  Readiness: {stages}")
+    if timing["ssh_s"] is None:
+        print("  WARNING: SSH port reported but not accepting connections.")
+    return timing["ip"], timing["port"]
 
 
 # --- Setup steps ---
@@ -213,15 +536,19 @@ def extract_claude_credentials() -> str | None:
     return None
 
 
-def find_setup_script() -> str:
-    """Find pod_setup.sh next to this script."""
-    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pod_setup.sh")
+def find_pod_script(filename: str) -> str:
+    """Find a pod-side helper (pod_setup.sh, hf_cache_tier.py, ...) next to this script."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
     if not os.path.exists(path):
-        print(f"ERROR: pod_setup.sh not found at {path}")
+        print(f"ERROR: {filename} not found at {path}")
         sys.exit(1)
     return path
 
 
+def find_setup_script() -> str:
+    return find_pod_script("pod_setup.sh")
+
+
 def get_repo_url() -> str:
     """Get the git remote URL of the current working directory."""
     try:
@@ -237,11 +564,13 @@ def get_repo_url() -> str:
     sys.exit(1)
 
 
-def setup_pod(ip: str, port: int, repo_url: str, branch: str, python_version: str = "3.11", install_claude: bool = False, extras: str = "auto"):
+def setup_pod(ip: str, port: int, repo_url: str, branch: str, python_version: str = "3.11", install_claude: bool = False, extras: str = "auto", venv_snapshot: bool = True, idle_pause_minutes: int = 0):
     setup_script = find_setup_script()
 
     print("  Copying pod_setup.sh...")
     scp_to_pod(ip, port, setup_script, "/pod_setup.sh")
+    scp_to_pod(ip, port, find_pod_script("hf_cache_tier.py"), "/hf_cache_tier.py")
+    scp_to_pod(ip, port, find_pod_script("pod_metrics.py"), "/pod_metrics.py")
 
     if install_claude:
         creds_file = extract_claude_credentials()
@@ -253,52 +582,249 @@ def setup_pod(ip: str, port: int, repo_url: str, branch: str, python_version: st
             print("  WARNING: No Claude Code credentials found, skipping auth.")
 
     install_claude_flag = "true" if install_claude else "false"
-    print(f"  Running pod_setup.sh in background (repo: {repo_url}, branch: {branch}, python: {python_version}, install_claude: {install_claude_flag}, extras: {extras})...")
-    cmd = f"nohup bash /pod_setup.sh {shlex.quote(repo_url)} {shlex.quote(branch)} {shlex.quote(python_version)} {shlex.quote(install_claude_flag)} {shlex.quote(extras)} </dev/null > /var/log/pod_setup.log 2>&1 & disown"
+    venv_snapshot_flag = "true" if venv_snapshot else "false"
+    print(f"  Running pod_setup.sh in background (repo: {repo_url}, branch: {branch}, python: {python_version}, install_claude: {install_claude_flag}, extras: {extras}, venv_snapshot: {venv_snapshot_flag}, idle_pause_minutes: {idle_pause_minutes})...")
+    cmd = f"nohup bash /pod_setup.sh {shlex.quote(repo_url)} {shlex.quote(branch)} {shlex.quote(python_version)} {shlex.quote(install_claude_flag)} {shlex.quote(extras)} {venv_snapshot_flag} {int(idle_pause_minutes)} </dev/null > /var/log/pod_setup.log 2>&1 & disown"
     ssh_run(ip, port, cmd, capture_output=True, text=True)
     print("  Setup running. Check /var/log/pod_setup.log on the pod.")
 
 
+# --- Pod metrics ---
+
+_METRICS_SCRIPT = "/workspace/.zombuul/pod_metrics.py"  # pod_setup.sh keeps it on /workspace so it survives pause
+
+
+def start_metrics_sampler(ip: str, port: int) -> None:
+    """Install pod_metrics.py on /workspace and start its sampler (a no-op on the pod if one is running)."""
+    scp_to_pod(ip, port, find_pod_script("pod_metrics.py"), "/tmp/pod_metrics.py")
+    remote_dir = os.path.dirname(_METRICS_SCRIPT)
+    ssh_run(ip, port, f"mkdir -p {remote_dir} && mv /tmp/pod_metrics.py {_METRICS_SCRIPT} && "
+                      f"(setsid nohup python3 {_METRICS_SCRIPT} sample </dev/null >/dev/null 2>&1 &)",
+            capture_output=True, text=True, timeout=30)
+
+
+def pod_metrics(pod_id: str, since_minutes: float = 60, as_json: bool = False):
+    """Print the sampler's summary for the last `since_minutes` (one SSH call)."""
+    ip, port = get_ssh_info(pod_id)
+    if not ip:
+        print(f"Pod {pod_id} has no public SSH port.")
+        sys.exit(1)
+    cmd = ["python3", _METRICS_SCRIPT, "summary", "--since", str(int(since_minutes * 60))] + (["--json"] if as_json else [])
+    result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0 and "No such file" in result.stderr:
+        print("No metrics sampler on this pod (it was set up before the sampler existed); starting one now.")
+        start_metrics_sampler(ip, port)
+        print("Run `metrics` again in a few minutes.")
+        return
+    if result.returncode != 0:
+        print(f"ERROR: could not read metrics: {result.stderr.strip()}")
+        sys.exit(1)
+    print(result.stdout.rstrip())
+
+
+# --- HF cache tier ---
+
+def run_hf_cache_tier(ip: str, port: int, action: str, max_gb: float | None = None) -> bool:
+    """Run hf_cache_tier.py `save`/`restore`/`status` on the pod, echoing its report. True on success."""
+    try:
+        scp_to_pod(ip, port, find_pod_script("hf_cache_tier.py"), "/hf_cache_tier.py")
+        cmd = ["env", "HF_HOME=/opt/hf_cache", "python3", "/hf_cache_tier.py", action]
+        if max_gb is not None:
+            cmd += ["--max-gb", str(max_gb)]
+        result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=3600)
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"  WARNING: hf-cache {action} failed: {e}")
+        return False
+    for line in (result.stdout + result.stderr).strip().splitlines():
+        print(f"  {line}")
+    return result.returncode == 0
+
+
+def hf_cache(pod_id: str, action: str, max_gb: float | None = None):
+    ip, port = get_ssh_info(pod_id)
+    if not ip:
+        print(f"ERROR: Pod {pod_id} has no public SSH port.")
+        sys.exit(1)
+    if not run_hf_cache_tier(ip, port, action, max_gb=max_gb if action == "save" else None):
+        sys.exit(1)
+
+
+# --- Container-disk flush ---
+
+_FLUSH_SCRIPT = "/workspace/.zombuul/disk_flush.py"
+
+
+def flush_container_disk(ip: str, port: int, paths: list[str]) -> bool:
+    """Mirror container-disk `paths` into /workspace with disk_flush.py, echoing its report. True on success.
+
+    The script copy stays on /workspace, where restore_container_disk finds it after a resume.
+    """
+    try:
+        scp_to_pod(ip, port, find_pod_script("disk_flush.py"), "/tmp/disk_flush.py")
+        cmd = f"mkdir -p {os.path.dirname(_FLUSH_SCRIPT)} && mv /tmp/disk_flush.py {_FLUSH_SCRIPT} && python3 {_FLUSH_SCRIPT} save " + " ".join(shlex.quote(p) for p in paths)
+        result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=3600)
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"  WARNING: container-disk flush failed: {e}")
+        return False
+    for line in (result.stdout + result.stderr).strip().splitlines():
+        print(f"  {line}")
+    return result.returncode == 0
+
+
+def restore_container_disk(ip: str, port: int) -> bool:
+    """Copy the paths the last `pause` flushed back onto container disk, echoing the report. True on success.
+
+    disk_flush.py marks its manifest once restored, so a later resume without a new flush does nothing.
+    """
+    try:
+        result = ssh_run(ip, port, f"[ ! -f {_FLUSH_SCRIPT} ] || python3 {_FLUSH_SCRIPT} restore", capture_output=True, text=True, timeout=3600)
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"  WARNING: restoring flushed paths failed: {e}")
+        return False
+    for line in (result.stdout + result.stderr).strip().splitlines():
+        print(f"  {line}")
+    if result.returncode != 0:
+        print("  WARNING: flushed container-disk paths not restored; they are still on /workspace/.zombuul/container-disk.")
+    return result.returncode == 0
+
+
+# --- GPU catalogue ---
+
+_GPU_CATALOGUE_QUERY = """
+query GpuTypes {
+  gpuTypes {
+    id
+    displayName
+    memoryInGb
+    maxGpuCount
+    lowestPrice(input: {gpuCount: %d}) {
+      uninterruptablePrice
+      minimumBidPrice
+      stockStatus
+    }
+  }
+}
+"""
+# lowestPrice.stockStatus values, best first; None means no machine can take the request.
+_STOCK_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+
+def fetch_gpu_catalogue(count: int = 1, max_age: float = GPU_CATALOGUE_TTL) -> list[dict]:
+    """GPU types with on-demand price and stock for `count` GPUs, one API call, cached on disk for `max_age`."""
+    path = os.path.expanduser(GPU_CATALOGUE_FILE)
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    entry = cache.get(str(count))
+    if entry and time.time() - entry["fetched_at"] < max_age:
+        return entry["gpus"]
+
+    load_api_key()  # only on a miss: a cached answer never imports the SDK
+    from runpod.api.graphql import run_graphql_query
+    raw = run_graphql_query(_GPU_CATALOGUE_QUERY % count)["data"]["gpuTypes"]
+    gpus = []
+    for g in raw:
+        if g["id"] == "unknown":
+            continue
+        lowest = g.get("lowestPrice") or {}
+        price = lowest.get("uninterruptablePrice")
+        gpus.append({
+            "id": g["id"],
+            "name": g.get("displayName") or g["id"],
+            "vram_gb": g.get("memoryInGb") or 0,
+            "max_count": g.get("maxGpuCount") or 0,
+            "price_hr": round(price, 3) if price else None,  # for all `count` GPUs
+            "spot_price_hr": lowest.get("minimumBidPrice"),
+            "stock": lowest.get("stockStatus") if price else None,
+        })
+    cache[str(count)] = {"fetched_at": time.time(), "gpus": gpus}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+    return gpus
+
+
+def rank_gpus(gpus: list[dict], *, min_vram: float = 0, max_price: float | None = None, count: int = 1, in_stock: bool = False) -> list[dict]:
+    """Filter to GPU types that fit, then rank: in stock first, cheapest next, more VRAM breaking ties."""
+    fits = [
+        g for g in gpus
+        if g["vram_gb"] >= min_vram
+        and (not g["max_count"] or g["max_count"] >= count)
+        and (max_price is None or (g["price_hr"] is not None and g["price_hr"] <= max_price))
+        and (not in_stock or g["stock"] is not None)
+    ]
+    return sorted(fits, key=lambda g: (
+        _STOCK_RANK.get(g["stock"], len(_STOCK_RANK)),
+        g["price_hr"] if g["price_hr"] is not None else float("inf"),
+        -g["vram_gb"],
+    ))
+
+
+def list_gpus(min_vram: float = 0, max_price: float | None = None, count: int = 1, in_stock: bool = False, as_json: bool = False, refresh: bool = False):
+    gpus = rank_gpus(
+        fetch_gpu_catalogue(count, max_age=0 if refresh else GPU_CATALOGUE_TTL),
+        min_vram=min_vram, max_price=max_price, count=count, in_stock=in_stock,
+    )
+    if as_json:
+        print(json.dumps(gpus, indent=2))
+        return
+    if not gpus:
+        print("No GPU type matches those filters.")
+        return
+    print(f"  {'GPU TYPE ID':45s} {'VRAM':>6s} {f'$/HR x{count}':>9s} STOCK")
+    for g in gpus:
+        price = f"{g['price_hr']:.2f}" if g["price_hr"] is not None else "-"
+        print(f"  {g['id']:45s} {g['vram_gb']:>4}GB {price:>9s} {g['stock'] or 'none'}")
+
+
 # --- Commands ---
 
-def list_gpus():
-    gpus = runpod.get_gpus()
-    for gpu in sorted(gpus, key=lambda g: g["memoryInGb"]):
-        print(f"  {gpu['id']:45s} {gpu['memoryInGb']}GB")
+def _pod_create_kwargs(name: str, gpu_type_id: str | None, image_name: str, *, volume_gb: int, disk_gb: int, gpu_count: int, cpu_instance_id: str, template_id: str | None, env: dict[str, str]) -> dict:
+    kwargs = dict(
+        name=name,
+        image_name=image_name,
+        gpu_type_id=gpu_type_id,
+        cloud_type="ALL",
+        gpu_count=gpu_count if gpu_type_id else 0,
+        volume_in_gb=volume_gb,
+        container_disk_in_gb=disk_gb,
+        volume_mount_path="/workspace",
+        ports="8888/http,22/tcp",
+        start_ssh=True,
+        support_public_ip=True,
+        env=env,
+    )
+    if template_id:
+        kwargs["template_id"] = template_id
+    if not gpu_type_id:
+        kwargs["instance_id"] = cpu_instance_id
+        kwargs["container_disk_in_gb"] = min(disk_gb, 20)
+    return kwargs
 
 
-def create_pod(name: str, gpu_type_id: str | None, image_name: str, repo_url: str, branch: str, *, python_version: str = "3.11", volume_gb: int = 100, disk_gb: int = 200, gpu_count: int = 1, cpu_instance_id: str = "cpu3c-2-4", template_id: str | None = None, install_claude: bool = False, extras: str = "auto"):
+def create_pod(name: str, gpu_type_id: str | None, image_name: str, repo_url: str, branch: str, *, python_version: str = "3.11", volume_gb: int = 100, disk_gb: int = 200, gpu_count: int = 1, cpu_instance_id: str = "cpu3c-2-4", template_id: str | None = None, install_claude: bool = False, extras: str = "auto", venv_snapshot: bool = True, idle_pause_minutes: int = 0):
+    import runpod
     kind = gpu_type_id or "CPU-only"
     if template_id:
         print(f"Creating pod '{name}' with {kind} (template: {template_id})...")
     else:
         print(f"Creating pod '{name}' with {kind}...")
     try:
-        kwargs = dict(
-            name=name,
-            image_name=image_name,
-            gpu_type_id=gpu_type_id,
-            cloud_type="ALL",
-            gpu_count=gpu_count if gpu_type_id else 0,
-            volume_in_gb=volume_gb,
-            container_disk_in_gb=disk_gb,
-            volume_mount_path="/workspace",
-            ports="8888/http,22/tcp",
-            start_ssh=True,
-            support_public_ip=True,
-            env=get_pod_env(),
-        )
-        if template_id:
-            kwargs["template_id"] = template_id
-        if not gpu_type_id:
-            kwargs["instance_id"] = cpu_instance_id
-            kwargs["container_disk_in_gb"] = min(disk_gb, 20)
-        pod = runpod.create_pod(**kwargs)
+        pod = runpod.create_pod(**_pod_create_kwargs(
+            name, gpu_type_id, image_name,
+            volume_gb=volume_gb, disk_gb=disk_gb, gpu_count=gpu_count,
+            cpu_instance_id=cpu_instance_id, template_id=template_id, env=get_pod_env(),
+        ))
     except Exception as e:
         print(f"ERROR creating pod: {e}")
         sys.exit(1)
 
     pod_id = pod["id"]
+    invalidate_pod_cache(pod_id)
     print(f"Pod created: {pod_id}")
     print("Waiting for SSH to be ready...")
 
@@ -314,30 +840,148 @@ def create_pod(name: str, gpu_type_id: str | None, image_name: str, repo_url: st
     print(f"  SSH: ssh runpod-{name}")
 
     try:
-        setup_pod(ip, port, repo_url, branch, python_version, install_claude=install_claude, extras=extras)
+        setup_pod(ip, port, repo_url, branch, python_version, install_claude=install_claude, extras=extras, venv_snapshot=venv_snapshot, idle_pause_minutes=idle_pause_minutes)
+        _set_idle_watch(pod_id, idle_pause_minutes)
     except Exception as e:
         print(f"  WARNING: Setup failed: {e}")
         print(f"  Pod is still running. SSH in and run setup manually.")
 
 
+def _fleet_member(name: str, create_kwargs: dict, repo_url: str, branch: str, start: float, *, python_version: str, install_claude: bool, extras: str, venv_snapshot: bool, idle_pause_minutes: int) -> dict:
+    """Bring up one fleet pod end to end. Never raises: failures are recorded in the returned row."""
+    import runpod
+    _print_ctx.prefix = f"[{name}] "
+    row = {"name": name, "pod_id": None, "ready_s": None, "setup": "-", "error": None}
+    try:
+        pod = runpod.create_pod(**create_kwargs)
+        row["pod_id"] = pod["id"]
+        invalidate_pod_cache(pod["id"])
+        print(f"Pod created: {pod['id']}")
+        ip, port = wait_for_ssh(pod["id"])
+        if not ip:
+            row["error"] = "timed out waiting for SSH"
+            return row
+        row["ready_s"] = int(time.time() - start)
+        _write_ssh_alias(name, ip, port)
+        print(f"SSH ready after {row['ready_s']}s: ssh runpod-{name}")
+        setup_pod(ip, port, repo_url, branch, python_version, install_claude=install_claude, extras=extras, venv_snapshot=venv_snapshot, idle_pause_minutes=idle_pause_minutes)
+        _set_idle_watch(pod["id"], idle_pause_minutes)
+        row["setup"] = "started"
+    except Exception as e:
+        row["error"] = str(e) or type(e).__name__
+        print(f"ERROR: {row['error']}")
+    finally:
+        _print_ctx.prefix = ""
+    return row
+
+
+def create_fleet(name: str, count: int, gpu_type_id: str | None, image_name: str, repo_url: str, branch: str, *, python_version: str = "3.11", volume_gb: int = 100, disk_gb: int = 200, gpu_count: int = 1, cpu_instance_id: str = "cpu3c-2-4", template_id: str | None = None, install_claude: bool = False, extras: str = "auto", venv_snapshot: bool = True, idle_pause_minutes: int = 0):
+    """Create `count` pods named `<name>-1..N` concurrently.
+
+    Each pod is created, waited on and set up in its own thread, so setup starts
+    as soon as that pod's SSH is up and one failing pod never holds up the rest.
+    """
+    kind = gpu_type_id or "CPU-only"
+    names = [f"{name}-{i}" for i in range(1, count + 1)]
+    print(f"Creating {count} pods with {kind}: {', '.join(names)}")
+    env = get_pod_env()
+    start = time.time()
+    rows = []
+    with _tagged_stdout(), ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [
+            pool.submit(
+                _fleet_member, n,
+                _pod_create_kwargs(
+                    n, gpu_type_id, image_name,
+                    volume_gb=volume_gb, disk_gb=disk_gb, gpu_count=gpu_count,
+                    cpu_instance_id=cpu_instance_id, template_id=template_id, env=env,
+                ),
+                repo_url, branch, start,
+                python_version=python_version, install_claude=install_claude, extras=extras, venv_snapshot=venv_snapshot,
+                idle_pause_minutes=idle_pause_minutes,
+            )
+            for n in names
+        ]
+        for fut in as_completed(futures):
+            rows.append(fut.result())
+
+    rows.sort(key=lambda r: names.index(r["name"]))
+    print(f"\nFleet summary ({int(time.time() - start)}s):")
+    print(f"  {'NAME':30s} {'POD ID':25s} {'READY':>7s} {'SETUP':8s} ERROR")
+    for r in rows:
+        ready = f"{r['ready_s']}s" if r["ready_s"] is not None else "-"
+        print(f"  {r['name']:30s} {r['pod_id'] or '-':25s} {ready:>7s} {r['setup']:8s} {r['error'] or ''}")
+    failed = [r for r in rows if r["error"]]
+    if failed:
+        print(f"{len(failed)}/{count} pods failed; the rest are up.")
+        sys.exit(1)
+
+
+_IDLE_WATCH_LOCK = threading.Lock()
+
+
+def _idle_watch() -> dict[str, dict]:
+    """{pod_id: {"minutes": N, "idle_paused_at": stamp}}; ledgers from before idle_paused_at hold bare minutes."""
+    try:
+        with open(os.path.expanduser(IDLE_WATCH_FILE)) as f:
+            watch = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {pod_id: entry if isinstance(entry, dict) else {"minutes": entry} for pod_id, entry in watch.items()}
+
+
+def _set_idle_watch(pod_id: str, minutes: int | None, idle_paused_at: str | None = None) -> None:
+    """Arm (minutes > 0) or disarm the local record of a pod's idle watchdog.
+
+    idle_paused_at is when the watchdog last paused the pod, as `resume` reads it from the pod's marker.
+    """
+    with _IDLE_WATCH_LOCK:
+        watch = _idle_watch()
+        if minutes or idle_paused_at:
+            watch[pod_id] = {"minutes": int(minutes or 0)} | ({"idle_paused_at": idle_paused_at} if idle_paused_at else {})
+        elif watch.pop(pod_id, None) is None:
+            return
+        path = os.path.expanduser(IDLE_WATCH_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(watch, f)
+        os.replace(tmp, path)
+
+
 def list_pods():
-    pods = runpod.get_pods()
+    pods = fetch_pods()
     if not pods:
         print("No pods found.")
         return
+    watch = _idle_watch()
     for pod in pods:
         status = pod.get("desiredStatus", "UNKNOWN")
         gpu = pod.get("machine", {}).get("gpuDisplayName", "?")
         name = pod.get("name", "")
-        ssh_hint = f"ssh runpod-{name}" if status == "RUNNING" and name else ""
-        print(f"  {pod['id']:25s} {pod['name']:30s} {status:10s} {gpu:30s} {ssh_hint}")
-
-
-def _write_ssh_alias(name: str, ip: str, port: int) -> None:
-    """Replace any existing `Host runpod-<name>` block in ~/.ssh/config with a fresh one."""
-    alias = f"runpod-{name}"
-    block = (
-        f"\nHost {alias}\n"
+        hint = f"ssh runpod-{name}" if status == "RUNNING" and name else ""
+        entry = watch.get(pod["id"], {})
+        if status == "EXITED" and entry.get("minutes"):
+            # Stopped without a local pause, by the idle watchdog or launch_on_pod.sh's exit trap.
+            # Which one is only known once `resume` reads the watchdog's marker on /workspace.
+            # "Exited by user: Sat Oct 18 2026 09:12:03 GMT+0000 (Coordinated Universal Time)"
+            when = pod.get("lastStatusChange", "").split(": ", 1)[-1].split(" (")[0]
+            hint = f"stopped on pod {when}".rstrip()
+        if entry.get("idle_paused_at"):
+            hint = f"{hint}  idle-paused {entry['idle_paused_at']}".strip()
+        print(f"  {pod['id']:25s} {pod['name']:30s} {status:10s} {gpu:30s} {hint}")
+
+
+# zombuul's runpod-<name> Host blocks live in their own file, pulled into
+# ~/.ssh/config by a single Include line, so updates never rewrite the user's config.
+SSH_ALIAS_FILE = "~/.ssh/zombuul_hosts"
+_SSH_ALIAS_INCLUDE = "# runpod-* aliases, managed by zombuul\nInclude zombuul_hosts\n"
+_SSH_CONFIG_LOCK = threading.Lock()
+
+
+def _ssh_alias_block(alias: str, ip: str, port: int) -> str:
+    return (
+        f"Host {alias}\n"
         f"    HostName {ip}\n"
         f"    User root\n"
         f"    Port {port}\n"
@@ -345,43 +989,120 @@ def _write_ssh_alias(name: str, ip: str, port: int) -> None:
         f"    StrictHostKeyChecking no\n"
         f"    ServerAliveInterval {_SSH_ALIVE_INTERVAL}\n"
         f"    ServerAliveCountMax {_SSH_ALIVE_COUNT_MAX}\n"
+        f"    ControlMaster auto\n"
+        f"    ControlPath {SSH_CONTROL_DIR}/%C\n"
+        f"    ControlPersist {_SSH_CONTROL_PERSIST}\n"
     )
+
+
+# A Host or Match line opens a new ssh_config section; keywords are case-insensitive and may be followed by "=".
+_SSH_SECTION_RE = re.compile(r"^\s*(host|match)(?:\s*=\s*|\s+)(.*?)\s*$", re.I)
+
+
+def _split_host_blocks(text: str) -> tuple[str, dict[str, str]]:
+    """Split zombuul's alias store into (preamble, {host pattern: block}), keeping block order.
+
+    Only for SSH_ALIAS_FILE, where every pattern is unique; the user's config goes through _ensure_ssh_include.
+    """
+    preamble, blocks, current = [], {}, None
+    for ln in text.splitlines(keepends=True):
+        section = _SSH_SECTION_RE.match(ln)
+        if section:
+            current = section.group(2)
+            blocks[current] = ln
+        elif current is None:
+            preamble.append(ln)
+        else:
+            blocks[current] += ln
+    return "".join(preamble), blocks
+
+
+def _atomic_write(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def _ensure_ssh_include(store: dict[str, str]) -> None:
+    """Add the Include line to ~/.ssh/config once, moving any old runpod-* Host stanzas into `store`.
+
+    Every other line of the user's file is kept byte for byte.
+    """
     cfg_path = os.path.expanduser("~/.ssh/config")
-    if not os.path.exists(cfg_path):
-        os.makedirs(os.path.dirname(cfg_path), exist_ok=True)
-        with open(cfg_path, "w") as f:
-            f.write(block.lstrip("\n"))
+    try:
+        with open(cfg_path) as f:
+            text = f.read()
+    except FileNotFoundError:
+        text = ""
+    if re.search(r"^\s*include\s+zombuul_hosts\s*$", text, re.I | re.M):
         return
+    kept, moved, moving, first_section = [], [], None, None
+    for ln in text.splitlines(keepends=True):
+        section = _SSH_SECTION_RE.match(ln)
+        if section:
+            patterns = section.group(2).split()
+            is_alias = section.group(1).lower() == "host" and len(patterns) == 1 and patterns[0].startswith("runpod-")
+            moving = [patterns[0], ""] if is_alias else None
+            if moving:
+                moved.append(moving)
+            elif first_section is None:
+                first_section = len(kept)
+        if moving:
+            moving[1] += ln
+        else:
+            kept.append(ln)
+    for host, block in moved:
+        store.setdefault(host, block.rstrip() + "\n")
+    # Include must come before any Host/Match line, or it only applies inside that section.
+    if first_section is not None:
+        kept.insert(first_section, _SSH_ALIAS_INCLUDE + "\n")
+    else:
+        if kept and not kept[-1].endswith("\n"):
+            kept.append("\n")
+        kept.append(("\n" if kept else "") + _SSH_ALIAS_INCLUDE)
+    _atomic_write(cfg_path, "".join(kept))
+
+
+def _update_ssh_aliases(upsert: dict[str, tuple[str, int]] | None = None, remove: list[str] | tuple[str, ...] = ()) -> None:
+    """Upsert {name: (ip, port)} and drop `remove` names in the alias store, in one locked read-modify-rename.
+
+    The threading lock covers fleet threads; the flock covers sibling processes
+    (parallel `create`/`resume` from other agents).
+    """
+    import fcntl
+    _ensure_control_dir()
+    path = os.path.expanduser(SSH_ALIAS_FILE)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    with _SSH_CONFIG_LOCK, open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                _, store = _split_host_blocks(f.read())
+        except FileNotFoundError:
+            store = {}
+        _ensure_ssh_include(store)
+        for name in remove:
+            store.pop(f"runpod-{name}", None)
+        for name, (ip, port) in (upsert or {}).items():
+            store[f"runpod-{name}"] = _ssh_alias_block(f"runpod-{name}", ip, port)
+        _atomic_write(path, "# Managed by zombuul (runpod_ctl.py); edits are overwritten.\n\n" + "\n".join(b.rstrip() + "\n" for b in store.values()))
 
-    with open(cfg_path) as f:
-        lines = f.readlines()
-
-    out: list[str] = []
-    in_target_block = False
-    for ln in lines:
-        stripped = ln.strip()
-        if stripped.startswith("Host "):
-            in_target_block = stripped == f"Host {alias}"
-            if not in_target_block:
-                out.append(ln)
-            continue
-        if not in_target_block:
-            out.append(ln)
 
-    body = "".join(out).rstrip()
-    body = body + "\n" + block if body else block.lstrip("\n")
-    with open(cfg_path, "w") as f:
-        f.write(body)
+def _write_ssh_alias(name: str, ip: str, port: int) -> None:
+    """Point the `runpod-<name>` alias at a pod's current endpoint."""
+    _update_ssh_aliases({name: (ip, port)})
 
 
 def refresh_ssh(pod_name: str) -> None:
-    """Look up pod by name and refresh its ~/.ssh/config alias with current IP/port.
+    """Look up pod by name and refresh its runpod-<name> SSH alias with current IP/port.
 
     Useful after a pause/resume cycle when RunPod assigns a fresh public SSH endpoint —
     saves the agent from having to manually edit ~/.ssh/config (and from being denied
     when permission rules treat `status` queries as resume attempts).
     """
-    pods = runpod.get_pods()
+    pods = fetch_pods()
     matches = [p for p in pods if p.get("name") == pod_name]
     if not matches:
         print(f"ERROR: no pod named {pod_name!r}.")
@@ -396,20 +1117,64 @@ def refresh_ssh(pod_name: str) -> None:
     if status != "RUNNING":
         print(f"ERROR: pod {pod_name} ({pod_id}) is {status}, not RUNNING. Resume first, then refresh-ssh.")
         sys.exit(2)
-    ip, port = get_ssh_info(pod_id)
+    ip, port = wait_for_ssh(pod_id, timeout=120)
     if not ip:
-        print(f"ERROR: pod {pod_id} has no public SSH endpoint yet. Wait ~30s after resume and retry.")
+        print(f"ERROR: pod {pod_id} has no public SSH endpoint after 120s. Check the RunPod dashboard.")
         sys.exit(2)
     _write_ssh_alias(pod_name, ip, port)
-    print(f"Updated ~/.ssh/config: runpod-{pod_name} → {ip}:{port}")
+    print(f"Updated SSH alias: runpod-{pod_name} → {ip}:{port}")
 
 
-def pause_pod(pod_id: str):
+def refresh_all_ssh() -> None:
+    """Rewrite every running pod's alias and drop aliases of pods that no longer exist, in one store update."""
+    pods = fetch_pods(max_age=0)
+    upsert = {}
+    for pod in pods:
+        ip, port = _ssh_endpoint(pod)
+        if pod.get("name") and pod.get("desiredStatus") == "RUNNING" and ip:
+            upsert[pod["name"]] = (ip, port)
+    try:
+        with open(os.path.expanduser(SSH_ALIAS_FILE)) as f:
+            _, store = _split_host_blocks(f.read())
+    except FileNotFoundError:
+        store = {}
+    names = {p.get("name") for p in pods}
+    gone = [h[len("runpod-"):] for h in store if h.startswith("runpod-") and h[len("runpod-"):] not in names]
+    _update_ssh_aliases(upsert, remove=gone)
+    for name, (ip, port) in upsert.items():
+        print(f"  runpod-{name} → {ip}:{port}")
+    for name in gone:
+        print(f"  runpod-{name} removed (pod no longer exists)")
+    print(f"Updated {os.path.expanduser(SSH_ALIAS_FILE)}: {len(upsert)} refreshed, {len(gone)} removed.")
+
+
+def pause_pod(pod_id: str, hf_cache_save: bool = False, hf_cache_max_gb: float | None = None, flush_paths: list[str] | tuple[str, ...] = ()):
+    import runpod
     print(f"Pausing pod {pod_id}...")
+    ip, port = get_ssh_info(pod_id) if hf_cache_save or flush_paths else (None, None)
+    if flush_paths:
+        if not ip:
+            print(f"ERROR: Pod {pod_id} has no public SSH port, so {', '.join(flush_paths)} can't be flushed to /workspace.")
+            print("Pod left running. Pass --no-flush to pause anyway.")
+            sys.exit(1)
+        print("Flushing container-disk paths to /workspace...")
+        if not flush_container_disk(ip, port, list(flush_paths)):
+            print("ERROR: flush failed (is the /workspace quota full?). Pod left running. Pass --no-flush to pause anyway.")
+            sys.exit(1)
+    if hf_cache_save and ip:
+        print("Saving HF cache to the /workspace tier...")
+        run_hf_cache_tier(ip, port, "save", max_gb=hf_cache_max_gb)
+    _close_pod_master(pod_id)
     runpod.stop_pod(pod_id)
+    invalidate_pod_cache(pod_id)
+    _set_idle_watch(pod_id, None)
     print("Pod paused. GPU billing stopped.")
     print("Note: /workspace volume preserved; container disk (/, /opt/, /root/) is WIPED on resume.")
-    print("If important experiment data lives on container disk, rsync it off-pod or to /workspace/ before pausing.")
+    print("The research venv is re-extracted from its /workspace snapshot by `resume`.")
+    if flush_paths:
+        print("`resume` copies the flushed paths back onto container disk.")
+    else:
+        print("If important experiment data lives on container disk, rsync it off-pod or list it in --flush / pause_flush_paths.")
     print("(Persistence is best-effort, not a guarantee — /workspace/ has its own pathologies.)")
 
 
@@ -418,12 +1183,39 @@ def terminate_pod(pod_id: str, yes: bool = False):
         print(f"ERROR: `terminate` destroys pod {pod_id} and all its disk contents.")
         print("Pass --yes to confirm.")
         sys.exit(2)
+    import runpod
     print(f"Terminating pod {pod_id}...")
+    pod = fetch_pod(pod_id)
+    _close_pod_master(pod_id)
     runpod.terminate_pod(pod_id)
+    invalidate_pod_cache(pod_id)
+    _set_idle_watch(pod_id, None)
+    if pod and pod.get("name"):
+        _update_ssh_aliases(remove=[pod["name"]])
     print("Pod terminated. Disk destroyed; all billing stopped.")
 
 
-def resume_pod(pod_id: str, gpu_count: int = 1):
+def restore_venv(ip: str, port: int) -> str:
+    """Re-extract the /workspace venv snapshot onto the freshly wiped container disk, timing it. Returns the pod's report."""
+    print("Restoring venv snapshot from /workspace...")
+    start = time.time()
+    try:
+        scp_to_pod(ip, port, find_setup_script(), "/pod_setup.sh")
+        result = ssh_run(ip, port, "bash /pod_setup.sh --restore-venv", capture_output=True, text=True, timeout=1800)
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"  WARNING: venv restore failed: {e}")
+        return ""
+    for line in result.stdout.strip().splitlines():
+        print(f"  {line}")
+    if result.returncode != 0:
+        print("  WARNING: venv not restored; re-run pod_setup.sh before using the venv.")
+    print(f"  venv restore: {time.time() - start:.1f}s")
+    return result.stdout
+
+
+def resume_pod(pod_id: str, gpu_count: int = 1, restore: bool = True, hf_cache_restore: bool = False, flush_restore: bool = True) -> tuple[str | None, int | None]:
+    """Resume a paused pod and wait for SSH. Returns its (ip, port), or (None, None) on timeout."""
+    import runpod
     print(f"Resuming pod {pod_id} with gpu_count={gpu_count}...")
     if gpu_count == 0:
         print("  NOTE: RunPod's resume API with gpu_count=0 is known to return")
@@ -432,13 +1224,14 @@ def resume_pod(pod_id: str, gpu_count: int = 1):
         print("        limitation for GPU-reserved pods; CPU-only pods must be")
         print("        created fresh via `create --cpu`.")
     runpod.resume_pod(pod_id, gpu_count=gpu_count)
+    invalidate_pod_cache(pod_id)
     print("Pod resume requested. Waiting for SSH...")
     ip, port = wait_for_ssh(pod_id)
     if not ip:
         print("Timed out waiting for pod. Check RunPod dashboard.")
-        return
-    pods = runpod.get_pods()
-    match = next((p for p in pods if p["id"] == pod_id), None)
+        return None, None
+    # wait_for_ssh just fetched this pod, so the name comes from cache.
+    match = fetch_pod(pod_id)
     name = match.get("name") if match else None
     if name:
         _write_ssh_alias(name, ip, port)
@@ -446,6 +1239,74 @@ def resume_pod(pod_id: str, gpu_count: int = 1):
     else:
         print(f"Pod is ready! SSH: ssh root@{ip} -p {port} -i {SSH_KEY}")
         print("  (No pod name found — couldn't auto-write SSH alias.)")
+    # --restore-venv also restarts the idle watchdog when the pod was set up with one.
+    report = restore_venv(ip, port) if restore else ""
+    armed = re.search(r"^Idle watchdog: .* after (\d+) min", report, re.M)
+    idle_paused = re.search(r"^Last pause was by the idle watchdog: paused_at=(\S+)", report, re.M)
+    _set_idle_watch(pod_id, int(armed.group(1)) if armed else None, idle_paused.group(1) if idle_paused else None)
+    if flush_restore:
+        restore_container_disk(ip, port)
+    if restore and hf_cache_restore:
+        print("Restoring HF cache from the /workspace tier...")
+        run_hf_cache_tier(ip, port, "restore")
+    return ip, port
+
+
+def read_setup_events(ip: str, port: int) -> list[dict] | None:
+    """Fetch pod_setup.sh's JSONL event stream in one SSH call. None if the pod has none (older setup script)."""
+    result = ssh_run(ip, port, f"cat {_SETUP_EVENTS}", capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        return None
+    events = []
+    for line in result.stdout.splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue  # a line still being written
+    return events
+
+
+def summarize_setup_events(events: list[dict]) -> dict:
+    """Fold setup events into {state, secs, failures, phases: {name: {state, secs, retries, steps}}}."""
+    summary = {"state": "running", "secs": None, "failures": [], "phases": {}}
+    started = None
+    for e in events:
+        kind = e.get("event")
+        if kind == "setup_start":
+            started = e["ts"]
+        elif kind == "phase_start":
+            summary["phases"][e["phase"]] = {"state": "running", "started": e["ts"], "secs": None, "retries": 0, "steps": []}
+        elif kind == "phase_end":
+            phase = summary["phases"].setdefault(e["phase"], {"steps": []})
+            phase.update(state="ok" if e.get("rc") == 0 else "failed", secs=e.get("secs"), retries=e.get("retries", 0))
+        elif kind == "step" and e.get("phase") in summary["phases"]:
+            summary["phases"][e["phase"]]["steps"].append(e)
+        elif kind == "failure":
+            summary["failures"].append(e.get("reason", "?"))
+        elif kind == "setup_end":
+            summary["state"] = "done" if e.get("status") == "ok" else "failed"
+            summary["secs"] = e.get("secs")
+            if e.get("status") != "ok":
+                summary["failures"].append(e.get("reason", "setup exited early"))
+    if summary["secs"] is None and started is not None and events:
+        summary["secs"] = events[-1]["ts"] - started
+    return summary
+
+
+def print_setup_profile(summary: dict):
+    """Per-phase timing table, slowest retry-wrapped steps listed under each phase."""
+    secs = f" ({summary['secs']}s)" if summary["secs"] is not None else ""
+    print(f"Setup {summary['state']}{secs}")
+    for name, phase in summary["phases"].items():
+        took = f"{phase['secs']}s" if phase.get("secs") is not None else "..."
+        retries = f"  ({phase['retries']} retries)" if phase.get("retries") else ""
+        print(f"  {name:10s} {phase.get('state', '?'):8s} {took:>6s}{retries}")
+        for step in sorted(phase["steps"], key=lambda st: -st.get("secs", 0)):
+            attempts = f"  x{step['attempts']}" if step.get("attempts", 1) > 1 else ""
+            failed = "  FAILED" if step.get("rc") else ""
+            print(f"      {step.get('step', '?'):32s} {step.get('secs', 0):>5}s{attempts}{failed}")
+    for failure in summary["failures"]:
+        print(f"  FAILED: {failure}")
 
 
 def setup_status(pod_id: str):
@@ -453,50 +1314,105 @@ def setup_status(pod_id: str):
     if not ip:
         print(f"Pod {pod_id} has no public SSH port.")
         return
-    result = ssh_run(ip, port, ["tail", "-5", "/var/log/pod_setup.log"], capture_output=True, text=True, timeout=120)
+    events = read_setup_events(ip, port)
+    if events:
+        print_setup_profile(summarize_setup_events(events))
+        return
+    result = ssh_run(ip, port, ["tail", "-5", _SETUP_LOG], capture_output=True, text=True, timeout=120)
     if result.returncode == 0:
         print(result.stdout)
     else:
         print(f"  Could not read setup log: {result.stderr.strip()}")
 
 
-def wait_for_setup(pod_id: str, timeout: int = 900, poll_interval: int = 15):
-    """Block until pod setup completes. Prints one-line progress updates."""
+_SETUP_LOG = "/var/log/pod_setup.log"
+_SETUP_EVENTS = "/var/log/pod_setup.events.jsonl"
+_SETUP_DONE_MARKER = "Setup complete"
+_SETUP_FAILED_MARKER = "Setup FAILED"
+# Noisy progress lines (apt, pip, git file counts) not worth echoing.
+_SETUP_LOG_NOISE = ("Updating files:", "Reading package", "Building wheels", "Downloading", "Downloaded")
+
+
+def _follow_setup_log(ip: str, port: int, offset: int, deadline: float) -> tuple[str | None, int]:
+    """Follow the setup log from byte `offset` over one SSH session until a marker appears.
+
+    Returns (outcome, offset) where outcome is "done", "failed", or None if the
+    stream ended first (dropped session or deadline); offset only advances past
+    complete lines, so a reconnect resumes exactly where this one stopped.
+    """
+    remaining = max(1, int(deadline - time.time()))
+    remote = f"timeout {remaining} tail -c +{offset + 1} -F {_SETUP_LOG} 2>/dev/null"
+    _ensure_control_dir()
+    proc = subprocess.Popen(ssh_cmd(ip, port) + [remote], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    outcome = None
+    try:
+        for raw in proc.stdout:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            line = raw.decode(errors="replace").strip()
+            if outcome == "done":
+                # The summary's FAILED: lines follow the marker; stop at the first other line.
+                if not line.startswith("FAILED:"):
+                    break
+                print(f"  {line}")
+                continue
+            if not line:
+                continue
+            if _SETUP_FAILED_MARKER in line:
+                return "failed", offset
+            if _SETUP_DONE_MARKER in line:
+                outcome = "done"
+                if "failure" in line:
+                    print(f"  {line.strip('= ')}")
+                continue
+            if not any(noise in line for noise in _SETUP_LOG_NOISE):
+                print(f"  {line}")
+    finally:
+        proc.kill()
+        proc.wait()
+    return outcome, offset
+
+
+def wait_for_setup(pod_id: str, timeout: int = 900, poll_interval: int = 5):
+    """Block until pod setup completes, streaming filtered log lines as they are written.
+
+    Holds one `tail -F` over SSH; if the session drops, reconnects after
+    `poll_interval` seconds and resumes from the last byte read. Once setup
+    ends, prints the per-phase timing profile from the pod's event stream.
+    """
     ip, port = get_ssh_info(pod_id)
     if not ip:
         print(f"ERROR: Pod {pod_id} has no public SSH port.")
         sys.exit(1)
 
     start = time.time()
-    last_line = ""
-    while time.time() - start < timeout:
-        done = ssh_run(
-            ip, port, "grep -c 'Setup complete' /var/log/pod_setup.log",
-            capture_output=True, text=True, timeout=120,
-        )
-        if done.returncode == 0 and done.stdout.strip() != "0":
-            elapsed = int(time.time() - start)
-            print(f"Setup complete ({elapsed}s)")
-            return
-
-        tail = ssh_run(
-            ip, port, "tail -1 /var/log/pod_setup.log",
-            capture_output=True, text=True, timeout=120,
-        )
-        if tail.returncode == 0:
-            line = tail.stdout.strip()
-            if line and line != last_line:
-                last_line = line
-                # Strip noisy progress lines (apt, pip, git file counts)
-                if not any(noise in line for noise in ("Updating files:", "Reading package", "Building wheels", "Downloading", "Downloaded")):
-                    print(f"  {line}")
-
-        time.sleep(poll_interval)
+    deadline = start + timeout
+    offset = 0
+    outcome = None
+    while outcome is None and time.time() < deadline:
+        outcome, offset = _follow_setup_log(ip, port, offset, deadline)
+        if outcome is None:
+            if time.time() + poll_interval >= deadline:
+                break
+            print(f"  (log stream dropped at byte {offset}; reconnecting in {poll_interval}s)")
+            time.sleep(poll_interval)
 
     elapsed = int(time.time() - start)
-    print(f"ERROR: Setup timed out after {elapsed}s")
+    events = read_setup_events(ip, port) if outcome else None
+    if outcome == "done":
+        print(f"Setup complete ({elapsed}s)")
+        if events:
+            print_setup_profile(summarize_setup_events(events))
+        return
+    if events:
+        print_setup_profile(summarize_setup_events(events))
+    if outcome == "failed":
+        print(f"ERROR: Setup failed after {elapsed}s")
+    else:
+        print(f"ERROR: Setup timed out after {elapsed}s")
     tail = ssh_run(
-        ip, port, "tail -5 /var/log/pod_setup.log",
+        ip, port, f"tail -5 {_SETUP_LOG}",
         capture_output=True, text=True, timeout=120,
     )
     if tail.returncode == 0:
@@ -504,20 +1420,753 @@ def wait_for_setup(pod_id: str, timeout: int = 900, poll_interval: int = 15):
     sys.exit(1)
 
 
+# --- Warm pool ---
+
+POOL_FILE = "~/.cache/zombuul/pool.json"
+_DEPENDENCY_FILES = "pyproject.toml setup.py setup.cfg uv.lock 'requirements*.txt'"
+
+
+@contextlib.contextmanager
+def _pool_state():
+    """Yield the pool ({pod_id: entry}) under an exclusive file lock and write it back on exit.
+
+    The lock spans processes, so two agents acquiring at once never get the same pod.
+    """
+    import fcntl
+    path = os.path.expanduser(POOL_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                pool = json.load(f)
+        except (OSError, ValueError):
+            pool = {}
+        yield pool
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(pool, f, indent=1)
+        os.replace(tmp, path)
+
+
+def _prune_pool(pool: dict) -> None:
+    """Drop entries for pods that no longer exist (terminated outside the pool)."""
+    live = {p["id"] for p in fetch_pods()}
+    for pod_id in [i for i in pool if i not in live]:
+        print(f"  Dropping {pool.pop(pod_id)['name']} ({pod_id}) from the pool: pod no longer exists.")
+
+
+def _pool_member(name: str, create_kwargs: dict, repo_url: str, branch: str, start: float, entry: dict, *, idle_pause_minutes: int) -> dict:
+    """Create and fully set up one pool pod, then pause it and record it as ready. Never raises."""
+    row = _fleet_member(
+        name, create_kwargs, repo_url, branch, start,
+        python_version=entry["python_version"], install_claude=False, extras=entry["extras"],
+        venv_snapshot=True, idle_pause_minutes=idle_pause_minutes,
+    )
+    if row["error"]:
+        return row
+    _print_ctx.prefix = f"[{name}] "
+    try:
+        wait_for_setup(row["pod_id"])
+        row["setup"] = "ok"
+    except SystemExit:
+        row["setup"] = "failed"
+        row["error"] = "setup failed; pod left running for inspection and not added to the pool"
+        return row
+    finally:
+        _print_ctx.prefix = ""
+    pause_pod(row["pod_id"])
+    with _pool_state() as pool:
+        pool[row["pod_id"]] = dict(entry, name=name, state="ready", since=time.time())
+    return row
+
+
+def pool_fill(size: int, gpu_type_id: str, image_name: str, repo_url: str, branch: str, *, gpu_count: int = 1, python_version: str = "3.11", volume_gb: int = 100, disk_gb: int = 200, template_id: str | None = None, extras: str = "auto", idle_pause_minutes: int = 0):
+    """Top the pool up to `size` ready pods of this GPU type: create, set up and pause the missing ones concurrently."""
+    with _pool_state() as pool:
+        _prune_pool(pool)
+        have = [p for p in pool.values() if p["gpu"] == gpu_type_id and p["gpu_count"] == gpu_count and p["repo_url"] == repo_url]
+    missing = size - len(have)
+    if missing <= 0:
+        print(f"Pool already has {len(have)} {gpu_type_id} x{gpu_count} pod(s) for {repo_url}.")
+        return
+
+    slug = re.sub(r"[^a-z0-9]+", "-", gpu_type_id.lower()).strip("-")
+    taken = {p.get("name") for p in fetch_pods()}
+    names = [n for n in (f"pool-{slug}-{i}" for i in range(1, size + len(taken) + 2)) if n not in taken][:missing]
+    entry = {"gpu": gpu_type_id, "gpu_count": gpu_count, "repo_url": repo_url, "branch": branch, "python_version": python_version, "extras": extras}
+    print(f"Filling pool with {missing} {gpu_type_id} x{gpu_count} pod(s): {', '.join(names)}")
+    env = get_pod_env()
+    start = time.time()
+    with _tagged_stdout(), ThreadPoolExecutor(max_workers=missing) as pool_exec:
+        futures = [
+            pool_exec.submit(
+                _pool_member, n,
+                _pod_create_kwargs(
+                    n, gpu_type_id, image_name, volume_gb=volume_gb, disk_gb=disk_gb, gpu_count=gpu_count,
+                    cpu_instance_id="", template_id=template_id, env=env,
+                ),
+                repo_url, branch, start, entry, idle_pause_minutes=idle_pause_minutes,
+            )
+            for n in names
+        ]
+        rows = [fut.result() for fut in futures]
+
+    print(f"\nPool fill ({int(time.time() - start)}s):")
+    for r in rows:
+        print(f"  {r['name']:30s} {r['pod_id'] or '-':25s} {r['setup']:8s} {r['error'] or 'ready (paused)'}")
+    if any(r["error"] for r in rows):
+        sys.exit(1)
+
+
+def _switch_branch(ip: str, port: int, branch: str) -> tuple[str, bool]:
+    """Fetch only `branch` and check it out on the pod. Returns (short commit, dependency files changed)."""
+    # Container disk (and with it gh's credential helper) is wiped on pause, so auth with GH_TOKEN from the container env.
+    helper = shlex.quote('!f() { echo username=x-access-token; echo "password=$GH_TOKEN"; }; f')
+    b = shlex.quote(branch)
+    cmd = (
+        "cd /workspace/repo && "
+        "export GH_TOKEN=$(tr '\\0' '\\n' < /proc/1/environ | sed -n 's/^GH_TOKEN=//p') && "
+        "old=$(git rev-parse HEAD) && "
+        f"git -c credential.helper= -c credential.helper={helper} fetch origin {b} && "
+        f"git checkout -B {b} origin/{b} && "
+        "git rev-parse --short HEAD && "
+        f"{{ git diff --quiet \"$old\" HEAD -- {_DEPENDENCY_FILES} || echo DEPS_CHANGED; }}"
+    )
+    result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"could not switch to {branch}: {result.stderr.strip()}")
+    lines = result.stdout.split()
+    return lines[0], "DEPS_CHANGED" in lines
+
+
+def pool_acquire(branch: str, gpu_type_id: str | None = None, alias: str | None = None, as_json: bool = False, hf_cache_restore: bool = False):
+    """Resume the longest-idle ready pool pod, switch it to `branch`, and hand it out."""
+    tried: set[str] = set()
+    while True:
+        with _pool_state() as pool:
+            _prune_pool(pool)
+            ready = [i for i, p in pool.items() if p["state"] == "ready" and i not in tried and (not gpu_type_id or p["gpu"] == gpu_type_id)]
+            if not ready:
+                print(f"No ready pod in the pool{f' for {gpu_type_id}' if gpu_type_id else ''}. Run `pool fill` or `create`.")
+                sys.exit(1)
+            pod_id = min(ready, key=lambda i: pool[i]["since"])
+            entry = pool[pod_id]
+            entry.update(state="in_use", branch=branch, since=time.time())
+        tried.add(pod_id)
+        start = time.time()
+        try:
+            ip, port = resume_pod(pod_id, gpu_count=entry["gpu_count"], hf_cache_restore=hf_cache_restore)
+            if not ip:
+                raise RuntimeError("no SSH endpoint after resume")
+            break
+        except Exception as e:  # typically no free GPU left on the pod's host
+            print(f"Could not resume {entry['name']}: {e}. Trying the next pool pod.")
+            state = "ready"
+            try:
+                # A resume that timed out can still leave the pod RUNNING (and billing); pause it before it goes back.
+                current = fetch_pod(pod_id, max_age=0)
+                if current and current.get("desiredStatus") == "RUNNING":
+                    pause_pod(pod_id)
+            except Exception as stop_error:
+                print(f"  WARNING: could not pause {entry['name']}: {stop_error}. Marked failed; pause it, then `pool release {entry['name']}`.")
+                state = "failed"
+            with _pool_state() as pool:
+                if pod_id in pool:
+                    pool[pod_id].update(state=state)
+
+    try:
+        commit, deps_changed = _switch_branch(ip, port, branch)
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        print(f"{entry['name']} is running and marked in use; fix the checkout over SSH or `pool release {entry['name']}`.")
+        sys.exit(1)
+    print(f"Checked out {branch} at {commit}.")
+    if deps_changed:
+        print("Dependency files differ from the pooled checkout; re-running setup for this branch...")
+        setup_pod(ip, port, entry["repo_url"], branch, entry["python_version"], extras=entry["extras"])
+        wait_for_setup(pod_id)
+    if alias:
+        _write_ssh_alias(alias, ip, port)
+    ssh_name = alias or entry["name"]
+    print(f"Acquired {entry['name']} ({pod_id}) in {time.time() - start:.0f}s. SSH: ssh runpod-{ssh_name}")
+    if as_json:
+        print(json.dumps({"pod_id": pod_id, "pod_name": entry["name"], "ssh_alias": f"runpod-{ssh_name}", "ip": ip, "port": port, "branch": branch, "commit": commit}))
+
+
+def pool_release(pod: str, hf_cache_save: bool = False, hf_cache_max_gb: float | None = None, flush_paths: list[str] | tuple[str, ...] = ()):
+    """Pause an acquired pool pod (by ID or name) and mark it ready for the next `acquire`."""
+    with _pool_state() as pool:
+        pod_id = next((i for i, p in pool.items() if pod in (i, p["name"])), None)
+    if not pod_id:
+        print(f"ERROR: {pod} is not a pool pod. See `pool list`.")
+        sys.exit(1)
+    current = fetch_pod(pod_id, max_age=0)
+    if current and current.get("desiredStatus") == "RUNNING":
+        pause_pod(pod_id, hf_cache_save=hf_cache_save, hf_cache_max_gb=hf_cache_max_gb, flush_paths=flush_paths)
+    # The entry may have been pruned while the pause ran; never resurrect it.
+    with _pool_state() as pool:
+        entry = pool.get(pod_id)
+        if entry:
+            entry.update(state="ready", since=time.time())
+    if not entry:
+        print(f"ERROR: {pod} left the pool while it was pausing; not marked ready.")
+        sys.exit(1)
+    print(f"Released {entry['name']} back to the pool.")
+
+
+def pool_list():
+    with _pool_state() as pool:
+        _prune_pool(pool)
+    if not pool:
+        print("Pool is empty.")
+        return
+    print(f"  {'POD ID':25s} {'NAME':30s} {'GPU':25s} {'STATE':7s} {'BRANCH':20s} SINCE")
+    for pod_id, p in sorted(pool.items(), key=lambda kv: kv[1]["name"]):
+        since = time.strftime("%Y-%m-%d %H:%M", time.localtime(p["since"]))
+        print(f"  {pod_id:25s} {p['name']:30s} {p['gpu'] + ' x' + str(p['gpu_count']):25s} {p['state']:7s} {p['branch']:20s} {since}")
+
+
+# --- Fleet status ---
+
+_FLEET_STATUS_WORKERS = 8
+_FLEET_STATUS_TIMEOUT = 20
+# One SSH call per pod: setup events, tmux sessions, GPU utilisation and disk, in labelled sections.
+_POD_SNAPSHOT_CMD = (
+    f"echo '== events'; cat {_SETUP_EVENTS} 2>/dev/null; "
+    "echo '== tmux'; tmux ls -F '#{session_name}' 2>/dev/null; "
+    "echo '== gpu'; nvidia-smi --query-gpu=utilization.gpu,memory.used,memory.total --format=csv,noheader,nounits 2>/dev/null; "
+    "echo '== disk'; df -P / /workspace 2>/dev/null | tail -n +2"
+)
+
+
+def parse_pod_snapshot(text: str) -> dict:
+    """Parse _POD_SNAPSHOT_CMD output into {setup, tmux, gpu, disk} display strings."""
+    sections: dict[str, list[str]] = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("== "):
+            current = sections.setdefault(line[3:].strip(), [])
+        elif current is not None and line.strip():
+            current.append(line.strip())
+
+    events = []
+    for line in sections.get("events", []):
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    setup = "?"
+    if events:
+        summary = summarize_setup_events(events)
+        setup = summary["state"]
+        if setup == "running":
+            active = [name for name, p in summary["phases"].items() if p.get("state") == "running"]
+            setup = f"running: {','.join(active)}" if active else "running"
+        elif summary["failures"]:
+            setup = f"{setup} ({len(summary['failures'])} failed)"
+
+    gpus = []
+    for line in sections.get("gpu", []):
+        try:
+            util, used, total = (float(x) for x in line.split(","))
+        except ValueError:
+            continue
+        gpus.append((util, used, total))
+    gpu = "-"
+    if gpus:
+        util = sum(g[0] for g in gpus) / len(gpus)
+        gpu = f"{util:.0f}% {sum(g[1] for g in gpus) / 1024:.0f}/{sum(g[2] for g in gpus) / 1024:.0f}G"
+        if len(gpus) > 1:
+            gpu += f" x{len(gpus)}"
+
+    disk = []
+    for line in sections.get("disk", []):
+        fields = line.split()
+        if len(fields) >= 6:
+            disk.append(f"{fields[5]} {fields[4]}")
+
+    return {"setup": setup, "tmux": ",".join(sections.get("tmux", [])) or "-", "gpu": gpu, "disk": " ".join(disk) or "-"}
+
+
+def pod_snapshot(pod: dict, timeout: float = _FLEET_STATUS_TIMEOUT) -> dict:
+    """Snapshot one running pod over a single SSH call. Never raises; errors land in `setup`."""
+    ip, port = _ssh_endpoint(pod)
+    if not ip:
+        return {"setup": "no ssh endpoint", "tmux": "-", "gpu": "-", "disk": "-"}
+    try:
+        result = ssh_run(ip, port, _POD_SNAPSHOT_CMD, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"setup": f"timeout ({timeout:.0f}s)", "tmux": "-", "gpu": "-", "disk": "-"}
+    except OSError as e:
+        return {"setup": f"error: {e}", "tmux": "-", "gpu": "-", "disk": "-"}
+    if result.returncode == 255:
+        return {"setup": "ssh failed", "tmux": "-", "gpu": "-", "disk": "-"}
+    return parse_pod_snapshot(result.stdout)
+
+
+def fleet_status(pattern: str | None = None, timeout: float = _FLEET_STATUS_TIMEOUT):
+    """One table for every pod (or those whose name matches `pattern`), RUNNING ones queried concurrently."""
+    pods = [p for p in fetch_pods() if pattern is None or fnmatch.fnmatch(p.get("name", ""), pattern)]
+    if not pods:
+        print("No pods found." if pattern is None else f"No pods match {pattern!r}.")
+        return
+    running = [p for p in pods if p.get("desiredStatus") == "RUNNING"]
+    snapshots = {}
+    if running:
+        with ThreadPoolExecutor(max_workers=min(_FLEET_STATUS_WORKERS, len(running))) as pool:
+            futures = {pool.submit(pod_snapshot, p, timeout): p["id"] for p in running}
+            for fut in as_completed(futures):
+                snapshots[futures[fut]] = fut.result()
+
+    print(f"  {'NAME':30s} {'POD ID':25s} {'STATUS':10s} {'SETUP':24s} {'GPU':16s} {'DISK':26s} TMUX")
+    for pod in sorted(pods, key=lambda p: p.get("name", "")):
+        snap = snapshots.get(pod["id"], {"setup": "-", "tmux": "-", "gpu": "-", "disk": "-"})
+        print(f"  {pod.get('name', ''):30s} {pod['id']:25s} {pod.get('desiredStatus', 'UNKNOWN'):10s} {snap['setup']:24s} {snap['gpu']:16s} {snap['disk']:26s} {snap['tmux']}")
+
+
+# --- Monitor ---
+
+_MONITOR_INTERVAL = 10
+_MONITOR_DISK_WARN = 85
+_MONITOR_UNREACHABLE_AFTER = 3
+_MONITOR_REPO = "/workspace/repo"
+
+
+def _monitor_probe_cmd(session: str | None, progress_glob: str | None) -> str:
+    """Shell for one liveness/disk/progress probe. Output: `alive=0|1`, `disk <mount> <pct>` lines, `progress=<n>`."""
+    alive = f"tmux has-session -t {shlex.quote(session)}" if session else "tmux ls"
+    parts = [
+        f"{alive} >/dev/null 2>&1 && echo alive=1 || echo alive=0",
+        "df -P / /workspace 2>/dev/null | awk 'NR > 1 {sub(\"%\", \"\", $5); print \"disk \" $6 \" \" $5}'",
+    ]
+    if progress_glob:
+        pattern = progress_glob if progress_glob.startswith("/") else f"{_MONITOR_REPO}/{progress_glob}"
+        # Search from the deepest directory above the first wildcard.
+        root = []
+        for part in pattern.split("/"):
+            if any(c in part for c in "*?["):
+                break
+            root.append(part)
+        parts.append(f"echo progress=$(find {shlex.quote('/'.join(root) or '/')} -path {shlex.quote(pattern)} 2>/dev/null | wc -l)")
+    return "; ".join(parts)
+
+
+def parse_monitor_probe(text: str) -> dict:
+    probe = {"alive": False, "disk": {}, "progress": None}
+    for line in text.splitlines():
+        if line.startswith("alive="):
+            probe["alive"] = line.strip() == "alive=1"
+        elif line.startswith("disk "):
+            _, mount, pct = line.split()
+            probe["disk"][mount] = int(pct)
+        elif line.startswith("progress="):
+            probe["progress"] = int(line.split("=", 1)[1] or 0)
+    return probe
+
+
+def monitor_transitions(prev: dict, cur: dict, expect: int | None, disk_warn: int) -> list[dict]:
+    """Events for the change from probe `prev` to probe `cur` of one pod; empty if nothing that matters moved."""
+    events = []
+    done = expect is not None and (cur["progress"] or 0) >= expect
+    was_done = expect is not None and (prev["progress"] or 0) >= expect
+    if done and not was_done:
+        events.append({"event": "complete"})
+    elif prev["alive"] and not cur["alive"] and not done:
+        # Without --expect a session ending is ambiguous: the job may have finished or died.
+        events.append({"event": "crash" if expect is not None else "exited"})
+    elif not prev["alive"] and cur["alive"]:
+        events.append({"event": "restarted"})
+    for mount, pct in cur["disk"].items():
+        before = prev["disk"].get(mount, 0)
+        if pct >= disk_warn > before:
+            events.append({"event": "disk_warn", "mount": mount, "pct": pct})
+        elif before >= disk_warn > pct:
+            events.append({"event": "disk_ok", "mount": mount, "pct": pct})
+    return events
+
+
+def monitor_pods(names: list[str], *, session: str | None = None, progress_glob: str | None = None, expect: int | None = None,
+                 interval: float = _MONITOR_INTERVAL, disk_warn: int = _MONITOR_DISK_WARN, events_file: str | None = None,
+                 exit_on_event: bool = False):
+    """Watch pods from one local process, printing a JSONL event only when a pod changes state.
+
+    Every `interval` seconds each pod gets one probe over its multiplexed SSH
+    connection (tmux liveness, df, progress-file count). Events: `watching`
+    (initial state, once per pod), `crash` / `exited`, `restarted`, `complete`,
+    `disk_warn` / `disk_ok`, `unreachable` / `reachable`. Every event carries the
+    pod's latest `alive`, `disk` and `progress`. Returns once every pod is
+    complete, or after the first state change with `exit_on_event`.
+    """
+    by_name = {p.get("name"): p for p in fetch_pods()}
+    missing = [n for n in names if n not in by_name]
+    if missing:
+        print(f"ERROR: no pod named {', '.join(missing)}.")
+        sys.exit(2)
+    pods = {n: by_name[n] for n in names}
+    cmd = _monitor_probe_cmd(session, progress_glob)
+
+    def emit(name: str, event: dict, probe: dict | None):
+        record = {"ts": round(time.time(), 1), "pod": name, **event}
+        if probe:
+            record.update(alive=probe["alive"], disk=probe["disk"], progress=probe["progress"])
+        line = json.dumps(record)
+        print(line)
+        if events_file:
+            with open(events_file, "a") as f:
+                f.write(line + "\n")
+
+    def probe(name: str) -> dict | None:
+        ip, port = _ssh_endpoint(pods[name])
+        if not ip:
+            return None
+        try:
+            result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=max(interval, 15))
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        return parse_monitor_probe(result.stdout) if result.returncode == 0 else None
+
+    last: dict[str, dict] = {}
+    failures = {n: 0 for n in names}
+    unreachable: set[str] = set()
+    with ThreadPoolExecutor(max_workers=min(_FLEET_STATUS_WORKERS, len(names))) as pool:
+        while True:
+            changed = False
+            for name, cur in zip(names, pool.map(probe, names)):
+                if cur is None:
+                    failures[name] += 1
+                    if failures[name] >= _MONITOR_UNREACHABLE_AFTER and name not in unreachable:
+                        # The endpoint may have moved (resume) or the pod stopped; look again.
+                        pods[name] = fetch_pod(pods[name]["id"], max_age=0) or pods[name]
+                        unreachable.add(name)
+                        emit(name, {"event": "unreachable", "status": pods[name].get("desiredStatus", "UNKNOWN")}, last.get(name))
+                        changed = True
+                    continue
+                failures[name] = 0
+                if name in unreachable:
+                    unreachable.discard(name)
+                    emit(name, {"event": "reachable"}, cur)
+                    changed = True
+                if name not in last:
+                    emit(name, {"event": "watching"}, cur)
+                else:
+                    for event in monitor_transitions(last[name], cur, expect, disk_warn):
+                        emit(name, event, cur)
+                        changed = True
+                last[name] = cur
+            if changed and exit_on_event:
+                return
+            if expect is not None and len(last) == len(names) and all((p["progress"] or 0) >= expect for p in last.values()):
+                return
+            time.sleep(interval)
+
+
+# --- Result streaming ---
+
+_STREAM_INTERVAL = 30
+_STREAM_SETTLE = 60
+_STREAM_BWLIMIT_MBPS = 50
+
+
+def _stream_manifest_cmd(remote_dir: str, session: str | None) -> str:
+    """Shell for one manifest poll: `<pod clock> <alive 0|1>`, then `<path>\\t<size>\\t<mtime>` per file."""
+    alive = f"$(tmux has-session -t {shlex.quote(session)} 2>/dev/null && echo 1 || echo 0)" if session else "1"
+    return f"echo $(date +%s) {alive}; cd {shlex.quote(remote_dir)} 2>/dev/null && find . -type f -printf '%P\\t%s\\t%T@\\n'"
+
+
+def parse_stream_manifest(text: str) -> tuple[float, bool, dict[str, tuple[int, float]]]:
+    lines = text.splitlines()
+    now, alive = lines[0].split()
+    files = {}
+    for line in lines[1:]:
+        path, size, mtime = line.rsplit("\t", 2)
+        files[path] = (int(size), float(mtime))
+    return float(now), alive == "1", files
+
+
+def files_to_stream(files: dict[str, tuple[int, float]], pod_now: float, local_dir: str, settle: float) -> tuple[list[str], int]:
+    """Files not yet copied to `local_dir` (same size and mtime) that have been unmodified for `settle` seconds.
+
+    Returns those paths and the number held back because they are still being written.
+    """
+    ready, writing = [], 0
+    for path, (size, mtime) in files.items():
+        st = _stat_or_none(os.path.join(local_dir, path))
+        if st and st.st_size == size and int(st.st_mtime) == int(mtime):
+            continue
+        if pod_now - mtime < settle:
+            writing += 1
+        else:
+            ready.append(path)
+    return sorted(ready), writing
+
+
+def stream_results(pod_ref: str, remote_dir: str, local_dir: str, *, interval: float = _STREAM_INTERVAL, settle: float = _STREAM_SETTLE,
+                   bwlimit_mbps: float = _STREAM_BWLIMIT_MBPS, session: str | None = None, once: bool = False):
+    """Keep copying finished result files from a pod to `local_dir` while the job runs.
+
+    Every `interval` seconds one SSH call lists the remote directory (path, size,
+    mtime). Files unmodified for `settle` seconds that are missing or different
+    locally go out in one rsync batch, capped at `bwlimit_mbps`. rsync -a keeps
+    mtimes, so the closing `safe_rsync.sh -az` only moves what is left. With
+    `session`, the first poll after that tmux session ends ships everything and
+    returns; `once` does a single pass.
+    """
+    matches = [p for p in fetch_pods() if pod_ref in (p.get("id"), p.get("name"))]
+    if len(matches) != 1:
+        print(f"ERROR: {'no' if not matches else 'more than one'} pod matches {pod_ref!r}.")
+        sys.exit(2)
+    pod = matches[0]
+    remote = remote_dir.rstrip("/") if remote_dir.startswith("/") else f"{_MONITOR_REPO}/{remote_dir.rstrip('/')}"
+    os.makedirs(local_dir, exist_ok=True)
+    cmd = _stream_manifest_cmd(remote, session)
+    limit = f", bwlimit {bwlimit_mbps:g} MB/s" if bwlimit_mbps else ""
+    print(f"[stream] {pod.get('name')}:{remote}/ -> {local_dir}/ every {interval:g}s (settle {settle:g}s{limit})")
+
+    shipped_files = shipped_bytes = failures = 0
+    final = once
+    while True:
+        ip, port = _ssh_endpoint(pod)
+        try:
+            result = ssh_run(ip, port, cmd, capture_output=True, text=True, timeout=120) if ip else None
+        except (subprocess.TimeoutExpired, OSError):
+            result = None
+        if result is None or result.returncode not in (0, 1) or not result.stdout.strip():
+            failures += 1
+            if failures >= _MONITOR_UNREACHABLE_AFTER:
+                pod = fetch_pod(pod["id"], max_age=0) or pod
+                status = pod.get("desiredStatus", "UNKNOWN")
+                if status != "RUNNING":
+                    print(f"[stream] pod is {status}; stopping with {shipped_files} files ({shipped_bytes / 1e9:.2f} GB) streamed.")
+                    sys.exit(1)
+                failures = 0
+            time.sleep(interval)
+            continue
+        failures = 0
+        pod_now, alive, files = parse_stream_manifest(result.stdout)
+        if not alive:
+            final = True
+        ready, writing = files_to_stream(files, pod_now, local_dir, 0 if final else settle)
+        synced = True
+        if ready:
+            rsh = " ".join(shlex.quote(a) for a in ["ssh", "-p", str(port), "-i", os.path.expanduser(SSH_KEY)] + SSH_OPTS + ssh_control_opts())
+            rsync = ["rsync", "-az", "--partial", "--files-from=-", "-e", rsh]
+            if bwlimit_mbps:
+                rsync.append(f"--bwlimit={max(1, int(bwlimit_mbps * 1e6 / 1024))}")
+            batch_bytes = sum(files[p][0] for p in ready)
+            start = time.time()
+            sync = subprocess.run(rsync + [f"root@{ip}:{remote}/", f"{local_dir.rstrip('/')}/"],
+                                  input="\n".join(ready) + "\n", capture_output=True, text=True)
+            elapsed = time.time() - start
+            if sync.returncode == 0:
+                shipped_files += len(ready)
+                shipped_bytes += batch_bytes
+                print(f"[stream] +{len(ready)} files ({batch_bytes / 1e9:.2f} GB, {batch_bytes / max(elapsed, 1e-3) / 1e6:.1f} MB/s); "
+                      f"{writing} still being written; {shipped_files} files / {shipped_bytes / 1e9:.2f} GB streamed")
+            else:
+                # Retried on the next poll: whatever did not land still differs locally.
+                synced = False
+                tail = sync.stderr.strip().splitlines()
+                print(f"[stream] rsync exited {sync.returncode}{': ' + tail[-1] if tail else ''}; retrying next poll")
+        if once and not synced:
+            sys.exit(1)
+        if final and synced:
+            print(f"[stream] done: {shipped_files} files ({shipped_bytes / 1e9:.2f} GB) streamed to {local_dir}/")
+            return
+        time.sleep(interval)
+
+
+# --- Control daemon ---
+
+# `serve` imports the SDK and dotenv once and forks a child per request, so a
+# forwarded command skips those imports. Nothing else is kept warm: each child
+# re-reads config, opens its own API and SSH connections, and shares pod state
+# only through the on-disk pod cache. The child takes the caller's cwd and the
+# environment it needs, and writes stdout/stderr straight to the socket, then
+# a trailer carrying the exit code.
+SERVE_SOCKET = "~/.cache/zombuul/ctl.sock"
+# What a forwarded command may read from the caller's environment. Pod tokens
+# (POD_ENV_KEYS) are added only for the commands that hand them to new pods.
+_SERVE_ENV = ("HOME", "PATH", "USER", "LOGNAME", "SHELL", "LANG", "TERM", "TMPDIR", "SSH_AUTH_SOCK", "RUNPOD_API_KEY")
+_SERVE_ENV_PREFIXES = ("LC_", "ZOMBUUL_", "RSYNC_")
+_SERVE_EXIT = b"\0zombuul-exit "
+_SERVE_STALE = b"\0zombuul-stale\n"
+_serving = False
+_serve_mtime: float | None = None
+
+
+def _forward_to_daemon(argv: list[str]) -> int | None:
+    """Run `argv` in the `serve` daemon if one is listening. Returns its exit code, or None to run in-process."""
+    if _serving or not argv or argv[0] == "serve" or os.environ.get("ZOMBUUL_NO_DAEMON"):
+        return None
+    path = os.path.expanduser(SERVE_SOCKET)
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        env = {k: v for k, v in os.environ.items() if k in _SERVE_ENV or k.startswith(_SERVE_ENV_PREFIXES)}
+        if argv[0] == "create" or argv[:2] == ["pool", "fill"]:
+            env.update((k, os.environ[k]) for k in POD_ENV_KEYS if k in os.environ)
+        request = {"argv": argv, "cwd": os.getcwd(), "env": env, "mtime": os.stat(__file__).st_mtime}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+    except OSError:
+        sock.close()
+        return None  # socket left behind by a daemon that is gone
+    out = sys.stdout.buffer
+    pending = b""
+    try:
+        while chunk := sock.recv(65536):
+            data = pending + chunk
+            cut = data.find(b"\0")
+            out.write(data if cut < 0 else data[:cut])
+            out.flush()
+            pending = b"" if cut < 0 else data[cut:]
+            if pending.endswith(b"\n"):
+                if pending == _SERVE_STALE:
+                    return None  # the daemon predates this copy of the script; it shuts itself down
+                return int(pending[len(_SERVE_EXIT):])
+    except BrokenPipeError:  # e.g. piped into `head`; closing the socket stops the daemon-side command
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 141
+    finally:
+        sock.close()
+    print("ERROR: the runpod_ctl daemon dropped the connection before the command finished.")
+    return 1
+
+
+def _serve_request(conn: socket.socket, log_fd: int) -> None:
+    """Body of a forked daemon child: run one forwarded command with the caller's cwd, env and output."""
+    global _config_layers_memo, _pod_cache_loaded, _pod_list_fetched_at
+    import signal
+    import traceback
+    with conn.makefile("rb") as f:
+        request = json.loads(f.readline())
+    if request.get("mtime") != _serve_mtime:
+        conn.sendall(_SERVE_STALE)
+        os.kill(os.getppid(), signal.SIGTERM)
+        return
+    start = time.time()
+    os.setpgid(0, 0)  # so a hang-up takes down ssh/rsync children too
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = ["runpod_ctl.py"] + request["argv"]
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(conn.fileno(), 1)
+    os.dup2(conn.fileno(), 2)
+    # State the parent loaded at startup may be stale; re-read it per request.
+    _config_layers_memo = None
+    _pod_cache_loaded = False
+    _pod_cache.clear()
+    _pod_list_fetched_at = None
+
+    done = threading.Event()
+
+    def hang_up_watch():
+        conn.recv(1)  # returns only when the client goes away (Ctrl-C, killed)
+        if not done.is_set():
+            os.killpg(0, signal.SIGINT)
+
+    threading.Thread(target=hang_up_watch, daemon=True).start()
+    code = 0
+    try:
+        main()
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code, file=sys.stderr)
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    done.set()
+    try:
+        conn.sendall(_SERVE_EXIT + f"{code}\n".encode())
+    except OSError:
+        pass
+    os.write(log_fd, f"[serve] {' '.join(request['argv'])} -> {code} ({time.time() - start:.2f}s)\n".encode())
+
+
+def serve() -> None:
+    """Listen on SERVE_SOCKET until SIGTERM/Ctrl-C; other invocations forward to it while it runs."""
+    global _serving, _serve_mtime, POD_CACHE_PERSIST
+    import signal
+    import socketserver
+    path = os.path.expanduser(SERVE_SOCKET)
+    # Requests carry tokens, so only this user may reach the socket.
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    os.chmod(os.path.dirname(path), 0o700)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            print(f"A runpod_ctl daemon is already listening on {path}.")
+            sys.exit(1)
+        except OSError:
+            os.unlink(path)
+        finally:
+            probe.close()
+
+    import dotenv  # noqa: F401
+    import runpod  # noqa: F401
+    from runpod.api import graphql  # noqa: F401
+    load_config()
+    _serving = True
+    _serve_mtime = os.stat(__file__).st_mtime
+    # Children share pod state through the on-disk cache, since nothing flows back from a fork.
+    POD_CACHE_PERSIST = True
+    log_fd = os.dup(2)
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            _serve_request(self.request, log_fd)
+
+    class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        pass
+
+    old_umask = os.umask(0o077)  # the socket is owner-only from the moment it exists
+    try:
+        server = Server(path, Handler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"runpod_ctl daemon listening on {path} (pid {os.getpid()}); Ctrl-C or SIGTERM to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+
 def main():
-    global SSH_KEY
+    global SSH_KEY, POD_CACHE_TTL, POD_CACHE_PERSIST
     config = load_config()
     SSH_KEY = config["ssh_key"]
+    POD_CACHE_TTL = float(config["pod_cache_ttl"])
+    POD_CACHE_PERSIST = bool(config["pod_cache_persist"]) or _serving
 
     parser = argparse.ArgumentParser(description="RunPod management")
     sub = parser.add_subparsers(dest="command")
 
-    sub.add_parser("gpus", help="List available GPU types")
+    gpus = sub.add_parser("gpus", help="List GPU types ranked by stock and price (cached catalogue)")
+    gpus.add_argument("--min-vram", type=float, default=0, help="Minimum VRAM per GPU in GB")
+    gpus.add_argument("--max-price", type=float, default=None, help="Maximum on-demand $/hr for all --count GPUs")
+    gpus.add_argument("--count", type=int, default=1, help="GPUs per pod; prices are quoted for this many (default: 1)")
+    gpus.add_argument("--in-stock", action="store_true", help="Only GPU types that currently have capacity")
+    gpus.add_argument("--json", action="store_true", help="Print the ranked list as JSON")
+    gpus.add_argument("--refresh", action="store_true", help=f"Ignore the catalogue cache (TTL {GPU_CATALOGUE_TTL}s)")
     sub.add_parser("list", help="List running pods")
+    sub.add_parser("serve", help="Run a local daemon on a Unix socket; other invocations forward to it and skip SDK/config startup")
     sub.add_parser("config", help="Show current effective config")
 
     create = sub.add_parser("create", help="Create a new pod")
     create.add_argument("--name", required=True)
+    create.add_argument("--count", type=int, default=1, help="Create N pods concurrently, named <name>-1..<name>-N (default: 1)")
     hw_group = create.add_mutually_exclusive_group(required=True)
     hw_group.add_argument("--gpu", help="GPU type ID")
     hw_group.add_argument("--cpu", action="store_true", help="Create a CPU-only pod (no GPU)")
@@ -534,6 +2183,8 @@ def main():
 
     pause = sub.add_parser("pause", help="Pause a pod (stop GPU billing, keep disk)")
     pause.add_argument("pod_id")
+    pause.add_argument("--flush", action="append", default=[], metavar="PATH", help="Container-disk path to copy to /workspace before pausing and back on resume (repeatable; adds to pause_flush_paths)")
+    pause.add_argument("--no-flush", action="store_true", help="Skip the flush, including pause_flush_paths from config")
 
     terminate = sub.add_parser("terminate", help="Destroy a pod (stops billing, deletes disk). Requires --yes.")
     terminate.add_argument("pod_id")
@@ -541,56 +2192,174 @@ def main():
 
     resume = sub.add_parser("resume", help="Resume a paused pod")
     resume.add_argument("pod_id")
+    resume.add_argument("--no-venv-restore", action="store_true", help="Skip re-extracting the /workspace venv snapshot (and HF cache tier, if enabled) onto container disk.")
+    resume.add_argument("--no-flush-restore", action="store_true", help="Leave paths flushed by `pause` on /workspace instead of copying them back onto container disk")
     resume.add_argument("--gpu-count", type=int, default=1, help="Number of GPUs to resume with (default: 1). Passing 0 is accepted by the RunPod API but does not actually boot GPU-reserved pods — see `resume_pod` docstring.")
 
-    status = sub.add_parser("status", help="Check setup progress on a pod")
-    status.add_argument("pod_id")
+    status = sub.add_parser("status", help="Check setup progress on a pod, or on every pod matching a name glob")
+    status.add_argument("pod_id", nargs="?", help="Pod ID, or a name glob like 'sweep-*' for the fleet table")
+    status.add_argument("--all", action="store_true", help="Fleet table for every pod: setup phase, GPU util, disk, tmux sessions")
+    status.add_argument("--timeout", type=float, default=_FLEET_STATUS_TIMEOUT, help=f"Per-pod SSH timeout for the fleet table (default: {_FLEET_STATUS_TIMEOUT}s)")
+
+    metrics = sub.add_parser("metrics", help="Summarise a pod's GPU/CPU/RAM/disk/IO samples: mean util, p95 memory, idle stretches")
+    metrics.add_argument("pod_id")
+    metrics.add_argument("--since", type=float, default=60, help="Window in minutes (default: 60; 0 = whole buffer, up to 24h)")
+    metrics.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    monitor = sub.add_parser("monitor", help="Watch pods and print a JSONL event on each state change (crash, completion, disk >= 85%%)")
+    monitor.add_argument("pod_names", nargs="+", help="Pod names to watch")
+    monitor.add_argument("--session", help="tmux session running the job (default: alive while any tmux session exists)")
+    monitor.add_argument("--progress-glob", help="Glob for output files, relative to /workspace/repo unless absolute; counted each probe")
+    monitor.add_argument("--expect", type=int, help="Progress count at which the job is complete")
+    monitor.add_argument("--interval", type=float, default=_MONITOR_INTERVAL, help=f"Seconds between probes (default: {_MONITOR_INTERVAL})")
+    monitor.add_argument("--disk-warn", type=int, default=_MONITOR_DISK_WARN, help=f"Disk usage %% that triggers disk_warn (default: {_MONITOR_DISK_WARN})")
+    monitor.add_argument("--events-file", help="Also append events to this JSONL file")
+    monitor.add_argument("--exit-on-event", action="store_true", help="Exit after the first state change (for a background task that wakes an agent)")
+
+    stream = sub.add_parser("stream-results", help="Copy finished result files from a pod in the background while the job runs")
+    stream.add_argument("pod", help="Pod name or ID")
+    stream.add_argument("remote_dir", help="Results directory on the pod, relative to /workspace/repo unless absolute")
+    stream.add_argument("local_dir", help="Local directory to copy into")
+    stream.add_argument("--interval", type=float, default=_STREAM_INTERVAL, help=f"Seconds between manifest polls (default: {_STREAM_INTERVAL})")
+    stream.add_argument("--settle", type=float, default=_STREAM_SETTLE, help=f"Seconds a file must go unmodified before it is copied (default: {_STREAM_SETTLE})")
+    stream.add_argument("--bwlimit", type=float, default=_STREAM_BWLIMIT_MBPS, help=f"Bandwidth cap in MB/s, 0 for none (default: {_STREAM_BWLIMIT_MBPS})")
+    stream.add_argument("--session", help="tmux session running the job: once it ends, copy everything left and exit")
+    stream.add_argument("--once", action="store_true", help="Copy what has settled in one pass and exit")
 
     wait = sub.add_parser("wait-setup", help="Block until pod setup completes")
     wait.add_argument("pod_id")
     wait.add_argument("--timeout", type=int, default=900, help="Timeout in seconds (default: 900)")
-    wait.add_argument("--poll-interval", type=int, default=15, help="Poll interval in seconds (default: 15)")
-
-    refresh = sub.add_parser("refresh-ssh", help="Refresh ~/.ssh/config alias for a pod (after resume changes IP/port).")
-    refresh.add_argument("pod_name", help="Pod name (the SSH alias will be `runpod-<pod_name>`).")
+    wait.add_argument("--poll-interval", type=int, default=5, help="Seconds to wait before reconnecting a dropped log stream (default: 5)")
+
+    refresh = sub.add_parser("refresh-ssh", help="Refresh the runpod-<name> SSH alias for a pod (after resume changes IP/port).")
+    refresh.add_argument("pod_name", nargs="?", help="Pod name (the SSH alias will be `runpod-<pod_name>`).")
+    refresh.add_argument("--all", action="store_true", help="Refresh every running pod's alias and drop aliases of deleted pods, in one pass")
+
+    hf = sub.add_parser("hf-cache", help="Manage the /workspace Hugging Face cache tier on a pod (survives pause, unlike /opt/hf_cache).")
+    hf.add_argument("pod_id")
+    hf.add_argument("action", choices=["save", "restore", "status"], help="save: copy used blobs to /workspace + evict LRU past the cap; restore: copy them back into /opt/hf_cache; status: show the tier")
+    hf.add_argument("--max-gb", type=float, default=config["hf_cache_max_gb"], help=f"Size cap for the tier on save (default: {config['hf_cache_max_gb']})")
+
+    pool = sub.add_parser("pool", help="Warm pool of set-up, paused pods: acquiring one costs a resume instead of a cold create + setup")
+    pool_sub = pool.add_subparsers(dest="pool_command", required=True)
+    fill = pool_sub.add_parser("fill", help="Create, set up and pause pods until the pool holds --size of this GPU type")
+    fill.add_argument("--size", type=int, required=True)
+    fill.add_argument("--gpu", required=True, help="GPU type ID")
+    fill.add_argument("--gpu-count", type=int, default=config["gpu_count"], help=f"Number of GPUs per pod (default: {config['gpu_count']})")
+    fill.add_argument("--image", default=config["docker_image"], help="Docker image (default: from config)")
+    fill.add_argument("--repo-url", default=None, help="Git repo URL to clone (default: current repo's origin)")
+    fill.add_argument("--branch", default=None, help="Branch to set up with (default: current branch); `acquire` switches branches")
+    fill.add_argument("--python", default=config["python_version"], help="Python version for venv (default: from config)")
+    fill.add_argument("--volume-gb", type=int, default=config["volume_gb"], help=f"Volume size in GB (default: {config['volume_gb']})")
+    fill.add_argument("--disk-gb", type=int, default=config["disk_gb"], help=f"Disk size in GB (default: {config['disk_gb']})")
+    fill.add_argument("--template-id", default=config.get("template_id"), help="RunPod template ID (default: from config)")
+    fill.add_argument("--extras", default="auto", help="Optional-dependency groups to install (see `create --extras`)")
+    acquire = pool_sub.add_parser("acquire", help="Resume a ready pool pod, check out --branch, and hand it out")
+    acquire.add_argument("--branch", default=None, help="Branch to check out (default: current branch)")
+    acquire.add_argument("--gpu", default=None, help="Only take a pod of this GPU type")
+    acquire.add_argument("--alias", default=None, help="Also write a runpod-<alias> SSH alias for it")
+    acquire.add_argument("--json", action="store_true", help="Also print pod ID, name, SSH endpoint and commit as one JSON line")
+    release = pool_sub.add_parser("release", help="Pause an acquired pool pod and return it to the pool")
+    release.add_argument("pod", help="Pool pod ID or name")
+    pool_sub.add_parser("list", help="Show pool pods and their state")
+
+    alias = sub.add_parser("ssh-alias", help="Write the runpod-<name> ~/.ssh/config alias for a known endpoint (no API call).")
+    alias.add_argument("pod_name")
+    alias.add_argument("ip")
+    alias.add_argument("port", type=int)
 
     args = parser.parse_args()
+    # After parsing, so --help and usage errors are answered here and never reach the daemon.
+    code = _forward_to_daemon(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
 
     if args.command == "config":
         show_config()
         return
+    if args.command == "serve":
+        serve()
+        return
+    if args.command == "ssh-alias":
+        _write_ssh_alias(args.pod_name, args.ip, args.port)
+        print(f"Updated SSH alias: runpod-{args.pod_name} → {args.ip}:{args.port}")
+        return
+    if args.command == "gpus":
+        list_gpus(min_vram=args.min_vram, max_price=args.max_price, count=args.count, in_stock=args.in_stock, as_json=args.json, refresh=args.refresh)
+        return
 
     load_api_key()
 
-    if args.command == "gpus":
-        list_gpus()
-    elif args.command == "list":
+    if args.command == "list":
         list_pods()
     elif args.command == "create":
         repo_url = args.repo_url or get_repo_url()
         branch = args.branch or get_current_branch()
         gpu = None if args.cpu else args.gpu
-        create_pod(
-            args.name, gpu, args.image, repo_url, branch,
+        opts = dict(
             python_version=args.python, volume_gb=args.volume_gb,
             disk_gb=args.disk_gb, gpu_count=args.gpu_count,
             cpu_instance_id=config["cpu_instance_id"],
             template_id=args.template_id,
             install_claude=args.install_claude,
             extras=args.extras,
+            venv_snapshot=config["venv_snapshot"],
+            idle_pause_minutes=config["idle_pause_minutes"] or 0,
         )
+        if args.count > 1:
+            create_fleet(args.name, args.count, gpu, args.image, repo_url, branch, **opts)
+        else:
+            create_pod(args.name, gpu, args.image, repo_url, branch, **opts)
     elif args.command == "pause":
-        pause_pod(args.pod_id)
+        flush_paths = [] if args.no_flush else list(dict.fromkeys((config["pause_flush_paths"] or []) + args.flush))
+        pause_pod(args.pod_id, hf_cache_save=config["hf_cache_tier"], hf_cache_max_gb=config["hf_cache_max_gb"], flush_paths=flush_paths)
     elif args.command == "terminate":
         terminate_pod(args.pod_id, yes=args.yes)
     elif args.command == "resume":
-        resume_pod(args.pod_id, gpu_count=args.gpu_count)
+        resume_pod(args.pod_id, gpu_count=args.gpu_count, restore=not args.no_venv_restore, hf_cache_restore=config["hf_cache_tier"], flush_restore=not args.no_flush_restore)
     elif args.command == "status":
-        setup_status(args.pod_id)
+        if args.all:
+            fleet_status(timeout=args.timeout)
+        elif not args.pod_id:
+            parser.error("status needs a pod ID, a name glob, or --all")
+        elif any(c in args.pod_id for c in "*?["):
+            fleet_status(args.pod_id, timeout=args.timeout)
+        else:
+            setup_status(args.pod_id)
+    elif args.command == "metrics":
+        pod_metrics(args.pod_id, since_minutes=args.since, as_json=args.json)
+    elif args.command == "monitor":
+        monitor_pods(
+            args.pod_names, session=args.session, progress_glob=args.progress_glob, expect=args.expect,
+            interval=args.interval, disk_warn=args.disk_warn, events_file=args.events_file, exit_on_event=args.exit_on_event,
+        )
+    elif args.command == "stream-results":
+        stream_results(args.pod, args.remote_dir, args.local_dir, interval=args.interval, settle=args.settle,
+                       bwlimit_mbps=args.bwlimit, session=args.session, once=args.once)
     elif args.command == "wait-setup":
         wait_for_setup(args.pod_id, timeout=args.timeout, poll_interval=args.poll_interval)
     elif args.command == "refresh-ssh":
-        refresh_ssh(args.pod_name)
+        if args.all:
+            refresh_all_ssh()
+        elif args.pod_name:
+            refresh_ssh(args.pod_name)
+        else:
+            parser.error("refresh-ssh needs a pod name or --all")
+    elif args.command == "pool":
+        if args.pool_command == "fill":
+            pool_fill(
+                args.size, args.gpu, args.image, args.repo_url or get_repo_url(), args.branch or get_current_branch(),
+                gpu_count=args.gpu_count, python_version=args.python, volume_gb=args.volume_gb, disk_gb=args.disk_gb,
+                template_id=args.template_id, extras=args.extras, idle_pause_minutes=config["idle_pause_minutes"] or 0,
+            )
+        elif args.pool_command == "acquire":
+            pool_acquire(args.branch or get_current_branch(), gpu_type_id=args.gpu, alias=args.alias, as_json=args.json, hf_cache_restore=config["hf_cache_tier"])
+        elif args.pool_command == "release":
+            pool_release(args.pod, hf_cache_save=config["hf_cache_tier"], hf_cache_max_gb=config["hf_cache_max_gb"], flush_paths=config["pause_flush_paths"] or [])
+        else:
+            pool_list()
+    elif args.command == "hf-cache":
+        hf_cache(args.pod_id, args.action, max_gb=args.max_gb)
     else:
         parser.print_help()
 
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Pod lifecycle latency benchmark against local stand-ins.
+
+Swaps the `runpod` SDK for an in-process fake with configurable API latency
+and boot delay, and stands a throwaway OpenSSH `sshd` on localhost in for the
+pod. Each scenario drives the real runpod_ctl code path and reports wall time
+plus the round-trips it cost:
+
+    api          calls into the (fake) RunPod SDK, by method
+    ssh / scp    ssh and scp processes spawned
+    ssh_control  `ssh -O` control commands (local socket only, no network)
+    tcp          raw TCP banner probes
+    sleep_s      seconds runpod_ctl asked time.sleep for
+
+    python tests/bench_lifecycle.py --out bench.json
+    python tests/bench_lifecycle.py --api-latency 0.3 --boot-delay 20 wait_for_ssh
+
+Every scenario starts with a cold pod cache and no SSH master. Pod-side scripts
+are not executed: setup_pod and the venv restore would install packages on the
+benchmark host, so create_pod runs with setup_pod stubbed out and resume_pod
+with restore=False. wait_for_setup tails a log that a background thread writes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import getpass
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import runpod_ctl
+
+SCENARIOS = ("create_pod", "resume_pod", "wait_for_ssh", "wait_for_setup", "refresh_ssh")
+_real_sleep = time.sleep
+_real_popen = subprocess.Popen
+
+
+class FakeRunpod(types.ModuleType):
+    """Stand-in for the runpod SDK. Every call costs `latency` seconds; a started pod
+    reports its SSH endpoint (the local sshd) once `boot_delay` seconds have passed."""
+
+    def __init__(self, ssh_port: int, latency: float, boot_delay: float):
+        super().__init__("runpod")
+        self.ssh_port = ssh_port
+        self.latency = latency
+        self.boot_delay = boot_delay
+        self.calls = Counter()
+        self.pods: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method: str) -> None:
+        with self._lock:
+            self.calls[method] += 1
+        _real_sleep(self.latency)
+
+    def add_pod(self, name: str, status: str = "RUNNING", booted: bool = False) -> str:
+        pod_id = f"bench{len(self.pods) + 1}"
+        started = time.time() - (self.boot_delay if booted else 0)
+        self.pods[pod_id] = {"id": pod_id, "name": name, "desiredStatus": status, "started": started}
+        return pod_id
+
+    def _view(self, pod: dict) -> dict:
+        view = {k: pod[k] for k in ("id", "name", "desiredStatus")}
+        view["runtime"] = None
+        if pod["desiredStatus"] == "RUNNING" and time.time() - pod["started"] >= self.boot_delay:
+            view["runtime"] = {"ports": [{"privatePort": 22, "isIpPublic": True, "ip": "127.0.0.1", "publicPort": self.ssh_port}]}
+        return view
+
+    def get_pod(self, pod_id):
+        self._call("get_pod")
+        pod = self.pods.get(pod_id)
+        return self._view(pod) if pod else None
+
+    def get_pods(self):
+        self._call("get_pods")
+        return [self._view(p) for p in self.pods.values()]
+
+    def create_pod(self, name, **kwargs):
+        self._call("create_pod")
+        return {"id": self.add_pod(name)}
+
+    def resume_pod(self, pod_id, gpu_count=1):
+        self._call("resume_pod")
+        self.pods[pod_id].update(desiredStatus="RUNNING", started=time.time())
+
+    def stop_pod(self, pod_id):
+        self._call("stop_pod")
+        self.pods[pod_id]["desiredStatus"] = "EXITED"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalSshd:
+    """Throwaway OpenSSH server on 127.0.0.1 that accepts one generated key for the current user."""
+
+    def __init__(self, workdir: str):
+        self.dir = os.path.join(workdir, "sshd")
+        self.port = None
+        self.client_key = os.path.join(self.dir, "client_key")
+        self.proc = None
+
+    def __enter__(self) -> "LocalSshd":
+        sshd = shutil.which("sshd") or next((p for p in ("/usr/sbin/sshd", "/usr/local/sbin/sshd") if os.path.exists(p)), None)
+        if not sshd:
+            raise RuntimeError("sshd not found; install openssh-server or pass --ssh-port/--ssh-key")
+        os.makedirs(self.dir)
+        for key in ("host_key", "client_key"):
+            subprocess.run(["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-f", os.path.join(self.dir, key)], check=True)
+        with contextlib.suppress(OSError):
+            os.makedirs("/run/sshd", exist_ok=True)  # privilege-separation dir, needed when run as root
+        self.port = _free_port()
+        config = os.path.join(self.dir, "sshd_config")
+        with open(config, "w") as f:
+            f.write(
+                f"Port {self.port}\nListenAddress 127.0.0.1\n"
+                f"HostKey {self.dir}/host_key\nPidFile {self.dir}/sshd.pid\n"
+                f"AuthorizedKeysFile {self.client_key}.pub\n"
+                "StrictModes no\nUsePAM no\nPasswordAuthentication no\nPermitRootLogin prohibit-password\nLogLevel ERROR\n"
+            )
+        self.proc = _real_popen([sshd, "-D", "-e", "-f", config], stderr=open(os.path.join(self.dir, "sshd.log"), "w"))
+        deadline = time.time() + 10
+        while not runpod_ctl.tcp_probe("127.0.0.1", self.port, timeout=1):
+            if self.proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError(f"sshd did not start; see {self.dir}/sshd.log")
+            _real_sleep(0.1)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.proc.terminate()
+        self.proc.wait()
+
+
+class Recorder:
+    """Counts the round-trips runpod_ctl makes while `measure()` is active."""
+
+    def __init__(self, fake: FakeRunpod):
+        self.fake = fake
+        self.counts = Counter()
+        self.sleep_s = 0.0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self):
+        real_tcp_probe = runpod_ctl.tcp_probe
+
+        def popen(args, *a, **kw):
+            if isinstance(args, list) and args and args[0] in ("ssh", "scp"):
+                with self._lock:
+                    self.counts["ssh_control" if "-O" in args else args[0]] += 1
+            return _real_popen(args, *a, **kw)
+
+        def sleep(seconds):
+            with self._lock:
+                self.sleep_s += seconds
+            _real_sleep(seconds)
+
+        def tcp_probe(*a, **kw):
+            with self._lock:
+                self.counts["tcp"] += 1
+            return real_tcp_probe(*a, **kw)
+
+        # subprocess.run goes through Popen, so patching Popen alone counts both.
+        with patch.object(subprocess, "Popen", popen), patch.object(time, "sleep", sleep), \
+             patch.object(runpod_ctl, "tcp_probe", tcp_probe):
+            yield
+
+    def result(self, wall_s: float, api_before: Counter) -> dict:
+        api = self.fake.calls - api_before
+        return {
+            "wall_s": round(wall_s, 3),
+            "api": dict(sorted(api.items())),
+            "api_total": sum(api.values()),
+            "ssh": self.counts["ssh"],
+            "scp": self.counts["scp"],
+            "ssh_control": self.counts["ssh_control"],
+            "tcp": self.counts["tcp"],
+            "sleep_s": round(self.sleep_s, 3),
+        }
+
+
+def _write_setup_log(path: str, events_path: str, duration: float) -> None:
+    """Play back a short pod_setup.log: a few phase lines spread over `duration`, then the done marker."""
+    lines = ["[phase system] started", "[apt-get update] attempt 1/3...", "[phase system] done (1s)", "[phase deps] done (1s)"]
+    for line in lines:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+        _real_sleep(duration / len(lines))
+    with open(events_path, "w") as f:
+        f.write('{"ts":0,"event":"setup_start","mode":"setup"}\n{"ts":1,"event":"setup_end","status":"ok","secs":1,"failures":0}\n')
+    with open(path, "a") as f:
+        f.write("=== Setup complete ===\nResearch venv: /opt/venvs/research/bin/python\n")
+
+
+def run_scenario(name: str, fake: FakeRunpod, workdir: str, setup_duration: float) -> dict:
+    runpod_ctl.invalidate_pod_cache()
+    runpod_ctl.SSH_CONTROL_DIR = os.path.join(workdir, f"cm-{name}")
+    recorder = Recorder(fake)
+    api_before = fake.calls.copy()
+
+    if name == "create_pod":
+        def call():
+            with patch.object(runpod_ctl, "get_pod_env", return_value={}), patch.object(runpod_ctl, "setup_pod"):
+                runpod_ctl.create_pod("bench-create", "NVIDIA A100", "image", "https://example.invalid/r.git", "main")
+    elif name == "resume_pod":
+        pod_id = fake.add_pod("bench-resume", status="EXITED")
+        call = lambda: runpod_ctl.resume_pod(pod_id, restore=False)
+    elif name == "wait_for_ssh":
+        pod_id = fake.add_pod("bench-wait")
+        call = lambda: runpod_ctl.wait_for_ssh(pod_id)
+    elif name == "wait_for_setup":
+        pod_id = fake.add_pod("bench-setup", booted=True)
+        log, events = os.path.join(workdir, "pod_setup.log"), os.path.join(workdir, "pod_setup.events.jsonl")
+        for path in (log, events):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+        def call():
+            writer = threading.Thread(target=_write_setup_log, args=(log, events, setup_duration))
+            with patch.object(runpod_ctl, "_SETUP_LOG", log), patch.object(runpod_ctl, "_SETUP_EVENTS", events):
+                writer.start()
+                runpod_ctl.wait_for_setup(pod_id, timeout=60, poll_interval=1)
+                writer.join()
+    elif name == "refresh_ssh":
+        fake.add_pod("bench-refresh", booted=True)
+        call = lambda: runpod_ctl.refresh_ssh("bench-refresh")
+    else:
+        raise ValueError(f"unknown scenario {name!r}")
+
+    start = time.time()
+    with recorder.measure():
+        call()
+    return recorder.result(time.time() - start, api_before)
+
+
+def _close_masters(workdir: str) -> None:
+    for cm in Path(workdir).glob("cm-*"):
+        for sock in cm.iterdir():
+            subprocess.run(["ssh", "-S", str(sock), "-O", "exit", "bench"], capture_output=True, timeout=10)
+
+
+def run(scenarios=SCENARIOS, *, api_latency: float = 0.05, boot_delay: float = 3.0, setup_duration: float = 2.0,
+        ssh_port: int | None = None, ssh_key: str | None = None, ssh_user: str | None = None, verbose: bool = False) -> dict:
+    """Run the scenarios and return {"params": ..., "scenarios": {name: result}}."""
+    workdir = tempfile.mkdtemp(prefix="zb-")
+    try:
+        with contextlib.ExitStack() as stack:
+            if ssh_port is None:
+                sshd = stack.enter_context(LocalSshd(workdir))
+                ssh_port, ssh_key = sshd.port, sshd.client_key
+            user = ssh_user or getpass.getuser()
+            known_hosts = os.path.join(workdir, "known_hosts")
+            real_ssh_cmd = runpod_ctl.ssh_cmd
+
+            def ssh_cmd(ip, port):
+                cmd = real_ssh_cmd(ip, port)
+                cmd[1] = f"{user}@{ip}"
+                return cmd + ["-o", f"UserKnownHostsFile={known_hosts}", "-o", "LogLevel=ERROR"]
+
+            fake = FakeRunpod(ssh_port, api_latency, boot_delay)
+            stack.enter_context(patch.dict(sys.modules, {"runpod": fake}))
+            stack.enter_context(patch.dict(os.environ, {"HOME": workdir}))
+            stack.enter_context(patch.object(runpod_ctl, "ssh_cmd", ssh_cmd))
+            stack.enter_context(patch.object(runpod_ctl, "SSH_KEY", ssh_key))
+            stack.enter_context(patch.object(runpod_ctl, "SSH_CONTROL_DIR", runpod_ctl.SSH_CONTROL_DIR))
+            stack.enter_context(patch.object(runpod_ctl, "POD_CACHE_PERSIST", False))
+            stack.callback(_close_masters, workdir)
+
+            results = {}
+            for name in scenarios:
+                out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                with out:
+                    results[name] = run_scenario(name, fake, workdir, setup_duration)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    params = {"api_latency": api_latency, "boot_delay": boot_delay, "setup_duration": setup_duration}
+    return {"params": params, "scenarios": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pod lifecycle latency benchmark against a fake RunPod API and a local sshd")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"Subset of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Seconds per fake RunPod API call (default: 0.05)")
+    parser.add_argument("--boot-delay", type=float, default=3.0, help="Seconds from create/resume until the pod exposes SSH (default: 3)")
+    parser.add_argument("--setup-duration", type=float, default=2.0, help="Seconds the fake setup log takes to reach 'Setup complete' (default: 2)")
+    parser.add_argument("--ssh-port", type=int, help="Use an already-running sshd on 127.0.0.1 instead of starting one")
+    parser.add_argument("--ssh-key", help="Private key for --ssh-port")
+    parser.add_argument("--ssh-user", help="Login user (default: current user)")
+    parser.add_argument("--out", help="Write JSON results here (default: stdout)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show runpod_ctl output")
+    args = parser.parse_args()
+    if args.ssh_port and not args.ssh_key:
+        parser.error("--ssh-port needs --ssh-key")
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s) {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+
+    results = run(
+        args.scenarios or SCENARIOS, api_latency=args.api_latency, boot_delay=args.boot_delay,
+        setup_duration=args.setup_duration, ssh_port=args.ssh_port, ssh_key=args.ssh_key,
+        ssh_user=args.ssh_user, verbose=args.verbose,
+    )
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
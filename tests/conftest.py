@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+import runpod_ctl
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pod_cache(monkeypatch):
+    """Each test starts with an empty, in-memory-only pod cache."""
+    monkeypatch.setattr(runpod_ctl, "_pod_cache", {})
+    monkeypatch.setattr(runpod_ctl, "_pod_list_fetched_at", None)
+    monkeypatch.setattr(runpod_ctl, "_pod_cache_loaded", False)
+    monkeypatch.setattr(runpod_ctl, "POD_CACHE_PERSIST", False)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_config_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(runpod_ctl, "CONFIG_CACHE_FILE", str(tmp_path / "config.json"))
+    monkeypatch.setattr(runpod_ctl, "_config_layers_memo", None)
@@ -0,0 +1,50 @@
+"""Round-trip budgets for the pod lifecycle, measured by bench_lifecycle against a local sshd."""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import bench_lifecycle
+
+needs_sshd = pytest.mark.skipif(
+    not (shutil.which("sshd") or Path("/usr/sbin/sshd").exists()),
+    reason="needs a local OpenSSH sshd",
+)
+
+
+@pytest.fixture(scope="module")
+def bench():
+    return bench_lifecycle.run(api_latency=0, boot_delay=0.5, setup_duration=0.5)["scenarios"]
+
+
+@needs_sshd
+def test_wait_for_ssh_round_trips(bench):
+    r = bench["wait_for_ssh"]
+    assert r["api_total"] <= 3
+    assert r["tcp"] == 1 and r["ssh"] == 1
+
+
+@needs_sshd
+def test_create_and_resume_round_trips(bench):
+    assert bench["create_pod"]["api"]["create_pod"] == 1
+    assert bench["create_pod"]["ssh"] == 1
+    assert bench["resume_pod"]["api"]["resume_pod"] == 1
+    assert bench["resume_pod"]["ssh"] == 1
+
+
+@needs_sshd
+def test_refresh_ssh_lists_pods_once(bench):
+    assert bench["refresh_ssh"]["api"] == {"get_pods": 1}
+    assert bench["refresh_ssh"]["ssh"] == 1
+
+
+@needs_sshd
+def test_wait_for_setup_holds_one_stream(bench):
+    r = bench["wait_for_setup"]
+    assert r["api_total"] <= 1
+    assert r["ssh"] <= 2  # the log stream plus one read of the event file
+    assert r["sleep_s"] == 0
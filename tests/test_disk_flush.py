@@ -0,0 +1,43 @@
+"""Tests for the pod-side container-disk flush (save before pause / restore after resume)."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import disk_flush
+
+
+def test_save_mirrors_paths_and_restore_brings_them_back(tmp_path, capsys):
+    out, store = tmp_path / "root" / "outputs", tmp_path / "store"
+    (out / "ckpt").mkdir(parents=True)
+    (out / "ckpt" / "step1.pt").write_bytes(b"a" * 100)
+    (out / "stale.log").write_text("old")
+    (out / "latest").symlink_to("ckpt/step1.pt")
+    note = tmp_path / "root" / "note.txt"
+    note.write_text("single file")
+    store.mkdir()
+
+    disk_flush.save(str(store), [str(out), str(note), str(tmp_path / "nope")])
+    (out / "stale.log").unlink()
+    (out / "ckpt" / "step2.pt").write_bytes(b"b" * 50)
+    disk_flush.save(str(store), [str(out), str(note)])
+    lines = capsys.readouterr().out.splitlines()
+    assert "not found, skipped" in lines[2]
+    assert lines[-1].startswith("Flushed 0.00 GB of 0.00 GB in ")
+    assert not (store / str(out).lstrip("/") / "stale.log").exists()  # mirrored, not accumulated
+
+    for p in sorted(out.rglob("*"), reverse=True):
+        p.unlink() if p.is_symlink() or p.is_file() else p.rmdir()
+    note.unlink()
+    disk_flush.restore(str(store))
+    assert (out / "ckpt" / "step2.pt").read_bytes() == b"b" * 50
+    assert os.readlink(out / "latest") == "ckpt/step1.pt"
+    assert note.read_text() == "single file"
+    assert capsys.readouterr().out.splitlines()[-1].startswith("Restored ")
+
+    (out / "ckpt" / "step2.pt").write_bytes(b"newer")  # written after the resume
+    disk_flush.restore(str(store))
+    assert "already restored" in capsys.readouterr().out
+    assert (out / "ckpt" / "step2.pt").read_bytes() == b"newer"
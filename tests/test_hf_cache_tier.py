@@ -0,0 +1,88 @@
+"""Tests for the pod-side HF cache tier (save / restore / LRU eviction)."""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import hf_cache_tier
+
+
+def _fake_hub(hub: Path, repo: str, revision: str, files: dict[str, bytes]) -> None:
+    """Lay out a repo the way huggingface_hub does: blobs/, snapshots/<rev>/ symlinks, refs/main."""
+    repo_dir = hub / repo
+    (repo_dir / "blobs").mkdir(parents=True)
+    (repo_dir / "refs").mkdir()
+    (repo_dir / "refs" / "main").write_text(revision)
+    for path, data in files.items():
+        blob = repo_dir / "blobs" / f"{repo}-{path}".replace("/", "_")
+        blob.write_bytes(data)
+        link = repo_dir / "snapshots" / revision / path
+        link.parent.mkdir(parents=True, exist_ok=True)
+        link.symlink_to(os.path.relpath(blob, link.parent))
+
+
+def test_save_then_restore_rebuilds_snapshot(tmp_path):
+    hub, store = tmp_path / "hub", tmp_path / "store"
+    _fake_hub(hub, "models--org--m", "abc", {"config.json": b"{}", "sub/w.bin": b"x" * 100})
+    (store / "blobs").mkdir(parents=True)
+
+    hf_cache_tier.save(str(store), str(hub), None)
+    for p in sorted(hub.rglob("*"), reverse=True):
+        p.unlink() if p.is_symlink() or p.is_file() else p.rmdir()
+
+    hf_cache_tier.restore(str(store), str(hub))
+    snap = hub / "models--org--m" / "snapshots" / "abc"
+    assert (snap / "sub" / "w.bin").read_bytes() == b"x" * 100
+    assert (snap / "config.json").is_symlink()
+    assert (hub / "models--org--m" / "refs" / "main").read_text() == "abc"
+
+
+def _touch(path: Path, when: float) -> None:
+    os.utime(path.resolve(), (when, when))
+
+
+def test_save_evicts_least_recently_used(tmp_path):
+    hub, store = tmp_path / "hub", tmp_path / "store"
+    (store / "blobs").mkdir(parents=True)
+    _fake_hub(hub, "models--org--old", "r1", {"w.bin": b"o" * 100})
+    _touch(hub / "models--org--old" / "snapshots" / "r1" / "w.bin", 1000)
+    hf_cache_tier.save(str(store), str(hub), None)
+
+    _fake_hub(hub, "models--org--new", "r2", {"w.bin": b"n" * 100})
+    _touch(hub / "models--org--new" / "snapshots" / "r2" / "w.bin", 2000)
+    (hub / "models--org--old" / "snapshots" / "r1" / "w.bin").unlink()
+    hf_cache_tier.save(str(store), str(hub), 150)
+
+    manifest = hf_cache_tier.load_manifest(str(store))
+    assert {f["repo"] for f in manifest["files"]} == {"models--org--new"}
+    assert len(list((store / "blobs").iterdir())) == 1
+
+
+def test_eviction_goes_by_real_access_not_save_time(tmp_path):
+    hub, store = tmp_path / "hub", tmp_path / "store"
+    (store / "blobs").mkdir(parents=True)
+    _fake_hub(hub, "models--org--stale", "r1", {"w.bin": b"s" * 100})
+    _fake_hub(hub, "models--org--hot", "r2", {"w.bin": b"h" * 100})
+    _touch(hub / "models--org--stale" / "snapshots" / "r1" / "w.bin", 1000)
+    _touch(hub / "models--org--hot" / "snapshots" / "r2" / "w.bin", 3000)
+    hf_cache_tier.save(str(store), str(hub), 150)  # both still in the live cache
+
+    manifest = hf_cache_tier.load_manifest(str(store))
+    assert {f["repo"] for f in manifest["files"]} == {"models--org--hot"}
+
+
+def test_nested_pr_refs_are_saved_and_restored(tmp_path):
+    hub, store = tmp_path / "hub", tmp_path / "store"
+    (store / "blobs").mkdir(parents=True)
+    _fake_hub(hub, "models--org--m", "abc", {"w.bin": b"x"})
+    (hub / "models--org--m" / "refs" / "refs" / "pr").mkdir(parents=True)
+    (hub / "models--org--m" / "refs" / "refs" / "pr" / "7").write_text("def")
+    hf_cache_tier.save(str(store), str(hub), None)
+
+    shutil.rmtree(hub)
+    hf_cache_tier.restore(str(store), str(hub))
+    assert (hub / "models--org--m" / "refs" / "refs" / "pr" / "7").read_text() == "def"
+    assert (hub / "models--org--m" / "refs" / "main").read_text() == "abc"
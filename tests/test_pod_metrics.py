@@ -0,0 +1,40 @@
+"""Tests for the pod-side metrics ring buffer and its summary."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import pod_metrics
+
+
+def test_ring_buffer_keeps_newest_samples_in_order(tmp_path):
+    path = str(tmp_path / "m.bin")
+    fd = pod_metrics.open_buffer(path, capacity=4)
+    for ts in range(1, 7):
+        pod_metrics.append(fd, {"ts": ts, "gpu_util": ts * 10})
+    os.close(fd)
+
+    assert [s["ts"] for s in pod_metrics.read_samples(path)] == [3, 4, 5, 6]
+    assert [s["gpu_util"] for s in pod_metrics.read_samples(path, since=5)] == [50.0, 60.0]
+    # Reopening keeps the data; a buffer with a different record layout would be reset instead.
+    os.close(pod_metrics.open_buffer(path, capacity=4))
+    assert len(pod_metrics.read_samples(path)) == 4
+
+
+def test_idle_stretches_split_on_activity_and_sampler_gaps():
+    utils = [0] * 20 + [90] * 5 + [1] * 5 + [0] * 15  # 100s idle, busy, 25s idle (too short), then...
+    samples = [{"ts": 1000 + 5 * i, "gpu_util": u} for i, u in enumerate(utils)]
+    for s in samples[30:]:
+        s["ts"] += 600  # ...the sampler was down for 10 minutes: don't bridge the gap
+    assert pod_metrics.idle_stretches(samples, interval=5) == [(1000, 100), (1750, 75)]
+
+
+def test_gpu_idle_seconds_counts_back_from_the_latest_sample():
+    samples = [{"ts": 1000 + 5 * i, "gpu_count": 1, "gpu_util": 0 if i >= 10 else 80} for i in range(40)]
+    last = samples[-1]["ts"]
+    assert pod_metrics.gpu_idle_seconds(samples, now=last + 2, interval=5) == last + 2 - 1050
+    assert pod_metrics.gpu_idle_seconds(samples, now=last + 60, interval=5) == 0  # sampler went quiet
+    samples[-1]["gpu_util"] = 50
+    assert pod_metrics.gpu_idle_seconds(samples, now=last, interval=5) == 0
@@ -0,0 +1,52 @@
+"""Tests for pod_setup.sh's clone phase: skipped when the branch is unchanged, fast-forwarded when it moved."""
+
+import re
+import subprocess
+from pathlib import Path
+
+SCRIPT = (Path(__file__).parent.parent / "scripts" / "pod_setup.sh").read_text()
+
+
+def _functions(*names):
+    return "\n".join(re.search(rf"^{name}\(\) {{\n.*?^}}\n", SCRIPT, re.M | re.S).group(0) for name in names)
+
+
+def _git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(work, msg):
+    (work / "log.txt").write_text(msg)
+    _git("add", "log.txt", cwd=work)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", msg, cwd=work)
+    _git("push", "-q", "origin", "main", cwd=work)
+    return _git("rev-parse", "HEAD", cwd=work)
+
+
+def test_clone_skips_when_unchanged_and_fast_forwards_when_origin_moved(tmp_path):
+    origin, work = tmp_path / "origin.git", tmp_path / "work"
+    _git("init", "-q", "--bare", "-b", "main", str(origin), cwd=tmp_path)
+    _git("clone", "-q", str(origin), str(work), cwd=tmp_path)
+    first = _commit(work, "one")
+    harness = (
+        f'REPO_URL="{origin}" BRANCH=main REPO_DIR="{tmp_path}/repo" STAMP_DIR="{tmp_path}/stamps"\n'
+        "emit_event() { :; }\nrecord_failure() { :; }\n"
+        + _functions("retry", "stamp_matches", "write_stamp", "clone_repo", "phase_clone")
+        + "phase_clone\n"
+    )
+
+    def run():
+        result = subprocess.run(["bash", "-c", harness], capture_output=True, text=True)
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+
+    assert "skipped fetch" not in run()
+    assert (tmp_path / "stamps" / "clone").read_text() == f"main {first}\n"
+    assert "skipped fetch" in run()
+
+    second = _commit(work, "two")
+    out = run()
+    assert "skipped fetch" not in out and "fetching latest" in out
+    assert _git("rev-parse", "HEAD", cwd=tmp_path / "repo") == second
+    assert (tmp_path / "stamps" / "clone").read_text() == f"main {second}\n"
+    assert "skipped fetch" in run()
@@ -1,7 +1,9 @@
 """Basic tests for runpod_ctl.py — CLI parsing and pure helpers."""
 
+import json
 import os
 import sys
+import time
 from unittest.mock import patch
 
 import pytest
@@ -38,7 +40,7 @@ def test_get_pod_env_missing_tokens():
 
 def test_load_config_has_all_expected_keys():
     config = runpod_ctl.load_config()
-    expected = {"volume_gb", "disk_gb", "docker_image", "gpu_count", "cpu_instance_id", "python_version", "ssh_key", "template_id"}
+    expected = {"volume_gb", "disk_gb", "docker_image", "gpu_count", "cpu_instance_id", "python_version", "ssh_key", "template_id", "pod_cache_ttl", "pod_cache_persist", "venv_snapshot", "hf_cache_tier", "hf_cache_max_gb", "idle_pause_minutes", "pause_flush_paths"}
     assert expected == set(config.keys())
 
 
@@ -101,3 +103,515 @@ def test_get_ssh_info_with_ssh_port():
         ip, port = runpod_ctl.get_ssh_info("fake-id")
         assert ip == "5.6.7.8"
         assert port == 43210
+
+
+def test_ssh_cmd_uses_control_master():
+    cmd = runpod_ctl.ssh_cmd("1.2.3.4", 22222)
+    assert "ControlMaster=auto" in cmd
+    assert any(c.startswith("ControlPath=") and c.endswith("%C") for c in cmd)
+
+
+def test_write_ssh_alias_shares_control_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    runpod_ctl._write_ssh_alias("foo", "1.2.3.4", 22222)
+    runpod_ctl._write_ssh_alias("foo", "5.6.7.8", 33333)
+    text = (tmp_path / ".ssh" / "zombuul_hosts").read_text()
+    assert text.count("Host runpod-foo") == 1
+    assert "HostName 5.6.7.8" in text
+    assert f"ControlPath {runpod_ctl.SSH_CONTROL_DIR}/%C" in text
+    assert (tmp_path / ".ssh" / "zombuul-cm").is_dir()
+
+
+def test_ssh_alias_store_migrates_old_blocks_and_batches_updates(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".ssh").mkdir()
+    (tmp_path / ".ssh" / "config").write_text(
+        "AddKeysToAgent yes\n\nHost github.com\n    User git\n\n"
+        "Host runpod-old\n    HostName 9.9.9.9\n    Port 1\n\nHost work\n    HostName w\n"
+    )
+    runpod_ctl._update_ssh_aliases({"a": ("1.1.1.1", 1), "b": ("2.2.2.2", 2)})
+    runpod_ctl._update_ssh_aliases({"b": ("3.3.3.3", 3)}, remove=["a"])
+
+    config = (tmp_path / ".ssh" / "config").read_text()
+    assert config == (
+        "AddKeysToAgent yes\n\n" + runpod_ctl._SSH_ALIAS_INCLUDE + "\n"
+        "Host github.com\n    User git\n\nHost work\n    HostName w\n"
+    )
+    assert config.count("Include zombuul_hosts") == 1
+    _, hosts = runpod_ctl._split_host_blocks((tmp_path / ".ssh" / "zombuul_hosts").read_text())
+    assert list(hosts) == ["runpod-old", "runpod-b"]
+    assert "HostName 3.3.3.3" in hosts["runpod-b"]
+
+
+def test_ssh_include_keeps_the_users_config_byte_for_byte(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".ssh").mkdir()
+    user = (
+        "# my settings\nServerAliveInterval 30\n"
+        "Host *\n    ForwardAgent no\n"
+        "Match host *.corp exec \"true\"\n    User me\n"
+        "host runpod-old\n    HostName 9.9.9.9\n"
+        "Host\tjump\n    HostName j\n"
+        "Host runpod-older\n    HostName 8.8.8.8\n"
+        "Host *\n    IdentitiesOnly yes"
+    )
+    (tmp_path / ".ssh" / "config").write_text(user)
+    runpod_ctl._update_ssh_aliases({"new": ("1.1.1.1", 1)})
+    runpod_ctl._update_ssh_aliases({"new": ("2.2.2.2", 2)})
+
+    config = (tmp_path / ".ssh" / "config").read_text()
+    assert config == (
+        "# my settings\nServerAliveInterval 30\n" + runpod_ctl._SSH_ALIAS_INCLUDE + "\n"
+        "Host *\n    ForwardAgent no\n"
+        "Match host *.corp exec \"true\"\n    User me\n"
+        "Host\tjump\n    HostName j\n"
+        "Host *\n    IdentitiesOnly yes"
+    )
+    _, hosts = runpod_ctl._split_host_blocks((tmp_path / ".ssh" / "zombuul_hosts").read_text())
+    assert list(hosts) == ["runpod-old", "runpod-older", "runpod-new"]
+    assert "HostName 9.9.9.9" in hosts["runpod-old"] and "Match" not in hosts["runpod-old"]
+
+
+def test_pause_closes_ssh_master():
+    with patch.object(runpod_ctl, "get_ssh_info", return_value=("1.2.3.4", 22222)), \
+         patch.object(runpod_ctl, "close_ssh_master") as close, \
+         patch("runpod.stop_pod") as stop:
+        runpod_ctl.pause_pod("pod-1")
+    close.assert_called_once_with("1.2.3.4", 22222)
+    stop.assert_called_once_with("pod-1")
+
+
+def _fake_log_stream(chunks):
+    """Popen stand-in that serves successive byte chunks, one per SSH session, recording remote commands."""
+    sessions = iter(chunks)
+    remotes = []
+
+    def popen(cmd, **kw):
+        remotes.append(cmd[-1])
+        return _Served(next(sessions))
+    return popen, remotes
+
+
+class _Served:
+    def __init__(self, data: bytes):
+        import io
+        self.stdout = io.BytesIO(data)
+
+    def kill(self):
+        pass
+
+    def wait(self):
+        return 0
+
+
+def test_wait_for_setup_streams_and_resumes_from_offset(capsys):
+    first = b"[apt-get update] attempt 1/3...\nDownloading torch\npartial"
+    second = b"partial line\n=== Setup complete ===\nResearch venv: ...\n"
+    popen, remotes = _fake_log_stream([first, second])
+    events = runpod_ctl.subprocess.CompletedProcess([], 0, stdout=_SETUP_EVENTS)
+    with patch.object(runpod_ctl, "get_ssh_info", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl.subprocess, "Popen", side_effect=popen), \
+         patch.object(runpod_ctl, "ssh_run", return_value=events), \
+         patch.object(runpod_ctl.time, "sleep"):
+        runpod_ctl.wait_for_setup("pod-1", timeout=60, poll_interval=0)
+    out = capsys.readouterr().out
+    assert "[apt-get update] attempt 1/3..." in out
+    assert "Downloading torch" not in out
+    assert "Setup complete (" in out
+    assert "deps       ok          95s" in out
+    # Second session resumes after the last complete line, not the dangling partial.
+    resumed_at = len(first) - len(b"partial") + 1
+    assert f"tail -c +{resumed_at} -F" in remotes[1]
+
+
+_SETUP_EVENTS = "\n".join([
+    '{"ts":100,"event":"setup_start","mode":"setup"}',
+    '{"ts":100,"event":"phase_start","phase":"system"}',
+    '{"ts":101,"event":"phase_start","phase":"venv"}',
+    '{"ts":130,"event":"step","phase":"system","step":"apt-get update","rc":0,"secs":30,"attempts":2}',
+    '{"ts":140,"event":"phase_end","phase":"system","rc":0,"secs":40,"retries":1}',
+    '{"ts":141,"event":"phase_end","phase":"venv","rc":0,"secs":40,"retries":0}',
+    '{"ts":141,"event":"phase_start","phase":"deps"}',
+    '{"ts":236,"event":"phase_end","phase":"deps","rc":0,"secs":95,"retries":0}',
+    '{"ts":240,"event":"failure","phase":"main","reason":"venv snapshot"}',
+    '{"ts":240,"event":"setup_end","status":"ok","secs":140,"failures":1}',
+    '{"ts":240,"event":"phase_st',
+])
+
+
+def test_summarize_setup_events_builds_phase_profile():
+    events = runpod_ctl.subprocess.CompletedProcess([], 0, stdout=_SETUP_EVENTS)
+    with patch.object(runpod_ctl, "ssh_run", return_value=events) as ssh:
+        summary = runpod_ctl.summarize_setup_events(runpod_ctl.read_setup_events("1.2.3.4", 22))
+    assert ssh.call_count == 1
+    assert summary["state"] == "done" and summary["secs"] == 140
+    assert list(summary["phases"]) == ["system", "venv", "deps"]
+    assert summary["phases"]["system"]["retries"] == 1
+    assert summary["phases"]["system"]["steps"][0]["step"] == "apt-get update"
+    assert summary["failures"] == ["venv snapshot"]
+
+
+def test_wait_for_setup_exits_on_failure_marker():
+    popen, _ = _fake_log_stream([b"FATAL: GH_TOKEN is empty.\n=== Setup FAILED (exit 1) ===\n"])
+    with patch.object(runpod_ctl, "get_ssh_info", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl.subprocess, "Popen", side_effect=popen), \
+         patch.object(runpod_ctl, "ssh_run", return_value=runpod_ctl.subprocess.CompletedProcess([], 1)), \
+         pytest.raises(SystemExit) as exc_info:
+        runpod_ctl.wait_for_setup("pod-1", timeout=60)
+    assert exc_info.value.code == 1
+
+
+def test_create_fleet_isolates_failures(capsys):
+    created = iter([{"id": "pod-a"}, {"id": "pod-b"}])
+
+    def create(**kwargs):
+        if kwargs["name"] == "sweep-2":
+            raise RuntimeError("no capacity")
+        return next(created)
+
+    with patch("runpod.create_pod", side_effect=create), \
+         patch.object(runpod_ctl, "get_pod_env", return_value={}), \
+         patch.object(runpod_ctl, "wait_for_ssh", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl, "_write_ssh_alias"), \
+         patch.object(runpod_ctl, "setup_pod", side_effect=lambda *a, **k: print("setup", "started\nlog", sep=": ")) as setup, \
+         pytest.raises(SystemExit) as exc_info:
+        runpod_ctl.create_fleet("sweep", 3, "A100", "img", "url", "main")
+    assert exc_info.value.code == 1
+    assert setup.call_count == 2
+    out = capsys.readouterr().out
+    assert "[sweep-2] ERROR: no capacity" in out
+    # Output from deeper calls is tagged line by line and keeps print's own arguments.
+    assert "[sweep-1] setup: started\n[sweep-1] log\n" in out
+    assert not isinstance(sys.stdout, runpod_ctl._TaggedStdout)
+    assert "1/3 pods failed" in out
+
+
+def test_wait_for_ssh_one_api_call_per_poll():
+    booting = {"id": "p", "desiredStatus": "RUNNING", "runtime": None}
+    ready = {"id": "p", "desiredStatus": "RUNNING", "runtime": {"ports": [{"privatePort": 22, "isIpPublic": True, "ip": "5.6.7.8", "publicPort": 4321}]}}
+    with patch("runpod.get_pod", side_effect=[booting, ready]) as get_pod, \
+         patch.object(runpod_ctl, "tcp_probe", return_value=True), \
+         patch.object(runpod_ctl, "ssh_run", return_value=runpod_ctl.subprocess.CompletedProcess([], 0)), \
+         patch.object(runpod_ctl.time, "sleep"):
+        assert runpod_ctl.wait_for_ssh("p") == ("5.6.7.8", 4321)
+    assert get_pod.call_count == 2
+
+
+def test_fetch_pods_serves_from_cache_until_invalidated():
+    pods = [{"id": "p1", "name": "a", "desiredStatus": "RUNNING", "env": {"HF_TOKEN": "secret"}}]
+    with patch("runpod.get_pods", return_value=pods) as get_pods, \
+         patch("runpod.get_pod") as get_pod:
+        assert runpod_ctl.fetch_pods()[0]["name"] == "a"
+        runpod_ctl.fetch_pods()
+        assert runpod_ctl.fetch_pod("p1")["desiredStatus"] == "RUNNING"
+        assert get_pods.call_count == 1
+        get_pod.assert_not_called()
+        runpod_ctl.invalidate_pod_cache("p1")
+        runpod_ctl.fetch_pods()
+        assert get_pods.call_count == 2
+    assert "env" not in runpod_ctl.fetch_pod("p1")
+
+
+def test_pod_cache_persists_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(runpod_ctl, "POD_CACHE_PERSIST", True)
+    monkeypatch.setattr(runpod_ctl, "POD_CACHE_FILE", str(tmp_path / "pods.json"))
+    with patch("runpod.get_pods", return_value=[{"id": "p1", "name": "a", "env": {"HF_TOKEN": "secret"}}]):
+        runpod_ctl.fetch_pods()
+    assert "secret" not in (tmp_path / "pods.json").read_text()
+    # Simulate a fresh CLI invocation: in-memory state gone, disk file remains.
+    monkeypatch.setattr(runpod_ctl, "_pod_cache", {})
+    monkeypatch.setattr(runpod_ctl, "_pod_list_fetched_at", None)
+    monkeypatch.setattr(runpod_ctl, "_pod_cache_loaded", False)
+    with patch("runpod.get_pods") as get_pods:
+        assert [p["id"] for p in runpod_ctl.fetch_pods()] == ["p1"]
+    get_pods.assert_not_called()
+
+
+def test_tcp_probe_requires_ssh_banner():
+    import socket
+    import threading
+
+    def serve(banner):
+        srv = socket.socket()
+        srv.bind(("127.0.0.1", 0))
+        srv.listen(1)
+
+        def accept():
+            conn, _ = srv.accept()
+            conn.sendall(banner)
+            conn.close()
+            srv.close()
+        threading.Thread(target=accept, daemon=True).start()
+        return srv.getsockname()[1]
+
+    assert runpod_ctl.tcp_probe("127.0.0.1", serve(b"SSH-2.0-OpenSSH_9.2\r\n"))
+    assert not runpod_ctl.tcp_probe("127.0.0.1", serve(b"HTTP/1.1 502 Bad Gateway\r\n"))
+
+
+def test_probe_readiness_skips_ssh_until_tcp_answers():
+    ready = {"id": "p", "runtime": {"ports": [{"privatePort": 22, "isIpPublic": True, "ip": "5.6.7.8", "publicPort": 4321}]}}
+    sleeps = []
+    with patch("runpod.get_pod", return_value=ready), \
+         patch.object(runpod_ctl, "tcp_probe", side_effect=[False, False, True]), \
+         patch.object(runpod_ctl, "ssh_run", return_value=runpod_ctl.subprocess.CompletedProcess([], 0)) as ssh, \
+         patch.object(runpod_ctl.time, "sleep", side_effect=sleeps.append):
+        timing = runpod_ctl.probe_readiness("p")
+    assert ssh.call_count == 1
+    assert sleeps == [1.0, 2.0]
+    assert timing["ip"] == "5.6.7.8"
+    assert None not in (timing["endpoint_s"], timing["tcp_s"], timing["ssh_s"])
+
+
+def test_resume_restores_venv_snapshot(capsys):
+    restored = runpod_ctl.subprocess.CompletedProcess([], 0, stdout="Restored venv snapshot abc.\nvenv restore took 12s\n", stderr="")
+    with patch("runpod.resume_pod"), \
+         patch.object(runpod_ctl, "wait_for_ssh", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl, "fetch_pod", return_value={"name": "foo"}), \
+         patch.object(runpod_ctl, "_write_ssh_alias"), \
+         patch.object(runpod_ctl, "scp_to_pod") as scp, \
+         patch.object(runpod_ctl, "ssh_run", return_value=restored) as ssh:
+        runpod_ctl.resume_pod("pod-1")
+        scp.assert_called_once()
+        venv_call, flush_call = (c.args[2] for c in ssh.call_args_list)
+        assert venv_call == "bash /pod_setup.sh --restore-venv"
+        assert flush_call.endswith("disk_flush.py restore")
+
+        ssh.reset_mock()
+        runpod_ctl.resume_pod("pod-1", restore=False)  # --no-venv-restore no longer skips the flushed paths
+        assert ssh.call_args.args[2].endswith("disk_flush.py restore")
+        ssh.reset_mock()
+        runpod_ctl.resume_pod("pod-1", restore=False, flush_restore=False)
+        ssh.assert_not_called()
+    out = capsys.readouterr().out
+    assert "Restored venv snapshot abc." in out
+    assert "venv restore:" in out
+
+
+def test_pause_flushes_container_disk_first_and_stays_up_if_that_fails(capsys):
+    flushed = runpod_ctl.subprocess.CompletedProcess([], 0, stdout="Flushed 1.20 GB of 3.00 GB in 9.0s (133 MB/s) to /workspace/.zombuul/container-disk\n", stderr="")
+    with patch("runpod.stop_pod") as stop, \
+         patch.object(runpod_ctl, "get_ssh_info", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl, "scp_to_pod"), \
+         patch.object(runpod_ctl, "_close_pod_master"), \
+         patch.object(runpod_ctl, "_set_idle_watch"), \
+         patch.object(runpod_ctl, "ssh_run", return_value=flushed) as ssh:
+        runpod_ctl.pause_pod("pod-1", flush_paths=["/root/outputs", "/opt/my runs"])
+        assert ssh.call_args.args[2].endswith("disk_flush.py save /root/outputs '/opt/my runs'")
+        stop.assert_called_once_with("pod-1")
+        assert "Flushed 1.20 GB" in capsys.readouterr().out
+
+        ssh.return_value = runpod_ctl.subprocess.CompletedProcess([], 1, stdout="", stderr="ERROR: save failed: [Errno 122] Disk quota exceeded\n")
+        with pytest.raises(SystemExit):
+            runpod_ctl.pause_pod("pod-1", flush_paths=["/root/outputs"])
+        stop.assert_called_once()
+    assert "Pod left running" in capsys.readouterr().out
+
+
+def test_list_marks_pods_stopped_from_the_pod_and_real_idle_pauses(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(runpod_ctl, "IDLE_WATCH_FILE", str(tmp_path / "idle-watch.json"))
+    (tmp_path / "idle-watch.json").write_text('{"pod-exit": 30}')  # ledger written before idle_paused_at existed
+    runpod_ctl._set_idle_watch("pod-paused", 30)
+    with patch("runpod.stop_pod"), patch.object(runpod_ctl, "get_ssh_info"):
+        runpod_ctl.pause_pod("pod-paused")  # a local pause disarms the record
+    report = ("Last pause was by the idle watchdog: paused_at=2026-10-17T22:40:00Z idle_minutes=30 \n"
+              "Idle watchdog: pausing the pod after 30 min of GPU idle.\n")
+    with patch("runpod.resume_pod"), patch.object(runpod_ctl, "wait_for_ssh", return_value=("1.2.3.4", 22)), \
+         patch.object(runpod_ctl, "fetch_pod", return_value=None), patch.object(runpod_ctl, "restore_venv", return_value=report):
+        runpod_ctl.resume_pod("pod-idle")
+    stopped = "Exited by user: Sat Oct 18 2026 09:12:03 GMT+0000 (Coordinated Universal Time)"
+    pods = [{"id": i, "name": i, "desiredStatus": "EXITED", "lastStatusChange": stopped, "machine": {}} for i in ("pod-exit", "pod-paused")]
+    pods.append({"id": "pod-idle", "name": "pod-idle", "desiredStatus": "RUNNING", "machine": {}})
+    capsys.readouterr()
+    with patch.object(runpod_ctl, "fetch_pods", return_value=pods):
+        runpod_ctl.list_pods()
+    exited, paused, idle = capsys.readouterr().out.splitlines()
+    assert exited.endswith("stopped on pod Sat Oct 18 2026 09:12:03 GMT+0000") and "idle-paused" not in exited
+    assert "stopped on pod" not in paused and "idle-paused" not in paused
+    assert idle.endswith("ssh runpod-pod-idle  idle-paused 2026-10-17T22:40:00Z")
+
+
+def test_gpu_catalogue_is_cached_and_ranked_by_stock_then_price(tmp_path, monkeypatch):
+    monkeypatch.setattr(runpod_ctl, "GPU_CATALOGUE_FILE", str(tmp_path / "gpus.json"))
+    monkeypatch.setattr(runpod_ctl, "load_api_key", lambda: None)
+    gpu = lambda id, vram, price, stock: {"id": id, "displayName": id, "memoryInGb": vram, "maxGpuCount": 8,
+                                          "lowestPrice": {"uninterruptablePrice": price, "minimumBidPrice": None, "stockStatus": stock}}
+    answer = {"data": {"gpuTypes": [
+        gpu("A100 80GB", 80, 1.64, "Low"), gpu("H100 80GB", 80, 2.99, "High"), gpu("L40S", 48, 0.86, "High"),
+        gpu("A40", 48, 0.40, None), gpu("RTX 4090", 24, 0.69, "High"), gpu("unknown", 0, None, None),
+    ]}}
+    with patch("runpod.api.graphql.run_graphql_query", return_value=answer) as query:
+        first = runpod_ctl.fetch_gpu_catalogue(2)
+        assert runpod_ctl.fetch_gpu_catalogue(2) == first
+    query.assert_called_once()
+    assert "gpuCount: 2" in query.call_args.args[0]
+
+    ranked = runpod_ctl.rank_gpus(first, min_vram=40, count=2)
+    assert [g["id"] for g in ranked] == ["L40S", "H100 80GB", "A100 80GB", "A40"]
+    assert [g["id"] for g in runpod_ctl.rank_gpus(first, min_vram=40, max_price=2.0, in_stock=True)] == ["L40S", "A100 80GB"]
+
+
+def test_pool_acquire_skips_pods_that_fail_to_resume_then_release(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(runpod_ctl, "POOL_FILE", str(tmp_path / "pool.json"))
+    entry = {"gpu": "L40S", "gpu_count": 1, "repo_url": "u", "branch": "main", "python_version": "3.11", "extras": "auto", "state": "ready"}
+    with runpod_ctl._pool_state() as pool:
+        pool["p-old"] = dict(entry, name="pool-l40s-1", since=1)
+        pool["p-mid"] = dict(entry, name="pool-l40s-2", since=2)
+        pool["p-new"] = dict(entry, name="pool-l40s-3", since=3)
+
+    def resume(pod_id, **_):  # p-old and p-mid boot but never answer on SSH
+        return ("1.2.3.4", 22) if pod_id == "p-new" else (None, None)
+
+    def pause(pod_id, **_):
+        if pod_id == "p-mid":
+            raise RuntimeError("API error")
+    switched = runpod_ctl.subprocess.CompletedProcess([], 0, stdout="abc1234\n", stderr="")
+    pods = [{"id": "p-old"}, {"id": "p-mid"}, {"id": "p-new"}]
+    with patch.object(runpod_ctl, "fetch_pods", return_value=pods), \
+         patch.object(runpod_ctl, "fetch_pod", return_value={"desiredStatus": "RUNNING"}), \
+         patch.object(runpod_ctl, "resume_pod", side_effect=resume), \
+         patch.object(runpod_ctl, "pause_pod", side_effect=pause) as paused, \
+         patch.object(runpod_ctl, "ssh_run", return_value=switched) as ssh, \
+         patch.object(runpod_ctl, "setup_pod") as setup:
+        runpod_ctl.pool_acquire("exp-branch")
+    assert [c.args[0] for c in paused.call_args_list] == ["p-old", "p-mid"]  # not left running while marked ready
+    assert "fetch origin exp-branch" in ssh.call_args.args[2]
+    setup.assert_not_called()  # no DEPS_CHANGED
+    with runpod_ctl._pool_state() as pool:
+        assert [pool[i]["state"] for i in ("p-old", "p-mid", "p-new")] == ["ready", "failed", "in_use"]
+        assert pool["p-new"]["branch"] == "exp-branch"
+
+    with patch.object(runpod_ctl, "fetch_pod", return_value={"desiredStatus": "RUNNING"}), \
+         patch.object(runpod_ctl, "pause_pod") as pause:
+        runpod_ctl.pool_release("pool-l40s-3", flush_paths=["/root/outputs"])
+    assert pause.call_args.kwargs["flush_paths"] == ["/root/outputs"]
+    with runpod_ctl._pool_state() as pool:
+        assert pool["p-new"]["state"] == "ready"
+
+    def prune_meanwhile(pod_id, **_):
+        with runpod_ctl._pool_state() as pool:
+            del pool[pod_id]
+    with patch.object(runpod_ctl, "fetch_pod", return_value={"desiredStatus": "RUNNING"}), \
+         patch.object(runpod_ctl, "pause_pod", side_effect=prune_meanwhile), \
+         pytest.raises(SystemExit):
+        runpod_ctl.pool_release("pool-l40s-1")
+    assert "pool-l40s-1 left the pool while it was pausing" in capsys.readouterr().out
+    with runpod_ctl._pool_state() as pool:
+        assert "p-old" not in pool
+
+
+def _running_pod(pod_id, name, port):
+    return {"id": pod_id, "name": name, "desiredStatus": "RUNNING",
+            "runtime": {"ports": [{"privatePort": 22, "isIpPublic": True, "ip": "1.2.3.4", "publicPort": port}]}}
+
+
+def test_fleet_status_queries_running_pods_concurrently(capsys):
+    snapshot = "\n".join([
+        "== events",
+        '{"ts":1,"event":"setup_start","mode":"setup"}',
+        '{"ts":2,"event":"phase_start","phase":"deps"}',
+        "== tmux", "exp1",
+        "== gpu", "87, 40960, 81920",
+        "== disk", "overlay 100 60 40 60% /", "mfs 200 20 180 10% /workspace",
+    ])
+
+    def slow_ssh(ip, port, cmd, **kw):
+        time.sleep(0.3)
+        if port == 3:
+            raise runpod_ctl.subprocess.TimeoutExpired(cmd, kw["timeout"])
+        return runpod_ctl.subprocess.CompletedProcess([], 0, stdout=snapshot)
+
+    pods = [_running_pod("p1", "sweep-1", 1), _running_pod("p2", "sweep-2", 2), _running_pod("p3", "sweep-3", 3),
+            {"id": "p4", "name": "sweep-4", "desiredStatus": "EXITED"}, _running_pod("p5", "other", 5)]
+    with patch.object(runpod_ctl, "fetch_pods", return_value=pods), \
+         patch.object(runpod_ctl, "ssh_run", side_effect=slow_ssh) as ssh:
+        start = time.time()
+        runpod_ctl.fleet_status("sweep-*", timeout=5)
+        elapsed = time.time() - start
+    out = capsys.readouterr().out
+    assert ssh.call_count == 3
+    assert elapsed < 0.6
+    assert "running: deps" in out and "87% 40/80G" in out and "/workspace 10%" in out and "exp1" in out
+    assert "timeout (5s)" in out
+    assert "sweep-4" in out and "other" not in out
+
+
+def test_monitor_transitions_only_on_state_change():
+    alive = {"alive": True, "disk": {"/": 60, "/workspace": 40}, "progress": 3}
+    assert runpod_ctl.monitor_transitions(alive, dict(alive, progress=5), expect=10, disk_warn=85) == []
+    assert runpod_ctl.monitor_transitions(alive, dict(alive, alive=False), expect=10, disk_warn=85) == [{"event": "crash"}]
+    assert runpod_ctl.monitor_transitions(alive, dict(alive, alive=False, progress=10), expect=10, disk_warn=85) == [{"event": "complete"}]
+    assert runpod_ctl.monitor_transitions(alive, dict(alive, alive=False), expect=None, disk_warn=85) == [{"event": "exited"}]
+    full = dict(alive, disk={"/": 91, "/workspace": 40})
+    assert runpod_ctl.monitor_transitions(alive, full, expect=None, disk_warn=85) == [{"event": "disk_warn", "mount": "/", "pct": 91}]
+    assert runpod_ctl.monitor_transitions(full, dict(full), expect=None, disk_warn=85) == []
+
+
+def test_monitor_exits_on_first_event(capsys):
+    probes = iter([
+        "alive=1\ndisk / 50\nprogress=1\n", "alive=1\ndisk / 50\nprogress=2\n",
+        "alive=0\ndisk / 50\nprogress=2\n",
+    ])
+    with patch.object(runpod_ctl, "fetch_pods", return_value=[_running_pod("p1", "exp", 1)]), \
+         patch.object(runpod_ctl, "ssh_run", side_effect=lambda *a, **kw: runpod_ctl.subprocess.CompletedProcess([], 0, stdout=next(probes))) as ssh, \
+         patch.object(runpod_ctl.time, "sleep"):
+        runpod_ctl.monitor_pods(["exp"], session="job", progress_glob="out/*.json", expect=4, exit_on_event=True)
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [e["event"] for e in events] == ["watching", "crash"]
+    assert events[1]["progress"] == 2 and events[1]["alive"] is False
+    assert ssh.call_count == 3
+
+
+def test_stream_results_ships_settled_files_then_the_tail(tmp_path, capsys):
+    local = tmp_path / "results"
+    local.mkdir()
+    (local / "done.pt").write_bytes(b"x" * 4)
+    os.utime(local / "done.pt", (900, 900))
+    polls = iter([
+        "1000 1\ndone.pt\t4\t900.2\nshard-1.pt\t8\t930.0\nshard-2.pt\t3\t990.0\n",  # shard-2 is still being written
+        "1100 0\ndone.pt\t4\t900.2\nshard-1.pt\t8\t930.0\nshard-2.pt\t5\t1090.0\n",  # job ended: ship the rest
+    ])
+    batches = []
+
+    def fake_rsync(cmd, **kw):
+        batches.append(kw["input"].split())
+        assert "--bwlimit=48828" in cmd and cmd[-2] == "root@1.2.3.4:/workspace/repo/out/"
+        return runpod_ctl.subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    with patch.object(runpod_ctl, "fetch_pods", return_value=[_running_pod("p1", "exp", 1)]), \
+         patch.object(runpod_ctl, "ssh_run", side_effect=lambda *a, **kw: runpod_ctl.subprocess.CompletedProcess([], 0, stdout=next(polls))), \
+         patch.object(runpod_ctl.subprocess, "run", side_effect=fake_rsync), \
+         patch.object(runpod_ctl.time, "sleep"):
+        runpod_ctl.stream_results("exp", "out/", str(local), session="job")
+    assert batches == [["shard-1.pt"], ["shard-1.pt", "shard-2.pt"]]  # the fake rsync wrote nothing, so shard-1 goes again
+    out = capsys.readouterr().out
+    assert "1 still being written" in out and "[stream] done: 3 files" in out
+
+
+def test_forwarded_requests_carry_only_the_environment_the_command_needs(tmp_path, monkeypatch):
+    import socket
+    import threading
+    path = tmp_path / "ctl.sock"
+    monkeypatch.setattr(runpod_ctl, "SERVE_SOCKET", str(path))
+    monkeypatch.delenv("ZOMBUUL_NO_DAEMON", raising=False)
+    for key, value in {"HF_TOKEN": "hf", "AWS_SECRET_ACCESS_KEY": "aws", "RUNPOD_API_KEY": "rp", "LC_ALL": "C"}.items():
+        monkeypatch.setenv(key, value)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen()
+    requests = []
+
+    def answer():
+        for _ in range(2):
+            conn, _ = server.accept()
+            with conn, conn.makefile("rb") as f:
+                requests.append(json.loads(f.readline()))
+                conn.sendall(runpod_ctl._SERVE_EXIT + b"0\n")
+
+    threading.Thread(target=answer, daemon=True).start()
+    assert runpod_ctl._forward_to_daemon(["list"]) == 0
+    assert runpod_ctl._forward_to_daemon(["create", "exp", "--gpu", "L40S"]) == 0
+    server.close()
+    listed, created = (r["env"] for r in requests)
+    assert listed["RUNPOD_API_KEY"] == "rp" and listed["LC_ALL"] == "C"
+    assert "HF_TOKEN" not in listed and "AWS_SECRET_ACCESS_KEY" not in listed
+    assert created["HF_TOKEN"] == "hf" and "AWS_SECRET_ACCESS_KEY" not in created
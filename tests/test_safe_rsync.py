@@ -0,0 +1,151 @@
+"""Tests for safe_rsync.sh: --parallel buckets, and the tar+zstd bulk mode with a local stand-in for ssh."""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+SCRIPT = str(Path(__file__).parent.parent / "scripts" / "safe_rsync.sh")
+
+
+@pytest.mark.skipif(not shutil.which("zstd"), reason="zstd not installed")
+def test_small_files_go_through_one_tar_stream(tmp_path):
+    src = tmp_path / "shards"
+    (src / "part").mkdir(parents=True)
+    for i in range(2000):
+        (src / "part" / f"{i}.json").write_text(f'{{"id": {i}}}')
+    (src / "odd name.txt").write_text("x")
+    fake_ssh = tmp_path / "ssh"
+    fake_ssh.write_text('#!/usr/bin/env bash\nshift\nexec bash -c "$*"\n')  # drop the host, run locally
+    fake_ssh.chmod(0o755)
+
+    result = subprocess.run(
+        ["bash", SCRIPT, "-az", "--no-owner", f"pod:{src}/", str(tmp_path / "out")],
+        capture_output=True, text=True, env={"PATH": os.environ["PATH"], "HOME": str(tmp_path), "RSYNC_RSH": str(fake_ssh)},
+    )
+    assert "[safe_rsync] bulk: tar+zstd stream for 2001 files" in result.stdout
+    assert result.stdout.splitlines()[-1] == "[safe_rsync] EXIT=0 FILES=2001"
+    assert (tmp_path / "out" / "part" / "1999.json").read_text() == '{"id": 1999}'
+    assert (tmp_path / "out" / "odd name.txt").exists()
+
+
+@pytest.mark.skipif(not shutil.which("rsync"), reason="rsync not installed")
+def test_parallel_balances_buckets_and_keeps_links_and_empty_dirs(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "empty").mkdir()
+    sizes = {"big.bin": 8000, "a.bin": 5000, "sub/b.bin": 4000, "sub/c.bin": 3000, "d.bin": 2000}
+    for rel, size in sizes.items():
+        (src / rel).write_bytes(b"x" * size)
+    (src / "latest").symlink_to("big.bin")
+    # Wrap the real rsync to keep a copy of each --files-from bucket.
+    buckets = tmp_path / "buckets"
+    buckets.mkdir()
+    wrapper = tmp_path / "bin" / "rsync"
+    wrapper.parent.mkdir()
+    wrapper.write_text(
+        "#!/usr/bin/env bash\n"
+        f'for a in "$@"; do case "$a" in --files-from=*) cp "${{a#--files-from=}}" "{buckets}/$$" ;; esac; done\n'
+        f'exec {shutil.which("rsync")} "$@"\n'
+    )
+    wrapper.chmod(0o755)
+
+    result = subprocess.run(
+        ["bash", SCRIPT, "--parallel", "3", "-a", f"{src}/", str(tmp_path / "dst")],
+        capture_output=True, text=True, env={"PATH": f"{wrapper.parent}:{os.environ['PATH']}", "HOME": str(tmp_path)},
+    )
+    lines = result.stdout.splitlines()
+    assert lines[-1] == "[safe_rsync] EXIT=0 FILES=5", result.stdout + result.stderr
+    assert lines[-2].startswith("[safe_rsync] BYTES=22000 ") and lines[-2].endswith(" STREAMS=3")
+    loads = sorted(sum(sizes.get(rel, 0) for rel in b.read_text().split("\n") if rel) for b in buckets.iterdir())
+    assert loads == [7000, 7000, 8000]  # biggest first, each to the lightest bucket
+    assert os.readlink(tmp_path / "dst" / "latest") == "big.bin"
+    assert (tmp_path / "dst" / "empty").is_dir()
+
+
+@pytest.mark.skipif(not shutil.which("zstd"), reason="zstd not installed")
+def test_bulk_upload_without_gnu_find_and_no_source_walk_for_a_full_destination(tmp_path):
+    src = tmp_path / "shards"
+    src.mkdir()
+    for i in range(2000):
+        (src / f"{i}.json").write_text("{}")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "find").write_text("#!/bin/sh\necho 'find: -printf: unknown primary or operator' >&2\nexit 1\n")  # BSD find
+    (bin_dir / "ssh").write_text(f'#!/usr/bin/env bash\nshift\necho "$*" >> {tmp_path}/ssh.log\nexec bash -c "$*"\n')
+    for tool in bin_dir.iterdir():
+        tool.chmod(0o755)
+    env = {"PATH": f"{bin_dir}:{os.environ['PATH']}", "HOME": str(tmp_path), "RSYNC_RSH": str(bin_dir / "ssh")}
+
+    up = subprocess.run(["bash", SCRIPT, "-a", f"{src}/", f"pod:{tmp_path}/remote/shards/"], capture_output=True, text=True, env=env)
+    assert "[safe_rsync] bulk: tar+zstd stream for 2000 files" in up.stdout
+    assert up.stdout.splitlines()[-1] == "[safe_rsync] EXIT=0 FILES=2000"
+    assert len(list((tmp_path / "remote" / "shards").iterdir())) == 2000
+
+    (tmp_path / "ssh.log").unlink()
+    subprocess.run(["bash", SCRIPT, "-a", f"pod:{tmp_path}/remote/shards/", str(src)], capture_output=True, text=True, env=env)
+    assert not (tmp_path / "ssh.log").exists()  # local destination not empty: the remote source is never walked
+
+
+@pytest.mark.skipif(not shutil.which("zstd"), reason="zstd not installed")
+def test_bulk_probes_only_big_sources_keeps_parallel_and_honours_e_and_tilde(tmp_path):
+    src, small = tmp_path / "shards", tmp_path / "small"
+    src.mkdir()
+    small.mkdir()
+    for i in range(2000):
+        (src / f"{i}.json").write_text("{}")
+    (small / "a.json").write_text("{}")
+    fake_ssh = tmp_path / "ssh"
+    fake_ssh.write_text(f'#!/usr/bin/env bash\nshift\necho "$*" >> {tmp_path}/ssh.log\nexec bash -c "$*"\n')
+    fake_ssh.chmod(0o755)
+    env = {"PATH": os.environ["PATH"], "HOME": str(tmp_path), "RSYNC_RSH": "false"}
+
+    subprocess.run(["bash", SCRIPT, "-a", "-e", str(fake_ssh), f"{small}/", "pod:~/remote/small/"], capture_output=True, text=True, env=env)
+    log = tmp_path / "ssh.log"
+    assert not log.exists() or "ls -A" not in log.read_text()  # too small to benefit: the pod is never probed
+
+    par = subprocess.run(["bash", SCRIPT, "--parallel", "2", "-a", "-e", str(fake_ssh), f"{src}/", "pod:~/remote/par/"],
+                         capture_output=True, text=True, env=env)
+    assert "bulk:" not in par.stdout
+
+    up = subprocess.run(["bash", SCRIPT, "-a", "-e", str(fake_ssh), f"{src}/", "pod:~/remote/shards/"], capture_output=True, text=True, env=env)
+    assert up.stdout.splitlines()[-1] == "[safe_rsync] EXIT=0 FILES=2000", up.stdout + up.stderr
+    assert len(list((tmp_path / "remote" / "shards").iterdir())) == 2000
+
+
+@pytest.mark.skipif(not shutil.which("rsync"), reason="rsync not installed")
+def test_index_uses_the_explicit_remote_shell_and_falls_back_for_symlinks(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_text("a")
+    (src / "sub" / "b.txt").write_text("b")
+    rsh = tmp_path / "my-ssh"
+    rsh.write_text(f'#!/usr/bin/env bash\nshift\necho "$*" >> {tmp_path}/rsh.log\nexec bash -c "$*"\n')
+    rsh.chmod(0o755)
+    env = {"PATH": os.environ["PATH"], "HOME": str(tmp_path), "RSYNC_RSH": "false"}
+    cmd = ["bash", SCRIPT, "--index", "-a", "-e", str(rsh), f"{src}/", f"pod:{tmp_path}/dst/"]
+
+    first = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    assert "[safe_rsync] index: 2 of 2 files changed" in first.stdout, first.stdout + first.stderr
+    assert first.stdout.splitlines()[-1] == "[safe_rsync] EXIT=0 FILES=2"
+    assert "zombuul-sync-index.py scan" in (tmp_path / "rsh.log").read_text()  # not the failing RSYNC_RSH
+
+    (src / "latest").symlink_to("a.txt")
+    (src / "empty").mkdir()
+    second = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    assert "is not a regular file; using plain rsync" in second.stderr or "is an empty directory; using plain rsync" in second.stderr
+    assert second.stdout.splitlines()[-1].startswith("[safe_rsync] EXIT=0 ")
+    assert os.readlink(tmp_path / "dst" / "latest") == "a.txt"
+    assert (tmp_path / "dst" / "empty").is_dir()
+
+
+def test_control_socket_dir_is_private_and_the_users_ssh_dir_is_left_alone(tmp_path):
+    (tmp_path / ".ssh").mkdir(mode=0o755)
+    (tmp_path / ".ssh").chmod(0o755)
+    (tmp_path / "src").mkdir()
+    subprocess.run(["bash", SCRIPT, "-a", f"{tmp_path}/src/", str(tmp_path / "dst")],
+                   capture_output=True, text=True, env={"PATH": os.environ["PATH"], "HOME": str(tmp_path)})
+    assert (tmp_path / ".ssh").stat().st_mode & 0o777 == 0o755
+    assert (tmp_path / ".ssh" / "zombuul-cm").stat().st_mode & 0o777 == 0o700
@@ -0,0 +1,77 @@
+"""Startup cost of runpod_ctl.py: API-free subcommands must stay cheap.
+
+Agents invoke the script dozens of times per experiment (and the smoke test
+uses `--help` as a liveness check), so the RunPod SDK (~2s to import) is only
+loaded on paths that talk to the API, and a warm config cache skips PyYAML.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+SCRIPT = str(Path(__file__).parent.parent / "scripts" / "runpod_ctl.py")
+STARTUP_BUDGET_S = 1.0
+
+PROBE = """
+import runpy, sys
+sys.argv = [{script!r}] + {argv!r}
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+except SystemExit:
+    pass
+print("LOADED=" + ",".join(m for m in ("runpod", "yaml", "dotenv") if m in sys.modules), file=sys.stderr)
+"""
+
+
+def _run(argv: list[str], home: Path) -> tuple[set[str], float]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(script=SCRIPT, argv=argv)],
+        capture_output=True, text=True, timeout=60, env={**os.environ, "HOME": str(home)},
+    )
+    elapsed = time.perf_counter() - start
+    line = next(ln for ln in result.stderr.splitlines() if ln.startswith("LOADED="))
+    return set(filter(None, line[len("LOADED="):].split(","))), elapsed
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["config"], ["ssh-alias", "foo", "1.2.3.4", "2222"]])
+def test_api_free_commands_skip_heavy_imports(argv, tmp_path):
+    _run(["config"], tmp_path)  # warm the config cache
+    loaded, _ = _run(argv, tmp_path)
+    assert loaded == set()
+
+
+def test_help_within_startup_budget(tmp_path):
+    _run(["--help"], tmp_path)
+    _, elapsed = _run(["--help"], tmp_path)
+    assert elapsed < STARTUP_BUDGET_S, f"--help took {elapsed:.2f}s (budget {STARTUP_BUDGET_S}s)"
+
+
+def test_commands_forward_to_a_running_daemon(tmp_path):
+    sock = tmp_path / ".cache" / "zombuul" / "ctl.sock"
+    env = {**os.environ, "HOME": str(tmp_path)}
+    env.pop("ZOMBUUL_NO_DAEMON", None)
+    daemon = subprocess.Popen([sys.executable, SCRIPT, "serve"], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        deadline = time.monotonic() + 30
+        while not sock.exists() and daemon.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert sock.exists(), daemon.stderr.read() if daemon.poll() is not None else "daemon did not start"
+        result = subprocess.run(
+            [sys.executable, SCRIPT, "ssh-alias", "foo", "1.2.3.4", "2222"],
+            cwd=tmp_path, capture_output=True, text=True, timeout=30, env=env,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert "Host runpod-foo" in (tmp_path / ".ssh" / "zombuul_hosts").read_text()
+        assert subprocess.run([sys.executable, SCRIPT, "ssh-alias"], capture_output=True, timeout=30, env=env).returncode == 2
+        assert sock.parent.stat().st_mode & 0o077 == 0 and sock.stat().st_mode & 0o077 == 0  # owner only
+    finally:
+        daemon.terminate()
+        out, err = daemon.communicate(timeout=30)
+    assert "[serve] ssh-alias foo 1.2.3.4 2222 -> 0" in err
+    assert "[serve] ssh-alias ->" not in err  # the usage error was answered by the client
+    assert not sock.exists()
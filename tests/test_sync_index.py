@@ -0,0 +1,84 @@
+"""Tests for the incremental sync index (scan / diff / hash reuse)."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import sync_index
+
+
+def test_diff_lists_only_new_and_changed_files(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    for root in (src, dst):
+        (root / "sub").mkdir(parents=True)
+        (root / "same.txt").write_text("unchanged")
+        (root / "sub" / "edit.bin").write_bytes(b"v1")
+    (src / "sub" / "edit.bin").write_bytes(b"v2")
+    (src / "new.txt").write_text("new")
+    (src / ".git").mkdir()
+    (src / ".git" / "HEAD").write_text("ref")
+
+    src_idx = sync_index.scan(str(src), [".git"], cache=str(tmp_path / "s.json"))
+    dst_idx = sync_index.scan(str(dst), cache=str(tmp_path / "d.json"))
+
+    assert sorted(sync_index.diff(src_idx, dst_idx)) == [(2, "sub/edit.bin"), (3, "new.txt")]
+    assert ".git/HEAD" not in src_idx
+
+
+def test_rescan_reuses_hash_when_size_and_mtime_match(tmp_path, monkeypatch):
+    root = tmp_path / "d"
+    root.mkdir()
+    (root / "a").write_bytes(b"x" * 10)
+    (root / "b").write_bytes(b"y" * 10)
+    cache = str(tmp_path / "idx.json")
+    sync_index.scan(str(root), cache=cache)
+
+    st = os.stat(root / "b")
+    os.utime(root / "b", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    hashed = []
+    real = sync_index.fast_hash
+    monkeypatch.setattr(sync_index, "fast_hash", lambda p, s: hashed.append(os.path.basename(p)) or real(p, s))
+    sync_index.scan(str(root), cache=cache)
+
+    assert hashed == ["b"]
+
+
+def test_same_size_edit_in_the_middle_is_a_change(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    data = bytearray(b"a" * 300_000)
+    for root in (src, dst):
+        (root / "ckpt.bin").write_bytes(data)
+        os.utime(root / "ckpt.bin", ns=(10**18, 10**18))  # as rsync -a leaves the copy
+    assert sync_index.diff(sync_index.scan(str(src), cache=str(tmp_path / "s.json")),
+                           sync_index.scan(str(dst), cache=str(tmp_path / "d.json"))) == []
+
+    data[150_000] = ord("b")  # outside both sampled 64 KiB windows
+    (src / "ckpt.bin").write_bytes(data)
+    os.utime(src / "ckpt.bin", ns=(10**18, 10**18 + 5 * 10**9))
+    src_idx = sync_index.scan(str(src), cache=str(tmp_path / "s.json"))
+    dst_idx = sync_index.scan(str(dst), cache=str(tmp_path / "d.json"))
+    assert src_idx["ckpt.bin"][2] == dst_idx["ckpt.bin"][2]  # the sampled hash can't see it...
+    assert sync_index.diff(src_idx, dst_idx) == [(300_000, "ckpt.bin")]  # ...but the mtime does
+
+
+def test_files_only_scan_rejects_symlinks_and_empty_dirs(tmp_path):
+    root = tmp_path / "d"
+    (root / "sub").mkdir(parents=True)
+    (root / "sub" / "a").write_text("a")
+    (root / "cache").mkdir()
+    (root / "cache" / "x.tmp").write_text("x")
+    assert list(sync_index.scan(str(root), ["*.tmp"], cache=str(tmp_path / "i.json"))) == ["sub/a"]
+    with pytest.raises(sync_index.NotFilesOnly, match="cache/ is an empty directory"):
+        sync_index.scan(str(root), ["*.tmp"], cache=str(tmp_path / "i.json"), files_only=True)
+
+    (root / "cache" / "x.tmp").unlink()
+    (root / "cache").rmdir()
+    (root / "latest").symlink_to("sub/a")
+    with pytest.raises(sync_index.NotFilesOnly, match="latest is not a regular file"):
+        sync_index.scan(str(root), cache=str(tmp_path / "i.json"), files_only=True)